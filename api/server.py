@@ -0,0 +1,249 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import time
+from collections import Counter, namedtuple
+
+from data.snapshots import CRYPTO_FILE, STOCK_FILE, read_snapshot
+
+
+MARKET_FILES = {"stock": STOCK_FILE, "crypto": CRYPTO_FILE}
+
+# Snapshot files are checked for changes at most this often (seconds)
+CHECK_INTERVAL = 1.0
+
+# Requests with a larger header block are rejected
+MAX_HEADER_BYTES = 16 * 1024
+
+REASONS = {
+    200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 431: "Request Header Fields Too Large", 503: "Service Unavailable",
+}
+
+# One encoding of a response body, with its ETag and ready-made header blocks
+Variant = namedtuple("Variant", ["body", "etag", "head_200", "head_304"])
+
+
+def _variant(body, encoding=None):
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    # Strong ETags must differ between encodings of the same content
+    etag = f'"{digest}-gz"' if encoding else f'"{digest}"'
+    common = f"ETag: {etag}\r\nCache-Control: public, no-cache\r\nVary: Accept-Encoding\r\n"
+    head_200 = (
+        "HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+        + (f"Content-Encoding: {encoding}\r\n" if encoding else "")
+        + f"Content-Length: {len(body)}\r\n"
+        + common
+    )
+    head_304 = "HTTP/1.1 304 Not Modified\r\n" + common
+    return Variant(body, etag, head_200.encode("latin-1"), head_304.encode("latin-1"))
+
+
+def _encode(body, gzip_body=None):
+    """Returns the (identity, gzip) variants of a JSON body, compressing it unless given."""
+    if gzip_body is None:
+        gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+    return _variant(body), _variant(gzip_body, "gzip")
+
+
+def _dump(data):
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def _precompressed(file_path, body):
+    """Returns the gzip file written next to the snapshot if it holds exactly `body`."""
+    try:
+        gzip_body = file_path.with_name(file_path.name + ".gz").read_bytes()
+        return gzip_body if gzip.decompress(gzip_body) == body else None
+    except (OSError, EOFError):
+        return None
+
+
+class SnapshotStore:
+    """
+    Encoded responses for every market and section of the latest snapshots.
+
+    Bodies are serialized, gzipped and hashed once per snapshot version, when
+    the snapshot file changes, so serving a request is only a dictionary
+    lookup and a socket write.
+    """
+
+    def __init__(self, files=MARKET_FILES, check_interval=CHECK_INTERVAL):
+        self.files = files
+        self.check_interval = check_interval
+        self.responses = {}  # path -> (identity, gzip) variants
+        self.snapshots = {}  # market -> snapshot the responses were built from
+        self._checked = 0
+
+    def refresh(self):
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        changed = False
+        for market, file_path in self.files.items():
+            snapshot = read_snapshot(file_path)
+            if snapshot is not self.snapshots.get(market):
+                self.snapshots[market] = snapshot
+                changed = True
+        if changed:
+            self.responses = self._build()
+
+    def _build(self):
+        responses, markets = {}, {}
+        for market, snapshot in self.snapshots.items():
+            if snapshot is None:
+                continue
+            # Same bytes as the snapshot file, so the gzip copy written with it can be reused
+            body = json.dumps(snapshot, indent=4).encode()
+            responses[f"/v1/{market}"] = _encode(body, _precompressed(self.files[market], body))
+            for section, value in snapshot["data"].items():
+                responses[f"/v1/{market}/{section}"] = _encode(
+                    _dump({"timestamp": snapshot["timestamp"], "data": value})
+                )
+            markets[market] = {
+                "timestamp": snapshot["timestamp"],
+                "url": f"/v1/{market}",
+                "sections": sorted(snapshot["data"]),
+            }
+        responses["/v1/markets"] = _encode(_dump({"markets": markets}))
+        return responses
+
+
+def _accepts_gzip(header):
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            name, _, quality = params.strip().partition("=")
+            try:
+                return name.strip() != "q" or float(quality) > 0
+            except ValueError:
+                return True
+    return False
+
+
+def _matches(if_none_match, variants):
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(variant.etag in tags for variant in variants)
+
+
+class SnapshotAPI:
+    """Routes requests to the snapshot store and keeps request counters."""
+
+    def __init__(self, store=None):
+        self.store = store or SnapshotStore()
+        self.requests = Counter()  # status code -> count
+        self.started = time.time()
+
+    def handle(self, method, target, headers):
+        """Returns (status, head_bytes, body_bytes) for one request."""
+        if method not in ("GET", "HEAD"):
+            return self.json_response(405, {"error": "Only GET and HEAD are supported."})
+        path = target.split("?", 1)[0].rstrip("/") or "/"
+        if path == "/health":
+            return self.json_response(200, {"status": "ok"})
+        if path == "/metrics":
+            return self.json_response(200, self.metrics())
+
+        self.store.refresh()
+        variants = self.store.responses.get(path)
+        if variants is None:
+            market = path.split("/")[2] if path.startswith("/v1/") and path.count("/") >= 2 else None
+            if market in self.store.files and f"/v1/{market}" not in self.store.responses:
+                return self.json_response(503, {"error": f"No {market} snapshot has been written yet."})
+            return self.json_response(404, {"error": f"Unknown path: {path}"})
+
+        variant = variants[1] if _accepts_gzip(headers.get("accept-encoding", "")) else variants[0]
+        if _matches(headers.get("if-none-match", ""), variants):
+            return 304, variant.head_304, b""
+        return 200, variant.head_200, variant.body
+
+    def json_response(self, status, data):
+        body = _dump(data)
+        head = (
+            f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nCache-Control: no-store\r\n"
+        )
+        return status, head.encode("latin-1"), body
+
+    def metrics(self):
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "requests_by_status": {str(status): count for status, count in sorted(self.requests.items())},
+            "snapshots": {
+                market: snapshot["timestamp"] if snapshot else None
+                for market, snapshot in self.store.snapshots.items()
+            },
+        }
+
+
+class HTTPProtocol(asyncio.Protocol):
+    """Minimal HTTP/1.1 server side with keep-alive, enough for GET and HEAD."""
+
+    def __init__(self, api):
+        self.api = api
+        self.buffer = b""
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.buffer += data
+        while self.transport is not None:
+            end = self.buffer.find(b"\r\n\r\n")
+            if end < 0:
+                if len(self.buffer) > MAX_HEADER_BYTES:
+                    self._respond(*self.api.json_response(431, {"error": "Request headers too large."}), keep_alive=False)
+                return
+            head, self.buffer = self.buffer[:end].decode("latin-1"), self.buffer[end + 4:]
+            request_line, *header_lines = head.split("\r\n")
+            parts = request_line.split(" ")
+            if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+                self._respond(*self.api.json_response(400, {"error": "Malformed request line."}), keep_alive=False)
+                return
+            method, target, version = parts
+            headers = {}
+            for line in header_lines:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            connection = headers.get("connection", "").lower()
+            keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+            if headers.get("content-length", "0") != "0" or "transfer-encoding" in headers:
+                # No endpoint takes a body, so don't try to find the next request after one
+                keep_alive = False
+            status, head_bytes, body = self.api.handle(method, target, headers)
+            self._respond(status, head_bytes, b"" if method == "HEAD" else body, keep_alive)
+
+    def _respond(self, status, head_bytes, body, keep_alive):
+        self.api.requests[status] += 1
+        connection = b"Connection: keep-alive\r\n\r\n" if keep_alive else b"Connection: close\r\n\r\n"
+        self.transport.write(head_bytes + connection + body)
+        if not keep_alive:
+            self.transport.close()
+            self.transport = None
+
+    def connection_lost(self, exc):
+        self.transport = None
+
+
+async def serve(host="127.0.0.1", port=8000):
+    api = SnapshotAPI()
+    api.store.refresh()
+    server = await asyncio.get_running_loop().create_server(lambda: HTTPProtocol(api), host, port, reuse_address=True)
+    print(f"Serving market snapshots on http://{host}:{port}/v1/markets")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the latest market snapshots as JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
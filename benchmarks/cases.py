@@ -0,0 +1,126 @@
+"""
+Benchmark cases for the app's hot paths.
+
+Each case is a context manager that imports what it needs, patches network
+calls with fixtures, and yields the function to time. A case whose imports
+fail is reported as skipped.
+"""
+import io
+from contextlib import contextmanager, redirect_stdout
+from unittest import mock
+
+from benchmarks import fixtures
+
+
+CASES = {}
+
+
+def case(name, repeat=20):
+    def register(setup):
+        CASES[name] = (contextmanager(setup), repeat)
+        return setup
+    return register
+
+
+# frontend/data_read: snapshot loading and the table transforms the page runs on every rerun
+
+@case("data_read.load_cold")
+def load_cold():
+    from data import snapshots
+    from frontend import data_read as read
+
+    def run():
+        snapshots._snapshots.clear()
+        read.load_data(read.STOCK_FILE)
+    yield run
+
+
+@case("data_read.load_cached", repeat=200)
+def load_cached():
+    from frontend import data_read as read
+    yield lambda: read.load_data(read.STOCK_FILE)
+
+
+@case("data_read.transforms", repeat=100)
+def transforms():
+    from frontend import data_read as read
+
+    def run():
+        for market in ("Stock", "Crypto"):
+            read.fetch_top_gainers(market)
+            read.fetch_top_losers(market)
+            read.fetch_market_news(market)
+            read.fetch_market_volatility(market)
+            read.fetch_market_greed_meter(market)
+            read.fetch_market_greed_label(market)
+        read.fetch_market_aggregates("Stock")
+    yield run
+
+
+# Gauges
+
+@case("gauges.speedometer")
+def speedometer():
+    from frontend import data_read as read
+    yield lambda: read.create_speedometer(14.2, "VIX", 50)
+
+
+@case("gauges.fear_greed")
+def fear_greed():
+    from frontend import data_read as read
+    yield lambda: read.create_fear_greed_index(63)
+
+
+# chatbot/functions: indicator math and chart rendering over a fixture history
+
+@contextmanager
+def _fixture_prices(functions, bars):
+    history = fixtures.price_history(bars)
+    with mock.patch.object(functions, "_fetch_close_prices", lambda symbol, period: history.copy()):
+        yield
+
+
+@case("functions.calculate_rsi", repeat=50)
+def calculate_rsi():
+    from chatbot import functions
+    with _fixture_prices(functions, 252):
+        yield lambda: functions.calculate_RSI("AAPL")
+
+
+@case("functions.plot_sma_render", repeat=10)
+def plot_sma_render():
+    from chatbot import functions
+
+    def run():
+        figure = functions.plot_SMA("AAPL", window=50, period="5y")
+        figure.savefig(io.BytesIO(), format="png")
+    with _fixture_prices(functions, 1260):
+        yield run
+
+
+@case("functions.compare_tickers", repeat=10)
+def compare_tickers():
+    from chatbot import functions
+    with _fixture_prices(functions, 252):
+        yield lambda: functions.compare_tickers(["AAPL", "MSFT", "JPM", "KO"])
+
+
+# data/update_data: movers ranking and snapshot serialization
+
+@case("update_data.rank_movers", repeat=50)
+def rank_movers():
+    from data import update_data
+    panel = fixtures.daily_panel(update_data.TOP_30_STOCKS)
+    with mock.patch.object(update_data, "fetch_stocks_history", lambda symbols: panel):
+        yield update_data.fetch_market_gainers_and_losers
+
+
+@case("update_data.save_snapshot")
+def save_snapshot():
+    from data import update_data
+    snapshot = fixtures.stock_snapshot()
+
+    def run():
+        with redirect_stdout(io.StringIO()):
+            update_data.save_data_to_json(snapshot, "benchmark_stock_data")
+    yield run
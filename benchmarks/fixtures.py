@@ -0,0 +1,121 @@
+"""
+Deterministic offline data shaped like what the app reads and downloads, so
+benchmarks and load tests never touch the network.
+"""
+import json
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+
+SEED = 7
+
+
+def load_universe(config_path="data/config.json"):
+    with open(config_path, "r") as config_file:
+        return json.load(config_file)["US30"]
+
+
+def price_history(bars=252, seed=SEED):
+    """One ticker's daily closes as returned by yf.Ticker(...).history()['Close']."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2024-12-31", periods=bars, tz="America/New_York", name="Date")
+    return pd.Series(150 * np.exp(np.cumsum(rng.normal(0.0005, 0.016, bars))), index=index, name="Close")
+
+
+def daily_panel(symbols, bars=5, seed=SEED):
+    """Close and Volume frames of several symbols, as sliced from a batched yf.download."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2024-12-31", periods=bars, name="Date")
+    start = rng.uniform(20, 500, len(symbols))
+    close = start * np.exp(np.cumsum(rng.normal(0, 0.015, (bars, len(symbols))), axis=0))
+    volume = rng.integers(1_000_000, 50_000_000, (bars, len(symbols))).astype(float)
+    close = pd.DataFrame(close, index=index, columns=symbols)
+    close.iloc[-1, 3] = np.nan  # a late bar, which the ranking fills from the previous close
+    return close, pd.DataFrame(volume, index=index, columns=symbols)
+
+
+def _articles(count, rng):
+    words = ["stocks", "rally", "earnings", "inflation", "fed", "rates", "bitcoin", "tech", "yields", "guidance"]
+    return [
+        {
+            "title": f"Markets {' '.join(rng.choice(words, 6))} ({number})",
+            "description": " ".join(rng.choice(words, 30)),
+            "url": f"https://example.com/news/{number}",
+            "source": "Example Wire",
+            "published_at": f"2024-12-{1 + number % 28:02d}T14:00:00Z",
+            "summary": " ".join(rng.choice(words, 120)),
+            "keywords": list(rng.choice(words, 8)),
+        }
+        for number in range(count)
+    ]
+
+
+def stock_snapshot(seed=SEED, config_path="data/config.json"):
+    """Data section of a stock_data.json snapshot."""
+    rng = np.random.default_rng(seed)
+    stocks = load_universe(config_path)
+
+    def movers(sign):
+        return [
+            {
+                "symbol": stock["ticker"],
+                "company_name": stock["name"],
+                "current_price": float(rng.uniform(20, 500)),
+                "percent_change": float(sign * rng.uniform(0.1, 6)),
+            }
+            for stock in stocks[:5]
+        ]
+
+    sectors = sorted({stock["sector"] for stock in stocks})
+    return {
+        "gainers": movers(1),
+        "losers": movers(-1),
+        "aggregates": {
+            "index": {"level": 42000.0, "change": 120.5, "percent_change": 0.29, "components": len(stocks)},
+            "breadth": {"advancers": 18, "decliners": 11, "unchanged": 1},
+            "sectors": [
+                {"sector": sector, "advancers": 2, "decliners": 1, "average_change": float(rng.normal(0, 1))}
+                for sector in sectors
+            ],
+            "volume": {"up_volume": 6.1e8, "down_volume": 4.2e8, "up_down_ratio": 1.45},
+        },
+        "volatility": {"vix_level": 14.2},
+        "greed_index": {"value": 63, "value_classification": "Greed"},
+        "news": _articles(20, rng),
+    }
+
+
+def crypto_snapshot(seed=SEED):
+    """Data section of a crypto_data.json snapshot."""
+    rng = np.random.default_rng(seed + 1)
+
+    def movers(sign):
+        return [
+            {
+                "symbol": symbol,
+                "name": symbol.upper(),
+                "current_price": float(rng.uniform(0.1, 60000)),
+                "price_change_percentage_24h": float(sign * rng.uniform(0.5, 15)),
+            }
+            for symbol in ("btc", "eth", "sol", "ada", "xrp")
+        ]
+
+    return {
+        "gainers": movers(1),
+        "losers": movers(-1),
+        "volatility": {"volatility_index": 2.8},
+        "greed_index": {"value": "71", "value_classification": "Greed"},
+        "news": _articles(20, rng),
+    }
+
+
+def write_snapshots(directory):
+    """Writes fresh stock and crypto snapshots into `directory`, a data/ folder holding config.json."""
+    timestamp = datetime.now(ZoneInfo("America/New_York")).strftime("%Y-%m-%d %H:%M:%S %Z%z")
+    snapshots = (("stock_data", stock_snapshot(config_path=directory / "config.json")), ("crypto_data", crypto_snapshot()))
+    for name, data in snapshots:
+        with open(directory / f"{name}.json", "w") as file:
+            json.dump({"timestamp": timestamp, "data": data}, file, indent=4)
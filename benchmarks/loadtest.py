@@ -0,0 +1,188 @@
+"""
+Load test of the Streamlit page with simulated concurrent sessions.
+
+Each simulated viewer opens the page, sends a few chat messages and switches
+the market, through Streamlit's AppTest. Sessions run in threads of one
+process, like sessions of one Streamlit server, with the Gemini model and
+yfinance replaced by local stand-ins (benchmarks/standins.py) and the
+snapshots by fresh fixtures, so nothing leaves the machine.
+
+    python -m benchmarks.loadtest --levels 1 2 4 8 16
+"""
+import argparse
+import functools
+import json
+import sys
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, nullcontext
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from benchmarks import standins
+from benchmarks.run import workspace
+
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_PATH = ROOT / "frontend" / "app.py"
+
+# What the simulated viewers ask, in turn; a mix of locally routed, model-routed and free-form messages
+MESSAGES = [
+    "What's the price of AAPL?",
+    "Calculate the RSI of MSFT",
+    "Plot the 50 day SMA of NVDA",
+    "Compare AAPL, MSFT and GOOG over 1y",
+    "How is JPM doing today?",
+    "What are today's top stock gainers?",
+    "Why do interest rates move stock prices?",
+    "Plot the EMA of KO",
+]
+
+
+def simulate_session(number, chats, timeout):
+    """
+    One viewer: opens the page, sends `chats` messages, then switches market.
+    Returns render and chat latencies in seconds and the number of errors shown.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+    renders, chat_latencies, errors = [], [], 0
+
+    started = time.perf_counter()
+    app.run()
+    renders.append(time.perf_counter() - started)
+    for turn in range(chats):
+        message = MESSAGES[(number + turn) % len(MESSAGES)]
+        started = time.perf_counter()
+        # The text area's on_change sends the message, like Ctrl+Enter in the browser
+        app.text_area(key="chat_input").input(message).run()
+        chat_latencies.append(time.perf_counter() - started)
+        errors += len(app.exception) + len(app.error)
+    started = time.perf_counter()
+    app.selectbox[0].select("Crypto").run()
+    renders.append(time.perf_counter() - started)
+    errors += len(app.exception)
+    return renders, chat_latencies, errors
+
+
+def _percentiles(samples):
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99]).round(1).tolist()
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+
+
+def run_level(concurrency, rounds, chats, timeout):
+    """Runs `concurrency` sessions at a time, `rounds` times over, from cold chat caches."""
+    from chatbot import chat
+
+    for cache in (chat.routing_cache, chat.result_cache, chat.answer_cache):
+        cache.clear()
+
+    def session(number):
+        try:
+            return simulate_session(number, chats, timeout)
+        except Exception as e:
+            print(f"Session {number} failed: {e}")
+            return [], [], 1
+
+    sessions = concurrency * rounds
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(session, range(sessions)))
+    elapsed = time.perf_counter() - started
+
+    renders = [latency for outcome in outcomes for latency in outcome[0]]
+    chat_latencies = [latency for outcome in outcomes for latency in outcome[1]]
+    return {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "seconds": round(elapsed, 2),
+        "render": _percentiles(renders),
+        "chat": _percentiles(chat_latencies),
+        "script_runs_per_second": round((len(renders) + len(chat_latencies)) / elapsed, 2),
+        "chats_per_second": round(len(chat_latencies) / elapsed, 2),
+        "errors": sum(outcome[2] for outcome in outcomes),
+    }
+
+
+def stand_ins(model_latency, data_latency):
+    """Patches the upstreams with local stand-ins; returns the ExitStack that undoes it."""
+    import yfinance as yf
+    from chatbot import chat
+
+    stack = ExitStack()
+    stack.enter_context(mock.patch.object(chat, "model", standins.LocalModel(model_latency)))
+    stack.enter_context(mock.patch.object(yf, "download", functools.partial(standins.local_download, latency=data_latency)))
+    stack.enter_context(mock.patch.object(yf, "Ticker", standins.LocalTicker))
+    stack.enter_context(mock.patch.object(standins.LocalTicker, "latency", data_latency))
+    # The fixture snapshots are fresh, but a stale one must not start a real refresh (NewsAPI, CoinGecko)
+    stack.enter_context(mock.patch.dict(sys.modules, {"data.update_data": types.SimpleNamespace(refresh_data=lambda: None)}))
+    return stack
+
+
+def shared_app_test_globals():
+    """
+    Sets up the mock Streamlit runtime and test config once for every simulated
+    session; returns the ExitStack that undoes it.
+
+    AppTest sets both process-wide when a script run starts and restores them
+    when it ends, so with concurrent sessions one run finishing would pull them
+    out from under the others.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import app_test
+
+    runtime = mock.MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    stack = ExitStack()
+    stack.enter_context(mock.patch.object(Runtime, "_instance", runtime))
+    stack.enter_context(app_test.patch_config_options({"global.appTest": True}))
+    # AppTest's own per-run setup goes to stand-ins instead
+    stack.enter_context(mock.patch.object(app_test, "Runtime", types.SimpleNamespace(_instance=None)))
+    stack.enter_context(mock.patch.object(app_test, "patch_config_options", lambda overrides: nullcontext()))
+    return stack
+
+
+def report(results):
+    print(
+        f"{'sessions':>8} {'concurrent':>10}  {'render p50/p95/p99 (ms)':>24}  {'chat p50/p95/p99 (ms)':>24}"
+        f"  {'runs/s':>7} {'chats/s':>7} {'errors':>6}"
+    )
+    for level in results:
+        render = "/".join(str(level["render"][key]) for key in ("p50_ms", "p95_ms", "p99_ms"))
+        chat_latency = "/".join(str(level["chat"][key]) for key in ("p50_ms", "p95_ms", "p99_ms"))
+        print(
+            f"{level['sessions']:>8} {level['concurrency']:>10}  {render:>24}  {chat_latency:>24}"
+            f"  {level['script_runs_per_second']:>7} {level['chats_per_second']:>7} {level['errors']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive concurrent simulated sessions against frontend/app.py.")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Concurrent sessions per level")
+    parser.add_argument("--rounds", type=int, default=2, help="Sessions per concurrent slot at each level")
+    parser.add_argument("--chats", type=int, default=3, help="Chat messages per session")
+    parser.add_argument("--model-latency", type=float, default=0.5, help="Seconds per stand-in model call")
+    parser.add_argument("--data-latency", type=float, default=0.2, help="Seconds per stand-in yfinance call")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds a script run may take")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    output = Path(args.output).resolve() if args.output else None
+    sys.path.insert(0, str(APP_PATH.parent))  # the page imports data_read and diagnostics as top-level modules
+    with workspace():
+        with stand_ins(args.model_latency, args.data_latency), shared_app_test_globals():
+            results = [run_level(level, args.rounds, args.chats, args.timeout) for level in args.levels]
+
+    report(results)
+    if output:
+        output.write_text(json.dumps(results, indent=4))
@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+
+from benchmarks import fixtures
+from benchmarks.cases import CASES
+
+
+BASELINES_FILE = Path(__file__).with_name("baselines.json")
+
+# A case regresses when it is slower or uses more memory than its baseline by
+# more than these fractions; memory must also grow by more than the floor (allocator noise)
+TIME_TOLERANCE = 0.5
+MEMORY_TOLERANCE = 0.25
+MIN_MEMORY_DELTA_KIB = 64
+
+# Each case is timed in this many rounds of its repeat count; the median round is kept
+ROUNDS = 5
+
+# Files the app reads from data/ at import time
+DATA_FILES = ("config.json", "listings.json")
+
+# Secrets the app reads at import time (the refresh pipeline and the chatbot), never used to call anything
+STUB_SECRETS = '[general]\ngemini_api_key = "benchmark"\nNEWSAPI_KEY = "benchmark"\n'
+
+
+@contextmanager
+def workspace():
+    """
+    Runs the cases in a temporary copy of the repo's data/ folder with fixture
+    snapshots and stub secrets, so nothing is downloaded and the real
+    snapshots and secrets are left alone.
+    """
+    root = Path(__file__).resolve().parent.parent
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        data = Path(directory) / "data"
+        data.mkdir()
+        for name in DATA_FILES:
+            shutil.copy(root / "data" / name, data / name)
+        fixtures.write_snapshots(data)
+        # Streamlit reads secrets from the working directory
+        secrets = Path(directory) / ".streamlit"
+        secrets.mkdir()
+        (secrets / "secrets.toml").write_text(STUB_SECRETS)
+        sys.path.insert(0, str(root))
+        os.chdir(directory)
+        try:
+            yield
+        finally:
+            os.chdir(previous)
+            sys.path.remove(str(root))
+
+
+def measure(run, repeat, rounds=ROUNDS):
+    """
+    Wall time of one call, as the median over `rounds` rounds of each round's
+    median of `repeat` calls, after a warm-up call; then the peak traced
+    memory of one call. A slow spell of the machine only spoils a round.
+    """
+    run()
+    round_times = []
+    for _ in range(rounds):
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - started)
+        round_times.append(statistics.median(times))
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"time_ms": round(statistics.median(round_times) * 1000, 3), "peak_kib": round(peak / 1024, 1)}
+
+
+def run_cases(names, repeat=None, rounds=ROUNDS):
+    """Returns name -> measurement, or {'skipped': reason} / {'error': message}."""
+    results = {}
+    with workspace():
+        for name in names:
+            setup, default_repeat = CASES[name]
+            try:
+                with setup() as run:
+                    results[name] = measure(run, repeat or default_repeat, rounds)
+            except ImportError as e:
+                results[name] = {"skipped": str(e)}
+            except Exception as e:
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+    return results
+
+
+def compare(result, baseline, time_tolerance, memory_tolerance):
+    """Returns the list of ways `result` regressed against `baseline`."""
+    problems = []
+    time_delta = result["time_ms"] - baseline["time_ms"]
+    if time_delta > baseline["time_ms"] * time_tolerance:
+        problems.append(f"time {baseline['time_ms']:.2f} -> {result['time_ms']:.2f} ms")
+    memory_delta = result["peak_kib"] - baseline["peak_kib"]
+    if memory_delta > baseline["peak_kib"] * memory_tolerance and memory_delta > MIN_MEMORY_DELTA_KIB:
+        problems.append(f"peak memory {baseline['peak_kib']:.0f} -> {result['peak_kib']:.0f} KiB")
+    return problems
+
+
+def load_baselines():
+    if not BASELINES_FILE.exists():
+        return {}
+    with open(BASELINES_FILE, "r") as file:
+        return json.load(file)["cases"]
+
+
+def save_baselines(results):
+    cases = load_baselines()
+    cases.update({name: result for name, result in results.items() if "time_ms" in result})
+    with open(BASELINES_FILE, "w") as file:
+        json.dump({
+            "recorded": date.today().isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cases": dict(sorted(cases.items())),
+        }, file, indent=4)
+        file.write("\n")
+
+
+def report(results, baselines, time_tolerance, memory_tolerance):
+    """Prints one line per case and returns the number of failures."""
+    failures = 0
+    width = max(len(name) for name in results)
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"{name:<{width}}  skipped ({result['skipped']})")
+            continue
+        if "error" in result:
+            failures += 1
+            print(f"{name:<{width}}  ERROR {result['error']}")
+            continue
+        line = f"{name:<{width}}  {result['time_ms']:>9.3f} ms  {result['peak_kib']:>9.1f} KiB"
+        baseline = baselines.get(name)
+        if baseline is None:
+            print(f"{line}  (no baseline)")
+            continue
+        problems = compare(result, baseline, time_tolerance, memory_tolerance)
+        failures += bool(problems)
+        status = "REGRESSED: " + ", ".join(problems) if problems else f"ok ({result['time_ms'] / baseline['time_ms']:.2f}x time)"
+        print(f"{line}  {status}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the app's hot paths on offline fixtures and compare with the baselines.")
+    parser.add_argument("-k", "--filter", default="", help="Only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, help="Timed calls per round (default: per case)")
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="Rounds per case; the median round is kept")
+    parser.add_argument("--update", action="store_true", help=f"Record the results as the new baselines in {BASELINES_FILE.name}")
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE)
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if args.filter in name]
+    if not names:
+        parser.error(f"No case matches '{args.filter}'. Cases: {', '.join(CASES)}")
+    results = run_cases(names, args.repeat, args.rounds)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=4)
+
+    if args.update:
+        save_baselines(results)
+        failures = report(results, {}, args.time_tolerance, args.memory_tolerance)
+        print(f"Baselines written to {BASELINES_FILE}")
+    else:
+        failures = report(results, load_baselines(), args.time_tolerance, args.memory_tolerance)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,101 @@
+"""
+Local stand-ins for the Gemini model and yfinance, with simulated latency,
+so the load test exercises the app without any upstream.
+"""
+import json
+import random
+import re
+import time
+import zlib
+
+import pandas as pd
+
+from benchmarks import fixtures
+
+
+# Daily bars returned for each yfinance period
+PERIOD_BARS = {
+    "1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "ytd": 200,
+    "1y": 252, "2y": 504, "5y": 1260, "10y": 2520, "max": 2520,
+}
+
+
+def _wait(latency):
+    """Sleeps for the latency give or take 50%, like a real round trip."""
+    if latency > 0:
+        time.sleep(latency * random.uniform(0.5, 1.5))
+
+
+def _history(symbol, period):
+    bars = PERIOD_BARS.get(period, 252)
+    close = fixtures.price_history(max(bars, 2), seed=zlib.crc32(symbol.encode()))
+    return close.iloc[-bars:]
+
+
+class LocalTicker:
+    """Stand-in for yf.Ticker; history() returns fixture closes and volumes."""
+
+    latency = 0.2
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, period="1mo", **kwargs):
+        _wait(self.latency)
+        close = _history(self.symbol, period)
+        return pd.DataFrame({"Close": close, "Volume": 1_000_000.0})
+
+
+def local_download(tickers, period="1mo", latency=0.2, **kwargs):
+    """Stand-in for yf.download: one frame with (field, symbol) columns, like a batched download."""
+    _wait(latency)
+    symbols = tickers.split() if isinstance(tickers, str) else list(tickers)
+    close = pd.concat({symbol: _history(symbol, period).tz_localize(None) for symbol in symbols}, axis=1)
+    volume = pd.DataFrame(1_000_000.0, index=close.index, columns=close.columns)
+    return pd.concat({"Close": close, "Volume": volume}, axis=1)
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class LocalModel:
+    """
+    Stand-in for genai.GenerativeModel.
+
+    Routing prompts get a get_stock_price call for the last ticker-like word
+    of the user input (indicator names come before it), or no call; other
+    prompts get a fixed answer, streamed in chunks when asked to.
+    """
+
+    def __init__(self, latency=0.5, chunks=8):
+        self.latency = latency
+        self.chunks = chunks
+        self.calls = 0
+
+    def _route(self, prompt):
+        user_input = prompt.split("User Input:", 1)[-1].split("Instructions:", 1)[0]
+        tickers = re.findall(r"\b[A-Z]{2,5}\b", user_input)
+        if not tickers:
+            return "{}"
+        call = {"function_to_call": "get_stock_price", "parameters": {"ticker": tickers[-1]}}
+        return "```json\n" + json.dumps({"tool_calls": [call]}) + "\n```"
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        if "Available Functions:" in prompt:
+            _wait(self.latency)
+            return _Response(self._route(prompt))
+        answer = "Markets were mixed today as investors weighed earnings against rate expectations. "
+        if not stream:
+            _wait(self.latency)
+            return _Response(answer)
+        return self._stream(answer)
+
+    def _stream(self, answer):
+        words = answer.split(" ")
+        size = max(1, len(words) // self.chunks)
+        for start in range(0, len(words), size):
+            _wait(self.latency / self.chunks)
+            yield _Response(" ".join(words[start:start + size]) + " ")
@@ -0,0 +1,257 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from chatbot.indicators import ema, rsi, sma
+from data.resilience import yahoo_download
+
+
+AVERAGES = {"ema": ema, "sma": sma}
+
+# Windows tried when the chatbot is asked for the best crossover or RSI strategy
+DEFAULT_FAST = tuple(range(5, 55, 5))
+DEFAULT_SLOW = tuple(range(20, 210, 10))
+DEFAULT_RSI_WINDOWS = (7, 14, 21)
+DEFAULT_RSI_LOWER = (20, 25, 30, 35)
+DEFAULT_RSI_UPPER = (65, 70, 75, 80)
+
+# Parameter sets evaluated per block of arrays, which bounds memory to
+# CHUNK x bars x tickers floats whatever the size of the grid
+CHUNK = 32
+
+
+def fetch_history(symbols, period="5y", priority="interactive"):
+    """
+    Downloads daily closes of every symbol in one batched request.
+
+    Returns:
+        DataFrame: One column per symbol with data, in the order given, indexed by calendar date
+    """
+    symbols = list(symbols)
+    frame = yahoo_download(symbols, priority, period=period, interval="1d", progress=False, threads=True)
+    close = frame["Close"]
+    if isinstance(close, pd.Series):
+        close = close.to_frame(symbols[0])
+    close = close.reindex(columns=symbols).dropna(axis=1, how="all")
+    # Exchanges report in different timezones, so align on dates
+    close.index = pd.DatetimeIndex(close.index.date)
+    return close.groupby(level=0).last()
+
+
+def _periods_per_year(index):
+    """Bars per year of a daily index: about 252 for stocks, 365 for crypto."""
+    days = (index[-1] - index[0]).days if len(index) > 1 else 0
+    return (len(index) - 1) / days * 365.25 if days else 252
+
+
+def _daily_returns(close):
+    """Simple returns of a (bars, tickers) array; 0 on the first bar and before a ticker has prices."""
+    returns = np.zeros_like(close)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = close[1:] / close[:-1] - 1
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def _hold(signals):
+    """
+    Forward-fills entry (1) and exit (0) signals along the bar axis, so a
+    position is held until the opposite signal; flat before the first one.
+    """
+    bars = np.arange(signals.shape[1]).reshape(1, -1, 1)
+    last_signal = np.where(np.isnan(signals), 0, bars)
+    np.maximum.accumulate(last_signal, axis=1, out=last_signal)
+    return np.nan_to_num(np.take_along_axis(signals, last_signal, axis=1))
+
+
+def _metrics(positions, returns, cost, periods_per_year):
+    """
+    Performance of (sets, bars, tickers) positions, each decided at a close and
+    held over the next bar. Returns a dict of (sets, tickers) arrays.
+    """
+    turnover = np.abs(np.diff(positions, axis=1, prepend=0))
+    net = positions[:, :-1] * returns[1:] - turnover[:, :-1] * cost
+    equity = np.exp(np.cumsum(np.log1p(net), axis=1))
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), 1)
+    std = net.std(axis=1, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, net.mean(axis=1) / std * np.sqrt(periods_per_year), 0.0)
+    return {
+        "total_return": (equity[:, -1] - 1) * 100,
+        "sharpe": sharpe,
+        "max_drawdown": (equity / peak - 1).min(axis=1) * 100,
+        "trades": (np.diff(positions, axis=1, prepend=0) > 0).sum(axis=1),
+        "exposure": positions[:, :-1].mean(axis=1) * 100,
+    }
+
+
+def _results(labels, params, tickers, metrics):
+    """One row per parameter set and ticker."""
+    count = len(tickers)
+    frame = pd.DataFrame({"strategy": np.repeat(labels, count)})
+    for name, values in params.items():
+        frame[name] = np.repeat(values, count)
+    frame["ticker"] = np.tile(tickers, len(labels))
+    for name, values in metrics.items():
+        frame[name] = values.ravel()
+    return frame
+
+
+def _run(prices, compute_positions, sets, cost_bps, periods_per_year):
+    """Evaluates `compute_positions(block)` for blocks of parameter sets and stacks the metrics."""
+    close = prices.ffill().to_numpy(dtype=float)
+    returns = _daily_returns(close)
+    periods_per_year = periods_per_year or _periods_per_year(prices.index)
+    blocks = [
+        _metrics(compute_positions(sets[start:start + CHUNK]), returns, cost_bps / 10000, periods_per_year)
+        for start in range(0, len(sets), CHUNK)
+    ]
+    return {name: np.concatenate([block[name] for block in blocks]) for name in blocks[0]}
+
+
+def crossover_grid(prices, fast_windows, slow_windows, kind="ema", cost_bps=0, periods_per_year=None):
+    """
+    Backtests a moving average crossover for every fast/slow window pair and every ticker.
+
+    The strategy is long while the fast average is above the slow one and flat
+    otherwise. Each distinct window is averaged once for all tickers; the pairs
+    are then compared as whole arrays, with no loop over bars.
+
+    Args:
+        prices (DataFrame): Daily closes, one column per ticker
+        fast_windows (list): Fast average windows, in bars
+        slow_windows (list): Slow average windows; only pairs with fast < slow are run
+        kind (str): 'ema' or 'sma'
+        cost_bps (float): Cost of each entry or exit, in basis points
+        periods_per_year (float): Bars per year for the Sharpe ratio; estimated from the index if omitted
+
+    Returns:
+        DataFrame: One row per pair and ticker with total return, Sharpe, max drawdown,
+        number of trades and exposure (percent of bars in the market)
+    """
+    if kind not in AVERAGES:
+        raise ValueError(f"Unknown moving average '{kind}', expected one of: {', '.join(AVERAGES)}.")
+    pairs = np.array([(fast, slow) for fast in fast_windows for slow in slow_windows if fast < slow], dtype=int).reshape(-1, 2)
+    if len(pairs) == 0:
+        raise ValueError("The fast window must be shorter than the slow window.")
+
+    close = prices.ffill()
+    windows = np.unique(pairs)
+    averages = np.stack([AVERAGES[kind](close, window).to_numpy(dtype=float) for window in windows])
+    bars = np.arange(len(close)).reshape(1, -1, 1)
+
+    def positions(block):
+        fast, slow = np.searchsorted(windows, block[:, 0]), np.searchsorted(windows, block[:, 1])
+        long = averages[fast] > averages[slow]
+        # No signal until the slow average covers a full window
+        long &= bars >= block[:, 1].reshape(-1, 1, 1) - 1
+        return long.astype(float)
+
+    metrics = _run(prices, positions, pairs, cost_bps, periods_per_year)
+    labels = [f"{fast}/{slow}-day {kind.upper()} crossover" for fast, slow in pairs]
+    return _results(labels, {"fast": pairs[:, 0], "slow": pairs[:, 1]}, list(prices.columns), metrics)
+
+
+def rsi_grid(prices, windows=(14,), lower=(30,), upper=(70,), cost_bps=0, periods_per_year=None):
+    """
+    Backtests an RSI threshold strategy for every window and threshold combination and every ticker.
+
+    The strategy buys when the RSI falls below `lower` and sells when it rises
+    above `upper`, holding in between. Entries and exits are turned into
+    positions with a vectorized forward fill.
+
+    Args:
+        prices (DataFrame): Daily closes, one column per ticker
+        windows (list): RSI windows, in bars
+        lower (list): Oversold thresholds to buy below
+        upper (list): Overbought thresholds to sell above; only combinations with lower < upper are run
+        cost_bps (float): Cost of each entry or exit, in basis points
+        periods_per_year (float): Bars per year for the Sharpe ratio; estimated from the index if omitted
+
+    Returns:
+        DataFrame: Same columns as crossover_grid, with window, lower and upper instead of fast and slow
+    """
+    sets = np.array(
+        [(window, low, high) for window in windows for low in lower for high in upper if low < high], dtype=float
+    ).reshape(-1, 3)
+    if len(sets) == 0:
+        raise ValueError("The lower RSI threshold must be below the upper one.")
+
+    close = prices.ffill()
+    distinct = np.unique(sets[:, 0])
+    values = np.stack([rsi(close, int(window)).to_numpy(dtype=float) for window in distinct])
+    bars = np.arange(len(close)).reshape(1, -1, 1)
+
+    def positions(block):
+        window, low, high = (block[:, column].reshape(-1, 1, 1) for column in range(3))
+        block_rsi = values[np.searchsorted(distinct, block[:, 0])]
+        signals = np.where(block_rsi < low, 1.0, np.where(block_rsi > high, 0.0, np.nan))
+        signals[np.broadcast_to(bars < window, signals.shape)] = np.nan
+        return _hold(signals)
+
+    metrics = _run(prices, positions, sets, cost_bps, periods_per_year)
+    sets = sets.astype(int)
+    labels = [f"{window}-day RSI {low}/{high} strategy" for window, low, high in sets]
+    params = {"window": sets[:, 0], "lower": sets[:, 1], "upper": sets[:, 2]}
+    return _results(labels, params, list(prices.columns), metrics)
+
+
+def buy_and_hold(prices, cost_bps=0, periods_per_year=None):
+    """Metrics of holding every ticker over the whole period, one row per ticker."""
+    metrics = _run(prices, lambda block: np.ones((len(block), len(prices), prices.shape[1])), [None], cost_bps, periods_per_year)
+    return _results(["buy-and-hold"], {}, list(prices.columns), metrics).set_index("ticker")
+
+
+def describe(results, hold, period):
+    """
+    Puts the best strategy per ticker (by Sharpe ratio) and buy-and-hold into
+    one sentence per ticker.
+    """
+    sentences = []
+    searched = results["strategy"].nunique()
+    best = results.sort_values("sharpe", ascending=False, kind="stable").groupby("ticker", sort=False).head(1)
+    for row in best.set_index("ticker").reindex(hold.index).itertuples():
+        benchmark = hold.loc[row.Index]
+        choice = f"the best of {searched} strategies by Sharpe, a {row.strategy}," if searched > 1 else f"a {row.strategy}"
+        verdict = "beat" if row.total_return > benchmark.total_return else "trailed"
+        sentences.append(
+            f"On {row.Index} over {period}, {choice} returned {row.total_return:+.1f}% "
+            f"(Sharpe {row.sharpe:.2f}, max drawdown {row.max_drawdown:.1f}%, {row.trades} trades) and {verdict} "
+            f"buy-and-hold at {benchmark.total_return:+.1f}% (Sharpe {benchmark.sharpe:.2f}, "
+            f"max drawdown {benchmark.max_drawdown:.1f}%)."
+        )
+    return " ".join(sentences)
+
+
+def synthetic_prices(tickers, bars, seed=0):
+    """Random-walk daily closes on business days, for benchmarks and offline checks."""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0004, 0.018, size=(bars, tickers))
+    index = pd.bdate_range(end="2024-12-31", periods=bars)
+    return pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=index, columns=[f"T{i:03d}" for i in range(tickers)])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure backtest grid throughput on synthetic prices.")
+    parser.add_argument("--tickers", type=int, default=30)
+    parser.add_argument("--bars", type=int, default=1260, help="Daily bars per ticker (1260 is about 5 years)")
+    parser.add_argument("--kind", choices=list(AVERAGES), default="ema")
+    parser.add_argument("--cost-bps", type=float, default=5)
+    args = parser.parse_args()
+
+    prices = synthetic_prices(args.tickers, args.bars)
+    runs = [
+        ("Crossover", lambda: crossover_grid(prices, DEFAULT_FAST, DEFAULT_SLOW, args.kind, args.cost_bps)),
+        ("RSI", lambda: rsi_grid(prices, DEFAULT_RSI_WINDOWS, DEFAULT_RSI_LOWER, DEFAULT_RSI_UPPER, args.cost_bps)),
+    ]
+    for name, run in runs:
+        started = time.perf_counter()
+        results = run()
+        elapsed = time.perf_counter() - started
+        backtests = len(results)
+        print(
+            f"{name} grid: {backtests // args.tickers} parameter sets x {args.tickers} tickers x {args.bars} bars "
+            f"in {elapsed:.2f}s = {backtests / elapsed:,.0f} backtests/s, "
+            f"{backtests * args.bars / elapsed / 1e6:,.1f}M bars/s"
+        )
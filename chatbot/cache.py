@@ -0,0 +1,135 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Words that don't change what a question is asking for
+STOPWORDS = {
+    "a", "an", "the", "of", "for", "is", "are", "what", "whats", "show", "me", "please",
+    "give", "tell", "can", "you", "i", "want", "to", "get", "current", "latest", "now", "today",
+    "how", "much", "in", "on", "and", "stock", "share", "value", "check",
+}
+
+
+def normalize_query(text):
+    """
+    Normalizes a chat message into a cache key.
+
+    Case, punctuation and filler words are dropped. When the message holds at
+    most one number, word order is ignored too ("AAPL price?" and "price of aapl"
+    share a key); with several numbers the order is kept so "20 and 50 day" and
+    "50 and 20 day" stay distinct.
+    """
+    words = (w.removesuffix("'s") for w in re.findall(r"[a-z0-9.\-^']+", text.lower()))
+    tokens = [w for w in words if w and w not in STOPWORDS]
+    if sum(t.replace(".", "", 1).isdigit() for t in tokens) <= 1:
+        tokens = sorted(tokens)
+    return " ".join(tokens)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after a time-to-live.
+    """
+
+    def __init__(self, maxsize=512, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class SemanticCache:
+    """
+    Similarity tier for paraphrases: keeps unit-normalized embeddings in one
+    matrix so a lookup is a single matrix-vector product.
+    """
+
+    def __init__(self, embed, maxsize=256, ttl=3600, threshold=0.92):
+        self.embed = embed
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self._vectors = None
+        self._entries = []  # (expires, text, value) per matrix row
+        self._lock = threading.Lock()
+
+    def _vector(self, text):
+        vector = np.asarray(self.embed(text), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def get(self, text):
+        """Returns (matched_text, value) of the most similar live entry, or None."""
+        if not self._entries:
+            return None
+        vector = self._vector(text)
+        with self._lock:
+            scores = self._vectors @ vector
+            now = time.monotonic()
+            for row in np.argsort(scores)[::-1]:
+                if scores[row] < self.threshold:
+                    break
+                expires, matched_text, value = self._entries[row]
+                if expires >= now:
+                    return matched_text, value
+        return None
+
+    def set(self, text, value):
+        vector = self._vector(text)
+        with self._lock:
+            now = time.monotonic()
+            live = [i for i, entry in enumerate(self._entries) if entry[0] >= now][-(self.maxsize - 1):]
+            self._entries = [self._entries[i] for i in live] + [(now + self.ttl, text, value)]
+            rows = [self._vectors[live]] if live else []
+            self._vectors = np.vstack(rows + [vector[None, :]])
+
+
+def decision_matches(decision, normalized_text):
+    """
+    Checks that a cached routing decision fits a new message: every parameter
+    value must appear in the message and every number in the message must be
+    one of the parameters. Stops "AAPL price" from answering "MSFT price".
+    """
+    tokens = set(normalized_text.split())
+    values = set()
+    for call in decision.get("tool_calls", []):
+        for value in (call.get("parameters") or {}).values():
+            items = value if isinstance(value, list) else [value]
+            values.update(str(item).lower() for item in items)
+    numbers = {t for t in tokens if t.replace(".", "", 1).isdigit()}
+    return values <= tokens and numbers <= values
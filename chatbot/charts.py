@@ -0,0 +1,183 @@
+import io
+
+import numpy as np
+from matplotlib.figure import Figure
+
+from chatbot.indicators import ema, sma
+
+# Every chart is rendered at the same size, so the pixel width is also the
+# largest number of points that can actually show up on screen.
+FIGSIZE = (10, 5)
+DPI = 100
+MAX_POINTS = FIGSIZE[0] * DPI
+
+
+# Overlay layers that can be drawn on top of a price series.
+# Each layer is computed on the full series before downsampling.
+OVERLAYS = {
+    'ma': {
+        'compute': sma,
+        'label': 'MA ({window} days)',
+        'style': {'linestyle': '--'},
+    },
+    'sma': {
+        'compute': sma,
+        'label': 'SMA ({window} days)',
+        'style': {'linewidth': 2},
+    },
+    'ema': {
+        'compute': ema,
+        'label': 'EMA ({window} days)',
+        'style': {'linewidth': 2, 'color': 'red'},
+    },
+}
+
+
+def lttb(x, y, threshold):
+    """
+    Downsamples a series with the Largest-Triangle-Three-Buckets algorithm.
+
+    Args:
+        x (np.ndarray): Monotonic x values (e.g. timestamps as integers)
+        y (np.ndarray): Values to downsample
+        threshold (int): Number of points to keep
+
+    Returns:
+        np.ndarray: Sorted indices of the points to keep
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # First and last points are always kept, the rest is split into buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average of the next bucket acts as the third vertex of the triangle
+        next_start = end
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        area = np.abs(
+            (x[a] - avg_x) * (bucket_y - y[a]) - (x[a] - bucket_x) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+
+    return keep
+
+
+def plot_price_chart(close_prices, title, label, ylabel, overlays=(), price_alpha=None, max_points=MAX_POINTS):
+    """
+    Plots a closing price series with optional overlay layers.
+
+    Args:
+        close_prices (pd.Series): Closing prices indexed by date
+        title (str): Chart title
+        label (str): Legend label of the price line
+        ylabel (str): Y axis label
+        overlays (list): (kind, window) pairs, kind being one of OVERLAYS
+        price_alpha (float): Optional transparency of the price line
+        max_points (int): Points drawn per line after LTTB downsampling
+
+    Returns:
+        Figure: The rendered matplotlib figure
+    """
+    close_prices = close_prices.dropna()
+    layers = []
+    for kind, window in overlays:
+        overlay = OVERLAYS[kind]
+        layers.append((
+            overlay['compute'](close_prices, window),
+            overlay['label'].format(window=window),
+            overlay['style'],
+        ))
+
+    # Pick the points once on the price line and reuse them for every layer
+    x = close_prices.index.asi8  # epoch integers, tz-aware or not
+    keep = lttb(x, close_prices.to_numpy(), max_points)
+    dates = close_prices.index[keep]
+
+    fig = Figure(figsize=FIGSIZE, dpi=DPI)
+    ax = fig.subplots()
+    price_style = {'alpha': price_alpha} if price_alpha is not None else {}
+    ax.plot(dates, close_prices.to_numpy()[keep], label=label, **price_style)
+    for values, layer_label, style in layers:
+        ax.plot(dates, values.to_numpy()[keep], label=layer_label, **style)
+
+    ax.set_title(title)
+    ax.set_xlabel('Date')
+    ax.set_ylabel(ylabel)
+    ax.grid(True)
+    ax.legend()
+    return fig
+
+
+def to_png(fig):
+    """Renders a figure to PNG bytes, which unlike the Figure itself can be shared between threads."""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+def plot_comparison(dates, tickers, normalized, drawdowns, correlation, period):
+    """
+    Plots normalized performance, drawdowns and the return correlation matrix of several tickers.
+
+    Args:
+        dates (pd.DatetimeIndex): Shared trading dates
+        tickers (list): Ticker symbols, one per column
+        normalized (np.ndarray): Prices rebased to 100, one column per ticker
+        drawdowns (np.ndarray): Drawdown from running peak in percent, one column per ticker
+        correlation (np.ndarray): Correlation matrix of daily returns
+        period (str): Time period for data
+
+    Returns:
+        Figure: The rendered matplotlib figure
+    """
+    fig = Figure(figsize=(FIGSIZE[0], FIGSIZE[1] * 2), dpi=DPI)
+    grid = fig.add_gridspec(2, 2, width_ratios=[3, 2])
+    perf_ax = fig.add_subplot(grid[0, :])
+    drawdown_ax = fig.add_subplot(grid[1, 0])
+    corr_ax = fig.add_subplot(grid[1, 1])
+
+    x = dates.asi8
+    for i, ticker in enumerate(tickers):
+        label = f'{ticker} ({normalized[-1, i] - 100:+.1f}%, max DD {drawdowns[:, i].min():.1f}%)'
+        keep = lttb(x, normalized[:, i], MAX_POINTS)
+        perf_ax.plot(dates[keep], normalized[keep, i], label=label)
+        keep = lttb(x, drawdowns[:, i], MAX_POINTS // 2)
+        drawdown_ax.plot(dates[keep], drawdowns[keep, i])
+
+    perf_ax.set_title(f'Normalized Performance Over {period} (start = 100)')
+    perf_ax.set_ylabel('Value')
+    perf_ax.grid(True)
+    perf_ax.legend()
+
+    drawdown_ax.set_title('Drawdown (%)')
+    drawdown_ax.grid(True)
+    drawdown_ax.tick_params(axis='x', labelrotation=30)
+
+    image = corr_ax.imshow(correlation, vmin=-1, vmax=1, cmap='RdYlGn')
+    corr_ax.set_xticks(range(len(tickers)), tickers, rotation=45)
+    corr_ax.set_yticks(range(len(tickers)), tickers)
+    for i in range(len(tickers)):
+        for j in range(len(tickers)):
+            corr_ax.text(j, i, f'{correlation[i, j]:.2f}', ha='center', va='center', fontsize=8)
+    corr_ax.set_title('Daily Return Correlation')
+    fig.colorbar(image, ax=corr_ax, fraction=0.046)
+
+    fig.tight_layout()
+    return fig
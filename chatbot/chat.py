@@ -1,24 +1,247 @@
 import json
+import time
+from collections import deque
+from statistics import median
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 import google.generativeai as genai
 from chatbot.functions import available_functions, functions
+from chatbot.cache import TTLCache, SemanticCache, normalize_query, decision_matches
+from chatbot import router
+from chatbot.formatting import format_result
+from chatbot.charts import to_png
 import streamlit as st # for secret api key
 
 # Configure the API key for generative AI
 genai.configure(api_key=st.secrets["general"]["gemini_api_key"])
 model = genai.GenerativeModel('gemini-pro')
 
+# Caches are shared by every session of the server process
+routing_cache = TTLCache(maxsize=1024, ttl=6 * 60 * 60)  # normalized input -> routing decision
+result_cache = TTLCache(maxsize=512, ttl=5 * 60)  # (function, params) -> function result, charts as PNG bytes
+answer_cache = TTLCache(maxsize=512, ttl=5 * 60)  # prompt -> model answer
 
-def process_user_input(user_input):
-    """Processes user input, extracts parameters, calls functions, and returns output."""
-    
-    prompt = f"""
+# How long a function result stays fresh, in seconds
+FUNCTION_CACHE_TTLS = {
+    "get_stock_price": 60,
+    "get_indian_stock_price": 60,
+    "get_crypto_price": 30,
+    "calculate_RSI": 15 * 60,
+    "plot_stock_price": 15 * 60,
+    "plot_indian_stock_price": 15 * 60,
+    "plot_crypto_price_graph": 15 * 60,
+    "plot_SMA": 15 * 60,
+    "plot_EMA": 15 * 60,
+    "compare_tickers": 30 * 60,
+    "backtest_strategy": 60 * 60,
+    "screen_stocks": 15 * 60,
+    "value_portfolio": 60,
+    "search_news": 5 * 60,
+    # Snapshot reads are local; the TTL only bounds staleness after a refresh
+    "get_market_movers": 60,
+    "get_market_volatility": 60,
+    "get_fear_greed_index": 60,
+    "get_market_news": 60,
+}
+
+
+@lru_cache(maxsize=256)
+def embed_text(text):
+    return tuple(genai.embed_content(model="models/text-embedding-004", content=text)["embedding"])
+
+
+# Results are worded locally from templates; set llm_rephrase = true to have the model word them instead
+LLM_REPHRASE = st.secrets["general"].get("llm_rephrase", False)
+
+# Optional paraphrase tier: costs one embedding request per routing cache miss
+semantic_cache = SemanticCache(embed_text) if st.secrets["general"].get("semantic_cache", False) else None
+
+# Time to first token and total latency of recent answers, per mode
+latency_log = deque(maxlen=500)
+
+
+def record_latency(mode, started, first_token, finished):
+    """Adds an answer's time to first token and total latency to latency_log, read by latency_summary()."""
+    latency_log.append({"mode": mode, "ttft": first_token - started, "total": finished - started})
+
+
+def latency_summary():
+    """Returns the median time to first token and total latency per mode, in seconds."""
+    summary = {}
+    for mode in ("stream", "blocking"):
+        rows = [row for row in latency_log if row["mode"] == mode]
+        if rows:
+            summary[mode] = {
+                "count": len(rows),
+                "ttft_p50": median(row["ttft"] for row in rows),
+                "total_p50": median(row["total"] for row in rows),
+            }
+    return summary
+
+
+# Functions whose result is a chart rather than a value; it is returned as PNG bytes
+PLOT_FUNCTIONS = {"plot_stock_price", "plot_crypto_price_graph", "plot_EMA", "plot_SMA", "plot_indian_stock_price", "compare_tickers"}
+
+# Tool calls of one message run side by side; each gets this many seconds
+MAX_TOOL_WORKERS = 4
+TOOL_CALL_TIMEOUT = 30
+
+
+def call_function(function_name, params):
+    """Calls a function from available_functions, reusing a fresh cached result if there is one."""
+    key = (function_name, json.dumps(params, sort_keys=True, default=str))
+    result = result_cache.get(key)
+    if result is None:
+        result = available_functions[function_name](**params)
+        if function_name in PLOT_FUNCTIONS:
+            # Cached results go to every session, and matplotlib can't draw one Figure from several threads
+            result = to_png(result)
+        result_cache.set(key, result, ttl=FUNCTION_CACHE_TTLS.get(function_name))
+    return result
+
+
+def run_tool_calls(tool_calls):
+    """
+    Runs a list of tool calls concurrently on a thread pool.
+
+    Args:
+        tool_calls (list): Dicts with "function_to_call" and "parameters"
+
+    Returns:
+        list: One (function_name, params, result, error) tuple per call, in order
+    """
+    outcomes = []
+    pool = ThreadPoolExecutor(max_workers=min(MAX_TOOL_WORKERS, len(tool_calls)))
+    try:
+        futures = []
+        for call in tool_calls:
+            function_name = call.get("function_to_call")
+            params = call.get("parameters") or {}
+            if function_name not in available_functions:
+                futures.append((function_name, params, None))
+            else:
+                futures.append((function_name, params, pool.submit(call_function, function_name, params)))
+
+        # Calls started together, so they share one deadline
+        deadline = time.monotonic() + TOOL_CALL_TIMEOUT
+        for function_name, params, future in futures:
+            if future is None:
+                outcomes.append((function_name, params, None, f"Function {function_name} not found."))
+                continue
+            try:
+                result = future.result(timeout=max(0, deadline - time.monotonic()))
+                outcomes.append((function_name, params, result, None))
+            except FuturesTimeoutError:
+                outcomes.append((function_name, params, None, f"{function_name} timed out after {TOOL_CALL_TIMEOUT}s."))
+            except Exception as e:
+                outcomes.append((function_name, params, None, f"Error executing {function_name}: {e}"))
+    finally:
+        # Don't let a hung call hold the answer back
+        pool.shutdown(wait=False, cancel_futures=True)
+    return outcomes
+
+
+def parse_model_json(text):
+    """Parses a JSON object from model output, tolerating markdown code fences around it."""
+    stripped = text.strip()
+    if stripped.startswith("```"):
+        stripped = stripped.split("\n", 1)[1] if "\n" in stripped else ""
+        stripped = stripped.rsplit("```", 1)[0]
+    try:
+        return json.loads(stripped)
+    except json.JSONDecodeError:
+        # Fall back to the outermost braces if the model added prose around the object
+        start, end = stripped.find("{"), stripped.rfind("}")
+        if start == -1 or end < start:
+            raise json.JSONDecodeError("No JSON object found", text, 0)
+        return json.loads(stripped[start:end + 1])
+
+
+def generate_text(prompt, cache_key=None, **kwargs):
+    """Sends a prompt to the model, answering repeated prompts from the cache."""
+    cache_key = cache_key or prompt
+    text = answer_cache.get(cache_key)
+    if text is None:
+        text = model.generate_content(prompt, **kwargs).text
+        answer_cache.set(cache_key, text)
+    return text
+
+
+def stream_text(prompt, started, cache_key=None, **kwargs):
+    """
+    Yields the model's answer chunk by chunk as it is generated.
+
+    The full answer is cached once the stream ends, and the latency is
+    recorded against `started` (a time.perf_counter() value).
+    """
+    cache_key = cache_key or prompt
+    text = answer_cache.get(cache_key)
+    if text is not None:
+        record_latency("stream", started, time.perf_counter(), time.perf_counter())
+        yield text
+        return
+
+    chunks = []
+    first_token = None
+    try:
+        for chunk in model.generate_content(prompt, stream=True, **kwargs):
+            if first_token is None:
+                first_token = time.perf_counter()
+            chunks.append(chunk.text)
+            yield chunk.text
+    except Exception as e:
+        yield f"\n\nAn error occurred: {str(e)}"
+        return
+    finished = time.perf_counter()
+    answer_cache.set(cache_key, "".join(chunks))
+    record_latency("stream", started, first_token or finished, finished)
+
+
+def route_user_input(user_input, memory=None):
+    """
+    Decides which functions a message needs.
+
+    Args:
+        user_input (str): The user's message
+        memory (ConversationMemory): Optional history used to resolve "it", "that", ...
+
+    Returns:
+        dict: {"tool_calls": [...]}, with an empty list if no function is required
+    """
+    # Unambiguous requests are resolved locally without a model round-trip
+    recent = memory.recent_symbols if memory is not None else None
+    decision, confidence = router.route(user_input, recent=recent)
+    if decision is not None and confidence >= router.CONFIDENCE_THRESHOLD:
+        return decision
+
+    # Messages pointing back at earlier turns mean something different in every conversation
+    context = memory.context() if memory is not None else ""
+    cacheable = not (context and router.has_reference(user_input))
+
+    key = normalize_query(user_input)
+    decision = routing_cache.get(key) if cacheable else None
+    if decision is not None:
+        return decision
+
+    if cacheable and semantic_cache is not None:
+        match = semantic_cache.get(key)
+        if match is not None and decision_matches(match[1], key):
+            routing_cache.set(key, match[1])
+            return match[1]
+
+    history = f"""
+    Conversation so far (use it to resolve references like "it" or "that"):
+    {context}
+""" if context else ""
+
+    prompt = f"""{history}
     User Input: {user_input}
 
     Instructions:
     1. Analyze the user's input and identify if it requires any of the following functions.
-    2. If a function is required, extract the necessary parameters (e.g., ticker, window).
-    3. Call the appropriate function with the extracted parameters.
-    4. Format the function's output into a human-readable sentence.
+    2. If functions are required, extract the necessary parameters (e.g., ticker, window) for each call.
+    3. A question may need several calls (e.g., prices of two tickers, or a price and a plot); list every call.
+    4. Format the functions' output into a human-readable sentence.
 
     Available Functions:
     {functions}
@@ -26,11 +249,16 @@ def process_user_input(user_input):
     Output:
     A JSON object with the following structure:
     {{
-        "function_to_call": "function_name",
-        "parameters": {{
-        "parameter_name": "parameter_value",
-        ...
-        }}
+        "tool_calls": [
+            {{
+                "function_to_call": "function_name",
+                "parameters": {{
+                "parameter_name": "parameter_value",
+                ...
+                }}
+            }},
+            ...
+        ]
     }}
 
     If no function is required, output an empty JSON object: {{}}
@@ -38,50 +266,144 @@ def process_user_input(user_input):
     # Send prompt to model and get response
     response = model.generate_content(prompt)  # Assuming `model.generate_content` returns a response object with `.text`
 
+    # Parse the response as JSON
+    response_json = parse_model_json(response.text)
+
+    tool_calls = response_json.get("tool_calls")
+    if tool_calls is None and response_json.get("function_to_call"):
+        # Single call in the original response format
+        tool_calls = [response_json]
+
+    decision = {"tool_calls": tool_calls or []}
+    if cacheable:
+        routing_cache.set(key, decision)
+        if semantic_cache is not None:
+            semantic_cache.set(key, decision)
+    return decision
+
+
+def summarize_conversation(summary, turns_text, max_words):
+    """Folds older conversation turns into the running summary."""
+    prompt = f"""
+    Current summary of a conversation with a financial market assistant:
+    {summary or "(empty)"}
+
+    Older messages to add to it:
+    {turns_text}
+
+    Write an updated summary in at most {max_words} words. Keep the tickers, numbers
+    and user preferences that later questions may refer to.
+    """
+    return model.generate_content(prompt).text.strip()
+
+
+def remember(memory, user_input, output, tool_calls):
+    """Adds a finished exchange to the conversation memory and compacts it if needed."""
+    parts = [output.get("text", "")]
+    parts += [f"[Showed a chart from {call.get('function_to_call')} with {call.get('parameters')}]"
+              for call in tool_calls if call.get("function_to_call") in PLOT_FUNCTIONS]
+    if output.get("error"):
+        parts.append(f"[Error: {output['error']}]")
+    memory.add_turn(user_input, "\n".join(part for part in parts if part), tool_calls)
+    memory.compact(summarize_conversation)
+
+
+def remember_stream(memory, user_input, output, tool_calls, chunks):
+    """Passes a response stream through, remembering the exchange once it is complete."""
+    text = []
+    for chunk in chunks:
+        text.append(chunk)
+        yield chunk
+    remember(memory, user_input, {**output, "text": "".join(text)}, tool_calls)
+
+
+def rephrase_results(user_input, values, stream=False, started=None):
+    """Asks the model to word function results as one answer, or a stream of it."""
+    results_text = "\n".join(
+        f"- {name} with parameters {params}: {result}" for name, params, result in values
+    )
+    follow_up_prompt = f"""
+    The user asked: {user_input}
+    The results of the function calls are:
+    {results_text}
+    Please rephrase these results in a short human-readable answer.
+    """
+    # Same results read the same whatever the wording of the question
+    if stream:
+        return stream_text(follow_up_prompt, started, cache_key=results_text)
+    return generate_text(follow_up_prompt, cache_key=results_text)
+
+
+def process_user_input(user_input, llm_rephrase=None, stream=False, memory=None):
+    """
+    Processes user input, extracts parameters, calls functions, and returns output.
+
+    Args:
+        user_input (str): The user's message
+        llm_rephrase (bool): Word function results with the model instead of the
+            local templates. Defaults to the llm_rephrase secret.
+        stream (bool): Return model-written text as a generator of chunks under
+            "stream" instead of waiting for the whole answer
+        memory (ConversationMemory): Optional per-session history; the exchange
+            is added to it
+    """
+    if llm_rephrase is None:
+        llm_rephrase = LLM_REPHRASE
+    started = time.perf_counter()
+
+    output, tool_calls = answer_user_input(user_input, llm_rephrase, stream, started, memory)
+    if memory is not None:
+        if "stream" in output:
+            output["stream"] = remember_stream(memory, user_input, output, tool_calls, output["stream"])
+        else:
+            remember(memory, user_input, output, tool_calls)
+    if "stream" not in output:
+        # Without streaming the first token shows up with the rest of the answer
+        finished = time.perf_counter()
+        record_latency("stream" if stream else "blocking", started, finished, finished)
+    return output
+
+
+def answer_user_input(user_input, llm_rephrase, stream, started, memory=None):
+    """Returns the output dict for a message and the tool calls used to answer it."""
+    tool_calls = []
     try:
-        # Parse the response as JSON
-        response_json = json.loads(response.text)
+        tool_calls = route_user_input(user_input, memory)["tool_calls"]
 
-        function_name = response_json.get("function_to_call")
-        params = response_json.get("parameters", {})
+        if tool_calls:
+            outcomes = run_tool_calls(tool_calls)
 
-        if function_name:
-            try:
-                function = available_functions.get(function_name)
-
-                if function:
-                    # Call the selected function with the parameters extracted
-                    result = function(**params)  # Call the function with unpacked parameters
-
-                    # Check if the result is a plot (based on function name)
-                    if function_name in ["plot_stock_price", "plot_crypto_price_graph", "plot_EMA", "plot_SMA","plot_indian_stock_price"]:
-                        # Return the plot object (matplotlib figure)
-                        return {"plot": result}
-                    else:
-                        # Return the result in a human-readable format
-                        follow_up_prompt = f"""
-            The result of the function call {function_name} with parameters {params} is: {result}.
-            Please rephrase this result in a human-readable sentence.
-            """
-                        follow_up_response = model.generate_content(follow_up_prompt)
-
-                       
-                        return {"text": follow_up_response.text}
+            plots = [result for name, params, result, error in outcomes if error is None and name in PLOT_FUNCTIONS]
+            values = [(name, params, result) for name, params, result, error in outcomes if error is None and name not in PLOT_FUNCTIONS]
+            errors = [error for name, params, result, error in outcomes if error is not None]
 
+            output = {}
+            if plots:
+                # Return the rendered charts (PNG bytes)
+                output["plots"] = plots
+            if values:
+                # Return all results in one human-readable answer
+                sentences = [format_result(name, params, result) for name, params, result in values]
+                if not llm_rephrase and all(sentences):
+                    output["text"] = " ".join(sentences)
+                elif stream:
+                    output["stream"] = rephrase_results(user_input, values, stream=True, started=started)
                 else:
-                    return {"error": f"Function {function_name} not found."}
-            except Exception as e:
-                return {"error": f"Error executing function: {e}"}
+                    output["text"] = rephrase_results(user_input, values)
+            if errors:
+                output["error"] = "\n".join(errors)
+            return output, tool_calls
         else:
             # If no function is called, generate a response from the model to display
-            own_response = model.generate_content(
-                user_input,
-                generation_config={"temperature": 0},  # Optional: Adjust temperature for response variability
-            )
-            return {"text": own_response.text}  # Return the model's response as text
+            context = memory.context() if memory is not None else ""
+            prompt = f"{context}\nUser: {user_input}" if context else user_input
+            generation_config = {"temperature": 0}  # Optional: Adjust temperature for response variability
+            if stream:
+                return {"stream": stream_text(prompt, started, generation_config=generation_config)}, tool_calls
+            own_response = generate_text(prompt, generation_config=generation_config)
+            return {"text": own_response}, tool_calls  # Return the model's response as text
 
-    except json.JSONDecodeError:
-        return {"error": f"Error decoding JSON from model response: {response.text}"}
+    except json.JSONDecodeError as e:
+        return {"error": f"Error decoding JSON from model response: {e.doc}"}, tool_calls
     except Exception as e:
-        return {"error": f"An error occurred: {str(e)}"}
-
+        return {"error": f"An error occurred: {str(e)}"}, tool_calls
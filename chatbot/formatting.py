@@ -0,0 +1,114 @@
+import math
+
+from chatbot.symbols import resolve_symbol
+
+
+EXCHANGE_NAMES = {"NS": "NSE", "BO": "BSE"}
+
+
+def _group_indian(digits):
+    """Groups an integer string the Indian way: last three digits, then pairs (12,34,567)."""
+    if len(digits) <= 3:
+        return digits
+    head, tail = digits[:-3], digits[-3:]
+    pairs = []
+    while len(head) > 2:
+        pairs.insert(0, head[-2:])
+        head = head[:-2]
+    return ",".join([head] + pairs + [tail])
+
+
+def format_number(value, decimals=2, indian=False):
+    """
+    Formats a number with thousands separators.
+
+    Args:
+        value (float): Number to format
+        decimals (int): Digits after the decimal point
+        indian (bool): Use lakh/crore grouping instead of groups of three
+    """
+    text = f"{abs(value):,.{decimals}f}"
+    if indian:
+        whole, _, fraction = text.replace(",", "").partition(".")
+        text = _group_indian(whole) + ("." + fraction if fraction else "")
+    return ("-" if value < 0 else "") + text
+
+
+def format_price(value, currency="USD"):
+    """Formats a price in USD or INR, keeping more decimals for prices below one unit."""
+    decimals = 2 if abs(value) >= 1 else 6
+    if currency == "INR":
+        return "₹" + format_number(value, decimals, indian=True)
+    return "$" + format_number(value, decimals)
+
+
+def currency_for(ticker):
+    """
+    NSE and BSE listings are quoted in rupees, everything else in dollars. The
+    ticker is resolved the way the price functions resolve it, so the currency
+    follows the symbol that was actually priced.
+    """
+    try:
+        symbol = resolve_symbol(ticker, ("US", "NSE"))
+    except ValueError:
+        return "USD"
+    return "INR" if symbol.endswith((".NS", ".BO")) else "USD"
+
+
+def _rsi_zone(rsi):
+    if rsi >= 70:
+        return "overbought"
+    if rsi <= 30:
+        return "oversold"
+    return "neutral"
+
+
+# Builds the answer sentence for a function from its parameters and numeric result
+TEMPLATES = {
+    "get_stock_price": lambda params, value: (
+        f"The latest price of {params['ticker'].upper()} is {format_price(value, currency_for(params['ticker']))}."
+    ),
+    "get_indian_stock_price": lambda params, value: (
+        f"The latest price of {params['ticker'].upper()} on "
+        f"{EXCHANGE_NAMES.get(params.get('exchange', 'NS'), params.get('exchange', 'NS'))} "
+        f"is {format_price(value, 'INR')}."
+    ),
+    "get_crypto_price": lambda params, value: (
+        f"The current price of {params['crypto_symbol'].upper()} is {format_price(value)}."
+    ),
+    "calculate_RSI": lambda params, value: (
+        f"The 14-day RSI of {params['ticker'].upper()} is {value:.2f}, which is {_rsi_zone(value)}."
+    ),
+}
+
+
+# Functions that already return a finished answer sentence
+SENTENCE_RESULTS = {
+    "backtest_strategy", "screen_stocks", "value_portfolio", "search_news", "get_market_movers",
+    "get_market_volatility", "get_fear_greed_index", "get_market_news",
+}
+
+
+def format_result(function_name, params, result):
+    """
+    Turns a function result into an answer sentence without calling the LLM.
+
+    Returns:
+        str: The sentence, or None if the function has no template or the
+        result isn't a number
+    """
+    if function_name in SENTENCE_RESULTS:
+        return str(result)
+    template = TEMPLATES.get(function_name)
+    if template is None:
+        return None
+    try:
+        value = float(result)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(value):
+        return None
+    try:
+        return template(params, value)
+    except KeyError:
+        return None
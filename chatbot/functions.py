@@ -1,9 +1,45 @@
-import yfinance as yf
-import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from chatbot import backtest, screener
+from chatbot.charts import plot_price_chart, plot_comparison
+from chatbot.formatting import format_price
+from chatbot.indicators import rsi
+from chatbot.portfolio import Portfolio, describe, parse_holdings
+from chatbot.symbols import index, resolve_symbol
+from data.resilience import check_symbol, mark_unknown_symbol, yahoo_history
+from data.news_archive import days_ago, news_archive
+from frontend import data_read as read
+
+# Upper bound on concurrent downloads for multi-ticker requests
+MAX_FETCH_WORKERS = 8
+
+# Markets searched when resolving names for each kind of function
+STOCK_MARKETS = ("US", "NSE")
+CRYPTO_MARKETS = ("crypto",)
+
+
+def _fetch_close_prices(symbol, period):
+    # Symbols Yahoo reported as unknown recently fail without another download
+    check_symbol(symbol)
+    history = yahoo_history(symbol, "interactive", period=period)
+    if history is None or history.empty:
+        suggestions = index.suggest(symbol.split(".")[0].removesuffix("-USD"))
+        hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+        message = f"No price data found for {symbol}.{hint}"
+        if history is None:
+            mark_unknown_symbol(symbol, message)
+        raise ValueError(message)
+    return history['Close']
+
+
+def _indian_symbol(ticker, exchange):
+    base = resolve_symbol(ticker.upper().removesuffix(".NS").removesuffix(".BO"), ("NSE",))
+    return f"{base.removesuffix('.NS')}.{exchange}"
 
 
 def get_stock_price(ticker):
-    return str(yf.Ticker(ticker).history(period='1y')['Close'].iloc[-1])
+    return str(_fetch_close_prices(resolve_symbol(ticker, STOCK_MARKETS), '1y').iloc[-1])
 
 
 def get_indian_stock_price(ticker, exchange='NS'):
@@ -15,8 +51,8 @@ def get_indian_stock_price(ticker, exchange='NS'):
         ticker (str): The stock ticker symbol (e.g., 'RELIANCE' for Reliance Industries)
         exchange (str): Exchange code - 'NS' for NSE or 'BO' for BSE
     """
-    modified_ticker = f"{ticker}.{exchange}"
-    return str(yf.Ticker(modified_ticker).history(period='1y')['Close'].iloc[-1])
+    modified_ticker = _indian_symbol(ticker, exchange)
+    return str(_fetch_close_prices(modified_ticker, '1y').iloc[-1])
 
 
 def plot_indian_stock_price(ticker, exchange='NS', window=None, period='1y'):
@@ -29,123 +65,290 @@ def plot_indian_stock_price(ticker, exchange='NS', window=None, period='1y'):
         window (int): Optional window size for moving average
         period (str): Time period for data
     """
-    modified_ticker = f"{ticker}.{exchange}"
-    data = yf.Ticker(modified_ticker).history(period=period)
-    close_prices = data['Close']
+    modified_ticker = _indian_symbol(ticker, exchange)
+    ticker = modified_ticker.split(".")[0]
+    return plot_price_chart(
+        _fetch_close_prices(modified_ticker, period),
+        title=f'{ticker} Stock Price Over {period}',
+        label=f'{ticker} Stock Price',
+        ylabel='Stock Price (₹)',
+        overlays=[('ma', window)] if window else [],
+    )
 
-    plt.figure(figsize=(10, 5))
-    plt.plot(close_prices.index, close_prices, label=f'{ticker} Stock Price')
 
-    if window:
-        ma = close_prices.rolling(window=window, min_periods=1).mean()
-        plt.plot(ma.index, ma, label=f'MA ({window} days)', linestyle='--')
+def plot_SMA(ticker, window=20, period='1y'):
+    ticker = resolve_symbol(ticker, STOCK_MARKETS)
+    return plot_price_chart(
+        _fetch_close_prices(ticker, period),
+        title=f'{ticker} Stock Price and {window}-Day SMA',
+        label=f'{ticker} Stock Price',
+        ylabel='Price ($)',
+        overlays=[('sma', window)],
+        price_alpha=0.7,
+    )
 
-    plt.title(f'{ticker} Stock Price Over {period}')
-    plt.xlabel('Date')
-    plt.ylabel('Stock Price (₹)')
-    plt.grid(True)
-    plt.legend()
-    return plt
 
+def plot_EMA(ticker, window=20, period='1y'):
+    ticker = resolve_symbol(ticker, STOCK_MARKETS)
+    return plot_price_chart(
+        _fetch_close_prices(ticker, period),
+        title=f'{ticker} Stock Price and {window}-Day EMA',
+        label=f'{ticker} Stock Price',
+        ylabel='Price ($)',
+        overlays=[('ema', window)],
+        price_alpha=0.7,
+    )
 
-def plot_SMA(ticker, window=20, period='1y'):
-    # Get stock data
-    data = yf.Ticker(ticker).history(period=period)
-    close_prices = data['Close']
 
-    # Calculate SMA
-    sma = close_prices.rolling(window=window, min_periods=1).mean()  # Added min_periods=1
+def calculate_RSI(ticker, period='1y'):
+    data = _fetch_close_prices(resolve_symbol(ticker, STOCK_MARKETS), period)
+    return str(rsi(data, window=14).iloc[-1])
 
-    # Create the plot
-    plt.figure(figsize=(10, 5))
-    plt.plot(close_prices.index, close_prices, label=f'{ticker} Stock Price', alpha=0.7)
-    plt.plot(sma.index, sma, label=f'SMA ({window} days)', linewidth=2)
-    plt.title(f'{ticker} Stock Price and {window}-Day SMA')
-    plt.xlabel('Date')
-    plt.ylabel('Price ($)')
-    plt.grid(True)
-    plt.legend()
-    return plt
 
+def plot_stock_price(ticker, window=None, period='1y'):
+    ticker = resolve_symbol(ticker, STOCK_MARKETS)
+    return plot_price_chart(
+        _fetch_close_prices(ticker, period),
+        title=f'{ticker} Stock Price Over {period}',
+        label=f'{ticker} Stock Price',
+        ylabel='Stock Price ($)',
+        overlays=[('ma', window)] if window else [],
+    )
 
-def plot_EMA(ticker, window=20, period='1y'):
-    # Get stock data
-    data = yf.Ticker(ticker).history(period=period)
-    close_prices = data['Close']
 
-    # Calculate EMA
-    ema = close_prices.ewm(span=window, adjust=False).mean()
+def get_crypto_price(crypto_symbol):
+    current_price = _fetch_close_prices(resolve_symbol(crypto_symbol, CRYPTO_MARKETS), '1d').iloc[-1]
+    return str(current_price)
 
-    # Create the plot
-    plt.figure(figsize=(10, 5))
-    plt.plot(close_prices.index, close_prices, label=f'{ticker} Stock Price', alpha=0.7)
-    plt.plot(ema.index, ema, label=f'EMA ({window} days)', linewidth=2, color='red')
-    plt.title(f'{ticker} Stock Price and {window}-Day EMA')
-    plt.xlabel('Date')
-    plt.ylabel('Price ($)')
-    plt.grid(True)
-    plt.legend()
-    return plt
 
+def plot_crypto_price_graph(crypto_symbol, window=None, period='1y'):
+    symbol = resolve_symbol(crypto_symbol, CRYPTO_MARKETS)
+    crypto_symbol = symbol.removesuffix("-USD")
+    return plot_price_chart(
+        _fetch_close_prices(symbol, period),
+        title=f'{crypto_symbol} Price Over {period}',
+        label=f'{crypto_symbol} Price',
+        ylabel='Price (USD)',
+        overlays=[('ma', window)] if window else [],
+    )
+
+
+def compare_tickers(tickers, period='1y'):
+    """
+    Compares several tickers over a period: normalized performance, drawdowns
+    and the correlation matrix of daily returns, rendered as one chart.
 
-def calculate_RSI(ticker, period='1y'):
-    data = yf.Ticker(ticker).history(period=period)['Close']
-    delta = data.diff()
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-    avg_gain = gain.rolling(window=14, min_periods=1).mean()
-    avg_loss = loss.rolling(window=14, min_periods=1).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return str(rsi.iloc[-1])
+    Args:
+        tickers (list): Ticker symbols (e.g., ['AAPL', 'MSFT', 'GOOG'])
+        period (str): Time period for data
+    """
+    if isinstance(tickers, str):
+        tickers = tickers.split(',')
+    # Names and tickers are resolved locally, so a typo fails before any download
+    tickers = list(dict.fromkeys(resolve_symbol(t) for t in tickers if t.strip()))
+    if len(tickers) < 2:
+        raise ValueError("At least two tickers are required for a comparison.")
+
+    # Download every ticker at the same time instead of one after another
+    with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(tickers))) as pool:
+        series = list(pool.map(lambda ticker: _fetch_close_prices(ticker, period), tickers))
+
+    # Align on calendar dates, since exchanges report in different timezones
+    for ticker, close_prices in zip(tickers, series):
+        if close_prices.empty:
+            raise ValueError(f"No price data found for {ticker}.")
+        close_prices.index = pd.DatetimeIndex(close_prices.index.date)
+    prices = pd.concat(series, axis=1, keys=tickers, join='inner').dropna()
+    if len(prices) < 2:
+        raise ValueError("The tickers have no overlapping trading days in this period.")
+
+    values = prices.to_numpy()
+    normalized = values / values[0] * 100
+    drawdowns = (values / np.maximum.accumulate(values, axis=0) - 1) * 100
+    returns = np.diff(np.log(values), axis=0)
+    correlation = np.corrcoef(returns, rowvar=False)
+
+    return plot_comparison(prices.index, tickers, normalized, drawdowns, correlation, period)
+
+
+def backtest_strategy(tickers, strategy='ema_crossover', fast=20, slow=50, rsi_window=14, lower=30, upper=70,
+                      period='5y', optimize=False):
+    """
+    Backtests a trading strategy on one or more tickers and compares it with
+    buy-and-hold: total return, Sharpe ratio and max drawdown.
 
+    Args:
+        tickers (list): Ticker symbols (e.g., ['AAPL', 'MSFT'])
+        strategy (str): 'ema_crossover', 'sma_crossover' or 'rsi'
+        fast (int): Fast moving average window, in days
+        slow (int): Slow moving average window, in days
+        rsi_window (int): RSI window, in days
+        lower (int): RSI level to buy below
+        upper (int): RSI level to sell above
+        period (str): Time period for data
+        optimize (bool): Search a grid of windows/thresholds and report the best by Sharpe ratio
+    """
+    if isinstance(tickers, str):
+        tickers = tickers.split(',')
+    symbols = list(dict.fromkeys(resolve_symbol(t) for t in tickers if t.strip()))
+    if not symbols:
+        raise ValueError("At least one ticker is required for a backtest.")
+    prices = backtest.fetch_history(symbols, period)
+    if prices.empty:
+        raise ValueError(f"No price data found for {', '.join(symbols)}.")
+
+    if strategy == 'rsi':
+        if optimize:
+            grid = (backtest.DEFAULT_RSI_WINDOWS, backtest.DEFAULT_RSI_LOWER, backtest.DEFAULT_RSI_UPPER)
+        else:
+            grid = ([int(rsi_window)], [int(lower)], [int(upper)])
+        results = backtest.rsi_grid(prices, *grid)
+    else:
+        kind = strategy.split('_')[0].lower()
+        fast_windows, slow_windows = (backtest.DEFAULT_FAST, backtest.DEFAULT_SLOW) if optimize else ([int(fast)], [int(slow)])
+        results = backtest.crossover_grid(prices, fast_windows, slow_windows, kind)
+
+    text = backtest.describe(results, backtest.buy_and_hold(prices), period)
+    missing = [symbol for symbol in symbols if symbol not in prices.columns]
+    if missing:
+        text += f" No price data found for {', '.join(missing)}."
+    return text
+
+
+def screen_stocks(filter, sort_by=None, descending=None, limit=10):
+    """
+    Screens the tracked US stocks with a filter over indicators, computed for
+    the whole universe from one batched download, and ranks the matches.
 
-def plot_stock_price(ticker, window=None, period='1y'):
-    data = yf.Ticker(ticker).history(period=period)
-    close_prices = data['Close']
+    Args:
+        filter (str): Condition such as 'rsi < 30 and price > sma_200'
+        sort_by (str): Field to rank by; defaults to the first field in the filter
+        descending (bool): Rank highest first
+        limit (int): Maximum number of matches to list
+    """
+    stocks = screener.get_screener()
+    matches, count = stocks.screen(filter, sort_by, descending, int(limit))
+    return screener.describe(matches, count, len(stocks), filter)
 
-    plt.figure(figsize=(10, 5))
-    plt.plot(close_prices.index, close_prices, label=f'{ticker} Stock Price')
 
-    if window:
-        # Add moving average if window is specified
-        ma = close_prices.rolling(window=window, min_periods=1).mean()  # Added min_periods=1
-        plt.plot(ma.index, ma, label=f'MA ({window} days)', linestyle='--')
+def value_portfolio(holdings):
+    """
+    Values a list of holdings in one batched price download: total value,
+    day change, P&L against the cost basis and the largest sector exposures.
 
-    plt.title(f'{ticker} Stock Price Over {period}')
-    plt.xlabel('Date')
-    plt.ylabel('Stock Price ($)')
-    plt.grid(True)
-    plt.legend()
-    return plt
+    Args:
+        holdings (list): Positions as {'ticker', 'quantity', 'cost_basis'} objects,
+            or a string like 'AAPL 10 @ 150, MSFT 5'
+    """
+    records = parse_holdings(holdings) if isinstance(holdings, str) else holdings
+    portfolio = Portfolio.from_records(records)
+    portfolio.refresh()
+    return describe(portfolio.summary())
 
 
-def get_crypto_price(crypto_symbol):
-    crypto_ticker = yf.Ticker(crypto_symbol + "-USD")
-    data = crypto_ticker.history(period='1d')
-    current_price = data['Close'].iloc[-1]
-    return str(current_price)
+def search_news(query, start_date=None, end_date=None, days=None, market=None):
+    """
+    Searches the local archive of past market news, best match first.
+
+    Args:
+        query (str): Keywords (e.g., 'Nvidia earnings')
+        start_date (str): Earliest publication date, YYYY-MM-DD
+        end_date (str): Latest publication date, YYYY-MM-DD
+        days (int): Only news from the last `days` days, instead of start_date
+        market (str): 'stock' or 'crypto'
+    """
+    if days and not start_date:
+        start_date = days_ago(int(days))
+    articles = news_archive.search(query, start_date, end_date, market)
+    if not articles:
+        return f"No archived news found for '{query}'."
+    lines = [f"News matching '{query}':"]
+    for number, article in enumerate(articles, 1):
+        published = article["published_at"][:10] or "undated"
+        lines.append(f"{number}. {article['title']} ({article['source']}, {published}) {article['url']}")
+    return "\n".join(lines)
 
 
-def plot_crypto_price_graph(crypto_symbol, window=None, period='1y'):
-    crypto_ticker = yf.Ticker(crypto_symbol + "-USD")
-    data = crypto_ticker.history(period=period)
-    close_prices = data['Close']
+def _snapshot_market(market):
+    """Maps 'stock'/'crypto' to the market names data_read uses."""
+    if str(market).lower() in ("crypto", "cryptocurrency", "cryptocurrencies"):
+        return "Crypto"
+    return "Stock"
+
 
-    plt.figure(figsize=(10, 5))
-    plt.plot(close_prices.index, close_prices, label=f'{crypto_symbol} Price')
+def _as_of(market):
+    # The snapshot the answer was read from, already parsed and cached by read_snapshot
+    snapshot = read.load_data(read.CRYPTO_FILE if market == "Crypto" else read.STOCK_FILE, refresh=False)
+    return f"(as of {snapshot.get('timestamp', 'Unknown')})"
 
-    if window:
-        # Add moving average if window is specified
-        ma = close_prices.rolling(window=window, min_periods=1).mean()  # Added min_periods=1
-        plt.plot(ma.index, ma, label=f'MA ({window} days)', linestyle='--')
 
-    plt.title(f'{crypto_symbol} Price Over {period}')
-    plt.xlabel('Date')
-    plt.ylabel('Price (USD)')
-    plt.grid(True)
-    plt.legend()
-    return plt
+# The snapshot functions below answer from the last data refresh and never call an upstream
+def get_market_movers(market='stock', direction='both', count=5):
+    """
+    Gets today's top gainers and/or losers from the latest market snapshot.
+
+    Args:
+        market (str): 'stock' or 'crypto'
+        direction (str): 'gainers', 'losers' or 'both'
+        count (int): Number of movers per direction
+    """
+    market = _snapshot_market(market)
+    parts = []
+    for name, fetch in (("gainers", read.fetch_top_gainers), ("losers", read.fetch_top_losers)):
+        if direction not in (name, "both"):
+            continue
+        rows = fetch(market, refresh=False)[:int(count)]
+        movers = "; ".join(
+            f"{row['Symbol'].upper()} ({row['Name']}) {row['Percent Change']:+.2f}% at {format_price(row['Current price'])}"
+            for row in rows
+        )
+        parts.append(f"Top {market.lower()} {name}: {movers or 'none'}.")
+    return f"{' '.join(parts)} {_as_of(market)}"
+
+
+def get_market_volatility(market='stock'):
+    """
+    Gets the market volatility from the latest snapshot: the VIX for stocks,
+    Bitcoin's 30-day volatility of daily returns for crypto.
+
+    Args:
+        market (str): 'stock' or 'crypto'
+    """
+    market = _snapshot_market(market)
+    volatility = read.fetch_market_volatility(market, refresh=False)
+    if market == "Crypto":
+        return f"Bitcoin's 30-day volatility of daily returns is {volatility}%. {_as_of(market)}"
+    return f"The VIX is at {float(volatility):.2f}. {_as_of(market)}"
+
+
+def get_fear_greed_index(market='stock'):
+    """
+    Gets the Fear & Greed Index (0 to 100) from the latest snapshot.
+
+    Args:
+        market (str): 'stock' or 'crypto'
+    """
+    market = _snapshot_market(market)
+    value = read.fetch_market_greed_meter(market, refresh=False)
+    label = read.fetch_market_greed_label(market, refresh=False)
+    return f"The {market.lower()} Fear & Greed Index is {value} ({label}). {_as_of(market)}"
+
+
+def get_market_news(market='stock', count=5):
+    """
+    Gets today's top market headlines from the latest snapshot.
+
+    Args:
+        market (str): 'stock' or 'crypto'
+        count (int): Number of headlines
+    """
+    market = _snapshot_market(market)
+    articles = read.fetch_market_news(market, refresh=False)[:int(count)]
+    if not articles:
+        return f"There are no {market.lower()} headlines in the latest snapshot. {_as_of(market)}"
+    lines = [f"Top {market.lower()} news {_as_of(market)}:"]
+    lines += [f"{number}. {article['title']} ({article.get('source', '')}) {article.get('url', '')}" for number, article in enumerate(articles, 1)]
+    return "\n".join(lines)
 
 
 # Update the functions list to include the new Indian stock functions
@@ -201,6 +404,11 @@ functions = [
                 'window': {
                     'type': 'integer',
                     'description': 'Optional window size for moving average.'
+                },
+                'period': {
+                    'type': 'string',
+                    'description': 'Time period for data (e.g., 6mo, 1y, 2y, 5y, max).',
+                    'default': '1y'
                 }
             },
             'required': ['ticker']
@@ -219,6 +427,11 @@ functions = [
                 'window': {
                     'type': 'integer',
                     'description': 'The window size for the moving average calculation.'
+                },
+                'period': {
+                    'type': 'string',
+                    'description': 'Time period for data (e.g., 6mo, 1y, 2y, 5y, max).',
+                    'default': '1y'
                 }
             },
             'required': ['ticker', 'window']
@@ -237,6 +450,11 @@ functions = [
                 'window': {
                     'type': 'integer',
                     'description': 'The window size for the moving average calculation.'
+                },
+                'period': {
+                    'type': 'string',
+                    'description': 'Time period for data (e.g., 6mo, 1y, 2y, 5y, max).',
+                    'default': '1y'
                 }
             },
             'required': ['ticker', 'window']
@@ -258,18 +476,263 @@ functions = [
     },
     {
         'name': 'plot_stock_price',
-        'description': 'Plots the stock price over the last year for a given ticker symbol.',
+        'description': 'Plots the stock price over a period (default: the last year) for a given ticker symbol, with an optional moving average.',
         'parameters': {
             'type': 'object',
             'properties': {
                 'ticker': {
                     'type': 'string',
                     'description': 'The stock ticker symbol for a company (e.g., MSFT for Microsoft).'
+                },
+                'window': {
+                    'type': 'integer',
+                    'description': 'Optional window size for moving average.'
+                },
+                'period': {
+                    'type': 'string',
+                    'description': 'Time period for data (e.g., 6mo, 1y, 2y, 5y, max).',
+                    'default': '1y'
                 }
             },
             'required': ['ticker']
         }
     },
+    {
+        'name': 'compare_tickers',
+        'description': 'Compares several stock or crypto tickers over a period: normalized performance, drawdowns and return correlation in one chart.',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'tickers': {
+                    'type': 'array',
+                    'items': {'type': 'string'},
+                    'description': 'The ticker symbols to compare (e.g., ["AAPL", "MSFT", "GOOG"]). Use BTC-USD style symbols for crypto.'
+                },
+                'period': {
+                    'type': 'string',
+                    'description': 'Time period for data (e.g., 6mo, 1y, 2y, 5y, max).',
+                    'default': '1y'
+                }
+            },
+            'required': ['tickers']
+        }
+    },
+    {
+        'name': 'backtest_strategy',
+        'description': 'Backtests a moving average crossover or RSI strategy on stock or crypto tickers and compares its return, Sharpe ratio and max drawdown with buy-and-hold. Can also search for the best windows or thresholds.',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'tickers': {
+                    'type': 'array',
+                    'items': {'type': 'string'},
+                    'description': 'The ticker symbols to backtest (e.g., ["AAPL"]). Use BTC-USD style symbols for crypto.'
+                },
+                'strategy': {
+                    'type': 'string',
+                    'enum': ['ema_crossover', 'sma_crossover', 'rsi'],
+                    'description': 'ema_crossover/sma_crossover: long while the fast average is above the slow one. rsi: buy below the lower level, sell above the upper one.',
+                    'default': 'ema_crossover'
+                },
+                'fast': {
+                    'type': 'integer',
+                    'description': 'Fast moving average window in days.',
+                    'default': 20
+                },
+                'slow': {
+                    'type': 'integer',
+                    'description': 'Slow moving average window in days.',
+                    'default': 50
+                },
+                'rsi_window': {
+                    'type': 'integer',
+                    'description': 'RSI window in days.',
+                    'default': 14
+                },
+                'lower': {
+                    'type': 'integer',
+                    'description': 'RSI level to buy below.',
+                    'default': 30
+                },
+                'upper': {
+                    'type': 'integer',
+                    'description': 'RSI level to sell above.',
+                    'default': 70
+                },
+                'period': {
+                    'type': 'string',
+                    'description': 'Time period for data (e.g., 1y, 2y, 5y, 10y, max).',
+                    'default': '5y'
+                },
+                'optimize': {
+                    'type': 'boolean',
+                    'description': 'Set when the user asks for the best windows or thresholds instead of specific ones.',
+                    'default': False
+                }
+            },
+            'required': ['tickers']
+        }
+    },
+    {
+        'name': 'screen_stocks',
+        'description': 'Finds which tracked US (Dow 30) stocks match conditions on price and indicators, ranked. Use for questions like "which Dow stocks have RSI below 30 and trade above their 200-day SMA?".',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'filter': {
+                    'type': 'string',
+                    'description': (
+                        "Condition using and/or/not, comparisons, + - * / and these fields: price, high_52w, low_52w, "
+                        "from_high (% below the 52-week high, negative), sector, name, sma_N, ema_N (N-day averages), "
+                        "rsi or rsi_N, change_Nd (% change over N days), volatility or volatility_N (annualized %). "
+                        "Quote text values. Example: \"rsi < 30 and price > sma_200 and sector == 'Financials'\"."
+                    )
+                },
+                'sort_by': {
+                    'type': 'string',
+                    'description': 'Optional field or expression to rank the matches by (e.g., change_5d).'
+                },
+                'descending': {
+                    'type': 'boolean',
+                    'description': 'Rank the highest values first.'
+                },
+                'limit': {
+                    'type': 'integer',
+                    'description': 'Maximum number of matches to list.',
+                    'default': 10
+                }
+            },
+            'required': ['filter']
+        }
+    },
+    {
+        'name': 'value_portfolio',
+        'description': 'Values a portfolio or watchlist of stock and crypto positions: total value, day change, profit and loss, and sector exposure.',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'holdings': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'ticker': {'type': 'string', 'description': 'Ticker symbol (e.g., AAPL, RELIANCE.NS, BTC-USD).'},
+                            'quantity': {'type': 'number', 'description': 'Number of shares or coins held.'},
+                            'cost_basis': {'type': 'number', 'description': 'Optional average purchase price per share or coin.'}
+                        },
+                        'required': ['ticker', 'quantity']
+                    },
+                    'description': 'The positions held.'
+                }
+            },
+            'required': ['holdings']
+        }
+    },
+    {
+        'name': 'search_news',
+        'description': 'Searches archived market news by keywords and publication date, e.g. for "what was the news on Nvidia last week".',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'query': {
+                    'type': 'string',
+                    'description': 'Keywords to search for (e.g., Nvidia earnings).'
+                },
+                'start_date': {
+                    'type': 'string',
+                    'description': 'Optional earliest publication date, YYYY-MM-DD.'
+                },
+                'end_date': {
+                    'type': 'string',
+                    'description': 'Optional latest publication date, YYYY-MM-DD.'
+                },
+                'days': {
+                    'type': 'integer',
+                    'description': 'Optional: only news from the last N days (e.g., 7 for last week).'
+                },
+                'market': {
+                    'type': 'string',
+                    'description': 'Optional market filter - stock or crypto.'
+                }
+            },
+            'required': ['query']
+        }
+    },
+    {
+        'name': 'get_market_movers',
+        'description': "Gets today's top gainers and/or losers of the stock market (US30) or the crypto market from the latest market snapshot.",
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'market': {
+                    'type': 'string',
+                    'description': 'The market - stock or crypto.',
+                    'default': 'stock'
+                },
+                'direction': {
+                    'type': 'string',
+                    'description': 'gainers, losers or both.',
+                    'default': 'both'
+                },
+                'count': {
+                    'type': 'integer',
+                    'description': 'Number of movers per direction (at most 5).',
+                    'default': 5
+                }
+            },
+            'required': []
+        }
+    },
+    {
+        'name': 'get_market_volatility',
+        'description': "Gets the current market volatility: the VIX for stocks, or Bitcoin's 30-day volatility for crypto.",
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'market': {
+                    'type': 'string',
+                    'description': 'The market - stock or crypto.',
+                    'default': 'stock'
+                }
+            },
+            'required': []
+        }
+    },
+    {
+        'name': 'get_fear_greed_index',
+        'description': 'Gets the current Fear & Greed Index (0 = extreme fear, 100 = extreme greed) of the stock or crypto market.',
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'market': {
+                    'type': 'string',
+                    'description': 'The market - stock or crypto.',
+                    'default': 'stock'
+                }
+            },
+            'required': []
+        }
+    },
+    {
+        'name': 'get_market_news',
+        'description': "Gets today's top news headlines of the stock or crypto market.",
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'market': {
+                    'type': 'string',
+                    'description': 'The market - stock or crypto.',
+                    'default': 'stock'
+                },
+                'count': {
+                    'type': 'integer',
+                    'description': 'Number of headlines (at most 5).',
+                    'default': 5
+                }
+            },
+            'required': []
+        }
+    },
     {
         'name': 'get_crypto_price',
         'description': 'Gets the current price of a specified cryptocurrency.',
@@ -286,13 +749,22 @@ functions = [
     },
     {
         'name': 'plot_crypto_price_graph',
-        'description': 'Plots the price graph of a specified cryptocurrency over the last year.',
+        'description': 'Plots the price graph of a specified cryptocurrency over a period (default: the last year), with an optional moving average.',
         'parameters': {
             'type': 'object',
             'properties': {
                 'crypto_symbol': {
                     'type': 'string',
                     'description': 'The cryptocurrency symbol (e.g., BTC for Bitcoin).'
+                },
+                'window': {
+                    'type': 'integer',
+                    'description': 'Optional window size for moving average.'
+                },
+                'period': {
+                    'type': 'string',
+                    'description': 'Time period for data (e.g., 6mo, 1y, 2y, 5y, max).',
+                    'default': '1y'
                 }
             },
             'required': ['crypto_symbol']
@@ -309,6 +781,15 @@ available_functions = {
     'plot_EMA': plot_EMA,
     'calculate_RSI': calculate_RSI,
     'plot_stock_price': plot_stock_price,
+    'compare_tickers': compare_tickers,
+    'backtest_strategy': backtest_strategy,
+    'screen_stocks': screen_stocks,
+    'value_portfolio': value_portfolio,
+    'search_news': search_news,
+    'get_market_movers': get_market_movers,
+    'get_market_volatility': get_market_volatility,
+    'get_fear_greed_index': get_fear_greed_index,
+    'get_market_news': get_market_news,
     'get_crypto_price': get_crypto_price,
     'plot_crypto_price_graph': plot_crypto_price_graph
 }
\ No newline at end of file
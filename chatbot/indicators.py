@@ -0,0 +1,27 @@
+"""
+Technical indicators shared by the charts, the chatbot functions and the backtester.
+
+Each takes a pandas Series (one ticker) or DataFrame (one column per ticker)
+of closing prices and returns the same shape.
+"""
+
+
+def sma(close, window):
+    """Simple moving average; the first window - 1 values average what is available."""
+    return close.rolling(window=window, min_periods=1).mean()
+
+
+def ema(close, window):
+    """Exponential moving average with span `window`."""
+    return close.ewm(span=window, adjust=False).mean()
+
+
+def rsi(close, window=14):
+    """Relative Strength Index (0 to 100) from simple moving averages of gains and losses."""
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    avg_gain = gain.rolling(window=window, min_periods=1).mean()
+    avg_loss = loss.rolling(window=window, min_periods=1).mean()
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
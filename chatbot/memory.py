@@ -0,0 +1,93 @@
+import math
+
+
+def count_tokens(text):
+    """Rough token count (about four characters per token), good enough for budgeting."""
+    return math.ceil(len(text) / 4)
+
+
+def symbols_from_calls(tool_calls):
+    """Returns (stock_tickers, crypto_symbols) used by a list of tool calls."""
+    stocks, cryptos = [], []
+    for call in tool_calls:
+        params = call.get("parameters") or {}
+        if "crypto_symbol" in params:
+            cryptos.append(str(params["crypto_symbol"]).upper())
+        if "ticker" in params:
+            ticker = str(params["ticker"]).upper()
+            if params.get("exchange") and "." not in ticker:
+                ticker = f"{ticker}.{params['exchange']}"
+            stocks.append(ticker)
+        tickers = params.get("tickers") or []
+        for ticker in tickers if isinstance(tickers, list) else []:
+            ticker = str(ticker).upper()
+            if ticker.endswith("-USD"):
+                cryptos.append(ticker.removesuffix("-USD"))
+            else:
+                stocks.append(ticker)
+    return list(dict.fromkeys(stocks)), list(dict.fromkeys(cryptos))
+
+
+class ConversationMemory:
+    """
+    Conversation history of one chat session, kept within a token budget.
+
+    Recent turns are kept word for word. Once they outgrow the budget, the
+    oldest ones are folded into a rolling summary, so the context sent with
+    each message stays the same size however long the conversation runs.
+    """
+
+    def __init__(self, token_budget=1200, summary_words=120):
+        self.token_budget = token_budget
+        self.summary_words = summary_words
+        self.summary = ""
+        self.turns = []  # (role, text), oldest first
+        self.recent_symbols = None  # (stock_tickers, crypto_symbols) of the last tool calls
+
+    def __len__(self):
+        return len(self.turns)
+
+    def tokens(self):
+        return count_tokens(self.summary) + sum(count_tokens(text) for role, text in self.turns)
+
+    def add_turn(self, user_text, assistant_text, tool_calls=None):
+        self.turns.append(("User", user_text))
+        self.turns.append(("Assistant", assistant_text))
+        if tool_calls:
+            stocks, cryptos = symbols_from_calls(tool_calls)
+            if stocks or cryptos:
+                self.recent_symbols = (stocks, cryptos)
+
+    def context(self):
+        """Returns the summary and recent turns as prompt text, or "" for a new conversation."""
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of the earlier conversation: {self.summary}")
+        parts += [f"{role}: {text}" for role, text in self.turns]
+        return "\n".join(parts)
+
+    def compact(self, summarize):
+        """
+        Folds the oldest turns into the summary once the budget is exceeded.
+
+        Turns are folded until half the budget is free, so the summarizer
+        runs once every few turns rather than on every message.
+
+        Args:
+            summarize (callable): summarize(summary, turns_text, max_words) -> new summary
+        """
+        if self.tokens() <= self.token_budget:
+            return
+        folded = []
+        while self.turns and self.tokens() > self.token_budget // 2:
+            folded.append(self.turns.pop(0))
+        turns_text = "\n".join(f"{role}: {text}" for role, text in folded)
+        try:
+            self.summary = summarize(self.summary, turns_text, self.summary_words)
+        except Exception as e:
+            print(f"Error summarizing conversation: {e}")
+            self.summary = f"{self.summary}\n{turns_text}".strip()
+        # The summary must never eat the whole budget on its own
+        words = self.summary.split()
+        if len(words) > self.summary_words:
+            self.summary = " ".join(words[-self.summary_words:])
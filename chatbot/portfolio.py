@@ -0,0 +1,253 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from chatbot.formatting import format_price
+from chatbot.symbols import index, resolve_symbol, ticker_markets
+from data.resilience import yahoo_download
+
+
+# Yahoo symbol of the USD/INR rate (rupees per dollar), used to value NSE/BSE positions in dollars
+USD_INR = "INR=X"
+
+
+def _last_valid(values, skip=0):
+    """Per column, the last non-NaN value (skip=0) or the one before it (skip=1)."""
+    valid = ~np.isnan(values)
+    remaining = valid[::-1].cumsum(axis=0)[::-1]  # valid rows at or after each row
+    hit = valid & (remaining == skip + 1)
+    rows = hit.argmax(axis=0)
+    return np.where(hit.any(axis=0), values[rows, np.arange(values.shape[1])], np.nan)
+
+
+def fetch_prices(symbols, priority="interactive"):
+    """
+    Downloads the latest and previous close of every symbol in one batched request.
+
+    Each symbol's own last two trading days are used, so US stocks, NSE stocks
+    and crypto with different calendars can share one download. A download
+    without a single price is how throttling looks, so it raises ConnectionError
+    and counts against the Yahoo breaker.
+
+    Returns:
+        tuple: (last, previous) float arrays aligned with `symbols`, NaN where Yahoo had no data
+    """
+    symbols = list(symbols)
+    frame = yahoo_download(symbols, priority, period="5d", interval="1d", progress=False, threads=True)
+    close = frame["Close"]
+    if isinstance(close, pd.Series):
+        close = close.to_frame(symbols[0])
+    values = close.reindex(columns=symbols).to_numpy(dtype=float)
+    return _last_valid(values), _last_valid(values, skip=1)
+
+
+def _differs(new, old):
+    return ~((new == old) | (np.isnan(new) & np.isnan(old)))
+
+
+# Positions hold resolved Yahoo symbols, so the exchange suffix alone decides the currency and listing
+def _currency(symbol):
+    return "INR" if symbol.endswith((".NS", ".BO")) else "USD"
+
+
+def _sector(symbol):
+    # A bare US ticker must not pick up the sector of an NSE listing with the same symbol (HAL)
+    listing = index.by_ticker(symbol, ticker_markets(symbol))
+    if listing is None:
+        return "Other"
+    if listing.market == "crypto":
+        return "Crypto"
+    return listing.sector or "Other"
+
+
+class Portfolio:
+    """
+    Positions held in contiguous numpy arrays and valued in dollars.
+
+    Prices are kept per unique symbol and mapped to positions through an index
+    array, so several lots of one ticker share a price. After the first full
+    valuation, update_prices() only recomputes the positions whose price moved
+    and adjusts the running totals and sector sums by the difference.
+    """
+
+    def __init__(self, tickers, quantities, cost_basis=None):
+        symbols = [resolve_symbol(ticker) for ticker in tickers]
+        if not symbols:
+            raise ValueError("The portfolio has no positions.")
+        self.tickers = np.array(symbols)
+        self.quantities = np.asarray(quantities, dtype=float)
+        self.cost_basis = np.full(len(symbols), np.nan) if cost_basis is None else np.asarray(cost_basis, dtype=float)
+
+        # Unique symbols, and for each position the index of its symbol
+        self.symbols, self.symbol_ids = np.unique(self.tickers, return_inverse=True)
+        self.currencies = np.array([_currency(symbol) for symbol in self.symbols])
+        self.sectors, self.sector_ids = np.unique([_sector(symbol) for symbol in symbols], return_inverse=True)
+
+        # Prices per unique symbol: native currency for display, dollars for valuation
+        self.native_prices = np.full(len(self.symbols), np.nan)
+        self.prices = np.full(len(self.symbols), np.nan)
+        self.previous = np.full(len(self.symbols), np.nan)
+
+        self.market_value = np.zeros(len(symbols))
+        self.day_change = np.zeros(len(symbols))
+        self.sector_value = np.zeros(len(self.sectors))
+        self.total_value = 0.0
+        self.total_day_change = 0.0
+
+    def __len__(self):
+        return len(self.tickers)
+
+    @classmethod
+    def from_records(cls, records):
+        """Builds a portfolio from dicts with 'ticker', 'quantity' and an optional 'cost_basis'."""
+        return cls(
+            [record["ticker"] for record in records],
+            [record["quantity"] for record in records],
+            [record.get("cost_basis", np.nan) for record in records],
+        )
+
+    def refresh(self, priority="interactive"):
+        """Fetches prices of every symbol in one request and revalues what changed."""
+        needs_fx = bool((self.currencies == "INR").any())
+        symbols = list(self.symbols) + ([USD_INR] if needs_fx else [])
+        last, previous = fetch_prices(symbols, priority)
+        fx = np.ones(len(self.symbols))
+        if needs_fx:
+            fx[self.currencies == "INR"] = 1 / last[-1]
+            last, previous = last[:-1], previous[:-1]
+        return self.update_prices(self.symbols, last, previous, fx)
+
+    def update_prices(self, symbols, last, previous=None, fx=None):
+        """
+        Applies new prices and revalues only the positions they affect.
+
+        Args:
+            symbols (array): Symbols the prices are for, each held in the portfolio
+            last (array): Latest prices in each symbol's own currency
+            previous (array): Previous closes, for the day change; kept as is if omitted
+            fx (array): Dollars per unit of each symbol's currency; 1 if omitted
+
+        Returns:
+            int: Number of symbols whose price changed
+        """
+        ids = np.searchsorted(self.symbols, symbols)
+        last = np.asarray(last, dtype=float)
+        fx = np.ones(len(ids)) if fx is None else np.asarray(fx, dtype=float)
+        dollars = last * fx
+        moved = _differs(dollars, self.prices[ids])
+        if previous is not None:
+            previous = np.asarray(previous, dtype=float) * fx
+            moved |= _differs(previous, self.previous[ids])
+
+        changed = ids[moved]
+        if changed.size == 0:
+            return 0
+        self.native_prices[changed] = last[moved]
+        self.prices[changed] = dollars[moved]
+        if previous is not None:
+            self.previous[changed] = previous[moved]
+
+        positions = np.flatnonzero(np.isin(self.symbol_ids, changed))
+        prices = self.prices[self.symbol_ids[positions]]
+        value = np.nan_to_num(self.quantities[positions] * prices)
+        day_change = np.nan_to_num(self.quantities[positions] * (prices - self.previous[self.symbol_ids[positions]]))
+
+        value_delta = value - self.market_value[positions]
+        self.market_value[positions] = value
+        self.total_value += value_delta.sum()
+        self.sector_value += np.bincount(self.sector_ids[positions], weights=value_delta, minlength=len(self.sectors))
+        self.total_day_change += (day_change - self.day_change[positions]).sum()
+        self.day_change[positions] = day_change
+        return int(changed.size)
+
+    def _cost(self):
+        """Cost of each position in dollars, at today's exchange rate; NaN without a cost basis or price."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fx = (self.prices / self.native_prices)[self.symbol_ids]
+        return self.quantities * self.cost_basis * fx
+
+    def positions(self):
+        """Returns one row per position with value, weight, day change and P&L (in dollars)."""
+        prices = self.prices[self.symbol_ids]
+        cost = self._cost()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weights = self.market_value / self.total_value * 100
+            day_change_pct = self.day_change / (self.market_value - self.day_change) * 100
+            pnl = self.market_value - cost
+            pnl_pct = pnl / cost * 100
+        return pd.DataFrame({
+            "Ticker": self.tickers,
+            "Sector": self.sectors[self.sector_ids],
+            "Quantity": self.quantities,
+            "Price": self.native_prices[self.symbol_ids],
+            "Currency": self.currencies[self.symbol_ids],
+            "Market value ($)": np.where(np.isnan(prices), np.nan, self.market_value),
+            "Weight (%)": weights,
+            "Day change ($)": self.day_change,
+            "Day change (%)": day_change_pct,
+            "P&L ($)": pnl,
+            "P&L (%)": pnl_pct,
+        })
+
+    def summary(self):
+        """Returns portfolio totals and sector exposure (percent of market value)."""
+        cost = self._cost()
+        has_cost = ~np.isnan(cost)
+        pnl = self.market_value[has_cost].sum() - cost[has_cost].sum()
+        cost = cost[has_cost]
+        exposure = self.sector_value / self.total_value * 100 if self.total_value else np.zeros(len(self.sectors))
+        order = np.argsort(-exposure, kind="stable")
+        opening = self.total_value - self.total_day_change
+        return {
+            "positions": len(self),
+            "value": self.total_value,
+            "day_change": self.total_day_change,
+            "day_change_pct": self.total_day_change / opening * 100 if opening else 0.0,
+            "pnl": pnl if cost.size else None,
+            "pnl_pct": pnl / cost.sum() * 100 if cost.size and cost.sum() else None,
+            "sectors": {str(self.sectors[i]): float(exposure[i]) for i in order},
+            "missing": [str(symbol) for symbol in self.symbols[np.isnan(self.prices)]],
+        }
+
+
+def parse_holdings(text):
+    """
+    Parses holdings written one per line or separated by commas or semicolons,
+    as 'TICKER QUANTITY [COST]' (e.g. 'AAPL 10 @ 150; RELIANCE 5').
+    """
+    records = []
+    text = re.sub(r"(?<=\d),(?=\d{3}\b)", "", text)  # 1,000 -> 1000
+    for line in re.split(r"[\n;]|,(?=\s*[A-Za-z^])", text):
+        parts = re.findall(r"[^\s,@:]+", line)
+        if not parts:
+            continue
+        if len(parts) < 2:
+            raise ValueError(f"Expected 'TICKER QUANTITY [COST]', got '{line.strip()}'.")
+        try:
+            record = {"ticker": parts[0], "quantity": float(parts[1])}
+            if len(parts) > 2:
+                record["cost_basis"] = float(parts[2].lstrip("$₹"))
+        except ValueError:
+            raise ValueError(f"Expected 'TICKER QUANTITY [COST]', got '{line.strip()}'.")
+        records.append(record)
+    return records
+
+
+def _signed_price(value):
+    return ("+" if value >= 0 else "-") + format_price(abs(value))
+
+
+def describe(summary):
+    """Puts a portfolio summary into one or two sentences."""
+    text = (
+        f"Your {summary['positions']} positions are worth {format_price(summary['value'])}, "
+        f"{_signed_price(summary['day_change'])} ({summary['day_change_pct']:+.2f}%) today"
+    )
+    if summary["pnl"] is not None:
+        text += f", with a total P&L of {_signed_price(summary['pnl'])} ({summary['pnl_pct']:+.2f}%)"
+    top = list(summary["sectors"].items())[:3]
+    text += ". Largest exposures: " + ", ".join(f"{sector} {weight:.1f}%" for sector, weight in top) + "."
+    if summary["missing"]:
+        text += f" No price found for {', '.join(summary['missing'])}."
+    return text
@@ -0,0 +1,330 @@
+import re
+
+from chatbot.functions import functions
+from chatbot.symbols import index
+
+
+# Parameter schemas of the functions the chatbot can call
+SCHEMAS = {function['name']: function['parameters'] for function in functions}
+
+# Lower-case words that are also names or tickers in the symbol index
+# ("target", "cost", "graph"), so they never count as a mention on their own
+COMMON_WORDS = {
+    "target", "booking", "graph", "maker", "stellar", "cosmos", "near", "dot", "sol", "link", "atom",
+    "sand", "sandbox", "mana", "etc", "fil", "vet", "algo", "titan", "trent", "visa", "oracle", "cost",
+    "shop", "snow", "coin", "now", "low", "meta", "intuitive", "linde", "tron", "polygon", "avalanche",
+}
+
+# Lower-case crypto tickers short enough to be trusted only when they aren't words
+LOWERCASE_CRYPTO = {"btc", "eth", "xrp", "doge", "ada", "ltc", "avax", "shib", "bnb", "trx", "matic", "usdt", "usdc", "xmr", "xlm", "bch", "hbar"}
+
+# Upper-case words that are never tickers
+NOT_TICKERS = {
+    "I", "A", "MA", "SMA", "EMA", "RSI", "USD", "INR", "NSE", "BSE", "NS", "BO", "VS", "AND", "OR",
+    "THE", "OF", "FOR", "DAY", "DAYS", "ME", "IS", "IT", "US", "AI", "PRICE", "PLOT", "CHART", "VIX",
+}
+
+# Messages asking for opinions or explanations are left to the LLM
+FREE_FORM_WORDS = {
+    "why", "should", "predict", "prediction", "forecast", "buy", "sell", "explain", "will",
+    "news", "opinion", "recommend", "advice", "think", "analysis", "analyze", "good", "better",
+}
+
+# Things about a company other than its current price or chart ("price target", "AAPL volume", "CEO of AAPL")
+UNSERVED_WORDS = {
+    "target", "targets", "volume", "volumes", "ceo", "cfo", "founder", "dividend", "dividends", "earnings",
+    "revenue", "eps", "gdp", "inflation", "unemployment", "yield", "yields", "cap", "capitalization",
+}
+# Questions about a past year or date, which the functions can't look up
+DATE_PATTERN = re.compile(
+    r"\b(?:19|20)\d{2}\b|\b\d{1,2}/\d{1,2}\b|\byesterday\b"
+    r"|\b(?:jan|feb|mar|apr|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+\d{1,2}\b"
+)
+
+# Backtests and screens take rules or filters the router can't parse, so the LLM builds those calls
+STRATEGY_WORDS = {
+    "backtest", "backtesting", "backtested", "strategy", "strategies", "crossover", "crossovers",
+    "screen", "screener", "screening", "filter",
+}
+SCREEN_PATTERN = re.compile(r"\b(?:which|what|any|all)\b.*\bstocks\b|\bstocks (?:with|where|whose|that)\b")
+
+# Questions about the user's own holdings ("top gainers in my portfolio") need holdings only the LLM can ask for
+PORTFOLIO_PATTERN = re.compile(
+    r"\b(?:my|our)\s+(?:[a-z]+\s+)?(?:portfolio|holdings|positions|investments|stocks|shares|coins)\b|\bportfolio\b|\bholdings\b"
+)
+
+# Currencies a price can be asked in ("ETH in INR"). Prices are quoted as the functions return
+# them, in rupees for Indian stocks and dollars for everything else, so other currencies go to the LLM
+CURRENCIES = {
+    "usd": "USD", "dollar": "USD", "dollars": "USD", "inr": "INR", "rupee": "INR", "rupees": "INR",
+    "eur": "EUR", "euro": "EUR", "euros": "EUR", "gbp": "GBP", "pound": "GBP", "pounds": "GBP", "sterling": "GBP",
+    "jpy": "JPY", "yen": "JPY", "cny": "CNY", "yuan": "CNY", "rmb": "CNY", "cad": "CAD", "aud": "AUD",
+    "chf": "CHF", "hkd": "HKD", "sgd": "SGD", "btc": "BTC", "bitcoin": "BTC", "sats": "BTC", "eth": "ETH",
+}
+CURRENCY_PATTERN = re.compile(r"\b(?:in|into)\s+(" + "|".join(CURRENCIES) + r")\b|([€£¥])")
+CURRENCY_SIGNS = {"€": "EUR", "£": "GBP", "¥": "JPY"}
+
+PLOT_WORDS = {"plot", "chart", "graph", "draw", "visualize", "visualise", "trend"}
+PRICE_WORDS = {"price", "prices", "quote", "trading", "worth", "cost", "costs", "much", "rate"}
+COMPARE_WORDS = {"compare", "comparison", "vs", "versus", "correlation", "correlate", "against"}
+INDIAN_WORDS = {"nse", "bse", "india", "indian", "rupee", "rupees", "inr"}
+
+# Market-wide questions answered from the latest snapshot when no ticker is named
+GREED_WORDS = {"greed", "fear"}
+VOLATILITY_WORDS = {"volatility", "volatile", "vix"}
+MOVER_WORDS = {"gainers", "gainer", "losers", "loser", "movers", "winners", "losing", "gaining"}
+CRYPTO_WORDS = {"crypto", "cryptos", "cryptocurrency", "cryptocurrencies", "coins"}
+
+# Words pointing back at something said earlier in the conversation
+REFERENCE_WORDS = {"it", "its", "that", "this", "them", "they", "their", "same", "those", "these"}
+
+# Periods accepted by yfinance, smallest first, with their length in days
+PERIODS = [("5d", 5), ("1mo", 30), ("3mo", 90), ("6mo", 182), ("1y", 365), ("2y", 730), ("5y", 1826), ("10y", 3652)]
+UNIT_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+# Below this confidence the decision is left to the LLM
+CONFIDENCE_THRESHOLD = 0.8
+
+
+def _find_tickers(text, words, indian):
+    """
+    Returns (stock_tickers, crypto_symbols, unlisted) for the message, in order;
+    unlisted is True when an all-caps word not in the listings was taken as a ticker.
+
+    NSE listings carry their Yahoo suffix (e.g. RELIANCE.NS) so callers can
+    tell them apart from US tickers.
+    """
+    stocks, cryptos = [], []
+    unlisted = False
+
+    def add(symbol, market):
+        if market == "NSE" and not symbol.endswith((".NS", ".BO")):
+            symbol = f"{symbol}.NS"
+        target = cryptos if market == "crypto" else stocks
+        if symbol not in target:
+            target.append(symbol)
+
+    pattern = r"\b[A-Z][A-Z&]{1,14}(?:\.(?:NS|BO))?\b" if indian else r"\b[A-Z]{1,5}(?:-USD)?\b"
+    for token in re.findall(pattern, text):
+        if token in NOT_TICKERS:
+            continue
+        # Without an Indian hint a bare ticker is a US one, even if NSE has the same symbol (HAL)
+        listing = index.by_ticker(token, None if indian else ("US", "crypto"))
+        if listing is None:
+            # Written like a ticker but not listed: keep it, but it may just be an acronym ("GDP", "CEO")
+            add(token, "NSE" if indian else "US")
+            unlisted = True
+        elif token.endswith((".NS", ".BO")):
+            add(token, "NSE")
+        else:
+            add(listing.ticker, listing.market)
+
+    # Company and coin names, longest first so "home depot" beats "home"
+    i = 0
+    while i < len(words):
+        for size in (3, 2, 1):
+            phrase = " ".join(words[i:i + size])
+            if size > len(words) - i or (size == 1 and phrase in COMMON_WORDS):
+                continue
+            listing = index.by_alias(phrase)
+            if listing is not None:
+                add(listing.ticker, listing.market)
+                i += size
+                break
+        else:
+            # Lower-case tickers are only trusted when they can't be English words
+            word = words[i]
+            listing = index.by_ticker(word)
+            if listing is not None and word not in COMMON_WORDS:
+                if listing.market == "crypto" and word in LOWERCASE_CRYPTO:
+                    add(listing.ticker, "crypto")
+                elif listing.market != "crypto" and len(word) >= 4:
+                    add(listing.ticker, listing.market)
+            i += 1
+    return stocks, cryptos, unlisted
+
+
+def _find_window(text):
+    match = (
+        re.search(r"(\d+)[\s-]*(?:days?|d)?[\s-]*(?:ma|sma|ema|moving average)\b", text)
+        or re.search(r"(?:ma|sma|ema|moving average|window)\s*(?:of\s*)?(\d+)", text)
+        or re.search(r"(\d+)[\s-]*days?\s+(?:simple|exponential)", text)
+    )
+    return int(match.group(1)) if match else None
+
+
+def _find_period(text):
+    if re.search(r"\b(?:max|all[\s-]time|since inception)\b", text):
+        return "max"
+    if re.search(r"\b(?:ytd|year to date)\b", text):
+        return "ytd"
+    match = re.search(r"\b(?:over|for|past|last|in)\s+(?:the\s+)?(?:(\d+)\s*)?(day|week|month|year)s?\b", text)
+    if not match:
+        return None
+    days = int(match.group(1) or 1) * UNIT_DAYS[match.group(2)]
+    for period, period_days in PERIODS:
+        if days <= period_days:
+            return period
+    return "max"
+
+
+def has_reference(text):
+    """Checks whether a message refers back to earlier turns ("plot its EMA")."""
+    return bool(set(re.findall(r"[a-z]+", text.lower())) & REFERENCE_WORDS)
+
+
+def _is_indian(ticker):
+    return ticker.endswith((".NS", ".BO"))
+
+
+def _exchange(ticker, word_set):
+    if ticker.endswith(".BO") or "bse" in word_set:
+        return "BO"
+    return "NS"
+
+
+def _route_snapshot(lowered, word_set):
+    """Routes market-wide questions ("top crypto losers", "fear and greed index") to the snapshot functions."""
+    params = {"market": "crypto" if word_set & CRYPTO_WORDS else "stock"}
+    if word_set & GREED_WORDS:
+        return [("get_fear_greed_index", params)]
+    if word_set & VOLATILITY_WORDS:
+        return [("get_market_volatility", params)]
+    if word_set & MOVER_WORDS:
+        gainers = bool(word_set & {"gainers", "gainer", "winners", "gaining"})
+        losers = bool(word_set & {"losers", "loser", "losing"})
+        if gainers != losers:
+            params["direction"] = "gainers" if gainers else "losers"
+        return [("get_market_movers", params)]
+    if "news" in word_set and not re.search(r"\b(?:last|past|ago|since|week|month|on|about)\b", lowered):
+        # Only today's headlines; older or topical news goes to the archive search
+        return [("get_market_news", params)]
+    return []
+
+
+def _asked_currency(lowered):
+    """The currency a price is asked in ("ETH in INR", "AAPL in €"), or None."""
+    match = CURRENCY_PATTERN.search(lowered)
+    if match is None:
+        return None
+    return CURRENCIES[match.group(1)] if match.group(1) else CURRENCY_SIGNS[match.group(2)]
+
+
+def _route_clause(text, recent=None):
+    """Routes one clause of a message. Returns (tool_calls, confidence)."""
+    lowered = text.lower()
+    words = re.findall(r"[a-z0-9&]+", lowered)
+    word_set = set(words)
+
+    if word_set & STRATEGY_WORDS or SCREEN_PATTERN.search(lowered):
+        return [], 0.0
+    if word_set & UNSERVED_WORDS or DATE_PATTERN.search(lowered) or PORTFOLIO_PATTERN.search(lowered):
+        return [], 0.0
+
+    indian = bool(word_set & INDIAN_WORDS) or bool(re.search(r"\.(?:NS|BO)\b|₹", text))
+    stocks, cryptos, unlisted = _find_tickers(text, words, indian)
+    confidence = 0.3 if word_set & FREE_FORM_WORDS else 0.5 if unlisted else 0.95
+    currency = _asked_currency(lowered)
+    if not stocks and not cryptos and not (recent and word_set & REFERENCE_WORDS):
+        calls = _route_snapshot(lowered, word_set)
+        # Snapshot figures are in dollars
+        if calls and currency not in (None, "USD"):
+            return [], 0.0
+        if calls:
+            return calls, 0.3 if word_set & FREE_FORM_WORDS - {"news"} else 0.95
+    if not stocks and not cryptos and recent and word_set & REFERENCE_WORDS:
+        # "now plot its 50-day EMA": reuse the symbols of the previous request
+        stocks, cryptos = list(recent[0]), list(recent[1])
+        confidence = min(confidence, 0.85)
+    if not stocks and not cryptos:
+        return [], 0.0
+    if currency and {"INR" if _is_indian(ticker) else "USD" for ticker in stocks} | ({"USD"} if cryptos else set()) != {currency}:
+        return [], 0.0
+
+    window = _find_window(lowered)
+    period = _find_period(lowered)
+
+    if word_set & COMPARE_WORDS:
+        symbols = stocks + [f"{symbol}-USD" for symbol in cryptos]
+        if len(symbols) < 2:
+            return [], 0.0
+        params = {"tickers": symbols}
+        if period:
+            params["period"] = period
+        return [("compare_tickers", params)], confidence
+
+    if "rsi" in word_set or "relative strength" in lowered:
+        return [("calculate_RSI", {"ticker": ticker}) for ticker in stocks], confidence if not cryptos else 0.0
+
+    if "sma" in word_set or "simple moving average" in lowered:
+        kind = "plot_SMA"
+    elif "ema" in word_set or "exponential moving average" in lowered:
+        kind = "plot_EMA"
+    elif word_set & PLOT_WORDS:
+        kind = "plot"
+    elif word_set & PRICE_WORDS:
+        kind = "price"
+    else:
+        # A bare ticker is probably a price question, but not certainly
+        kind, confidence = "price", min(confidence, 0.5)
+
+    calls = []
+    if kind in ("plot_SMA", "plot_EMA"):
+        if window is None or cryptos:
+            return [], 0.0
+        options = {"period": period} if period else {}
+        calls += [(kind, {"ticker": ticker, "window": window, **options}) for ticker in stocks]
+    elif kind == "plot":
+        options = {"window": window} if window else {}
+        if period:
+            options["period"] = period
+        for ticker in stocks:
+            if _is_indian(ticker):
+                calls.append(("plot_indian_stock_price", {"ticker": ticker.split(".")[0], "exchange": _exchange(ticker, word_set), **options}))
+            else:
+                calls.append(("plot_stock_price", {"ticker": ticker, **options}))
+        calls += [("plot_crypto_price_graph", {"crypto_symbol": symbol, **options}) for symbol in cryptos]
+    else:
+        for ticker in stocks:
+            if _is_indian(ticker):
+                calls.append(("get_indian_stock_price", {"ticker": ticker.split(".")[0], "exchange": _exchange(ticker, word_set)}))
+            else:
+                calls.append(("get_stock_price", {"ticker": ticker}))
+        calls += [("get_crypto_price", {"crypto_symbol": symbol}) for symbol in cryptos]
+    return calls, confidence
+
+
+def _valid(function_name, params):
+    """Checks a call against the function's schema."""
+    schema = SCHEMAS.get(function_name)
+    if schema is None:
+        return False
+    return set(schema.get("required", [])) <= set(params) and set(params) <= set(schema["properties"])
+
+
+def route(user_input, recent=None):
+    """
+    Resolves a chat message to function calls without calling the LLM.
+
+    Args:
+        user_input (str): The user's message
+        recent (tuple): (stock_tickers, crypto_symbols) of the previous request,
+            used for messages like "now plot its 50-day EMA"
+
+    Returns:
+        tuple: ({"tool_calls": [...]} or None, confidence between 0 and 1)
+    """
+    clauses = [c for c in re.split(r";|\band then\b|\bthen\b|\balso\b", user_input) if c.strip()]
+    tool_calls, confidence = [], 1.0
+    for clause in clauses:
+        calls, clause_confidence = _route_clause(clause, recent)
+        if not calls:
+            return None, 0.0
+        for function_name, params in calls:
+            if not _valid(function_name, params):
+                return None, 0.0
+            tool_calls.append({"function_to_call": function_name, "parameters": params})
+        confidence = min(confidence, clause_confidence)
+    if not tool_calls:
+        return None, 0.0
+    return {"tool_calls": tool_calls}, confidence
@@ -0,0 +1,59 @@
+"""
+Measures the local intent router against the labelled cases in router_cases.json.
+
+Run from the project root:
+    python -m chatbot.router_eval
+"""
+import json
+import sys
+
+from chatbot.router import route, CONFIDENCE_THRESHOLD
+
+
+def evaluate(cases):
+    """
+    Routes every case and compares the local decision with the label.
+
+    A case with "expected": null must be left to the LLM.
+
+    Returns:
+        dict: Counts, hit rate and accuracy, plus the failing cases
+    """
+    hits = correct = false_hits = 0
+    routable = sum(case["expected"] is not None for case in cases)
+    failures = []
+    for case in cases:
+        decision, confidence = route(case["input"])
+        resolved = decision is not None and confidence >= CONFIDENCE_THRESHOLD
+        expected = case["expected"]
+        if resolved:
+            hits += 1
+            if decision == expected:
+                correct += 1
+            else:
+                false_hits += expected is None
+                failures.append({"input": case["input"], "got": decision, "expected": expected})
+        elif expected is not None:
+            failures.append({"input": case["input"], "got": None, "expected": expected})
+    return {
+        "cases": len(cases),
+        "routable": routable,
+        "hits": hits,
+        "hit_rate": hits / routable if routable else 0.0,
+        "accuracy": correct / hits if hits else 0.0,
+        "false_hits": false_hits,
+        "failures": failures,
+    }
+
+
+if __name__ == "__main__":
+    with open("chatbot/router_cases.json", "r") as cases_file:
+        report = evaluate(json.load(cases_file))
+    for failure in report["failures"]:
+        print(f"MISS {failure['input']!r}\n  got:      {failure['got']}\n  expected: {failure['expected']}")
+    print(
+        f"{report['hits']}/{report['routable']} routable cases resolved locally "
+        f"(hit rate {report['hit_rate']:.0%}, accuracy {report['accuracy']:.0%}, "
+        f"{report['false_hits']} wrongly kept from the LLM)"
+    )
+    sys.exit(1 if report["failures"] else 0)
@@ -0,0 +1,325 @@
+import argparse
+import ast
+import json
+import operator
+import re
+import time
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from chatbot.backtest import fetch_history, synthetic_prices
+from chatbot.cache import TTLCache
+from chatbot.formatting import format_price
+from chatbot.indicators import ema, rsi, sma
+
+
+# Enough daily bars for a 200-day average and a 52-week range
+HISTORY_PERIOD = "1y"
+TRADING_DAYS = 252
+
+# The universe's price panel and the fields computed from it are reused for this long (seconds)
+SCREENER_TTL = 15 * 60
+
+# Fields without a window; windowed ones are written like sma_200, rsi_7 or change_5d
+FIELDS = {
+    "price": "last close",
+    "high_52w": "52-week high",
+    "low_52w": "52-week low",
+    "from_high": "percent below the 52-week high (negative)",
+    "name": "company name",
+    "sector": "sector",
+}
+TEXT_FIELDS = {"name", "sector"}
+WINDOWED_FIELDS = {
+    "sma": "N-day simple moving average",
+    "ema": "N-day exponential moving average",
+    "rsi": "N-day RSI (default 14)",
+    "change": "percent change over N days (default 1)",
+    "volatility": "annualized volatility of N days of daily returns, in percent (default 30)",
+}
+DEFAULT_WINDOWS = {"rsi": 14, "change": 1, "volatility": 30}
+WINDOWED = re.compile(r"^(sma|ema|rsi|change|volatility)(?:_?(\d+)d?)?$")
+
+# Fields shown as prices rather than plain numbers
+PRICE_FIELDS = re.compile(r"^(price|high_52w|low_52w|sma_?\d+d?|ema_?\d+d?)$")
+
+COMPARISONS = {
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+    ast.GtE: operator.ge, ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+ARITHMETIC = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+
+# Largest number an expression may contain; prices and percentages are far below it
+MAX_NUMBER = 1e12
+
+_screeners = TTLCache(maxsize=4, ttl=SCREENER_TTL)
+
+
+def field_help():
+    windowed = [f"{name}_N ({description})" for name, description in WINDOWED_FIELDS.items()]
+    return ", ".join([f"{name} ({description})" for name, description in FIELDS.items()] + windowed)
+
+
+def _check_field(name):
+    if name in FIELDS:
+        return name
+    match = WINDOWED.match(name)
+    if match is None or (match.group(2) is None and match.group(1) not in DEFAULT_WINDOWS):
+        raise ValueError(f"Unknown screener field '{name}'. Available fields: {field_help()}.")
+    return name
+
+
+def _numeric(node):
+    """
+    Checks that an arithmetic operand is built only from numbers and indicator
+    fields, so 'a' * 10000000000 or sector * 10000000000 are never evaluated.
+    """
+    if isinstance(node, ast.Constant):
+        return isinstance(node.value, (int, float)) and not isinstance(node.value, bool)
+    if isinstance(node, ast.Name):
+        return node.id.lower() not in TEXT_FIELDS
+    if isinstance(node, ast.UnaryOp):
+        return isinstance(node.op, (ast.USub, ast.UAdd)) and _numeric(node.operand)
+    return isinstance(node, ast.BinOp) and _numeric(node.left) and _numeric(node.right)
+
+
+def _normalize(expression):
+    """Accepts AND/OR/NOT in any case, a single '=' for equality and '&&'/'||'."""
+    expression = re.sub(r"\b(and|or|not)\b", lambda match: match.group(1).lower(), expression, flags=re.IGNORECASE)
+    expression = expression.replace("&&", " and ").replace("||", " or ")
+    return re.sub(r"(?<![<>=!])=(?!=)", "==", expression)
+
+
+def parse_expression(expression):
+    """
+    Parses a filter or ranking expression such as 'rsi < 30 and price > sma_200'.
+
+    Only comparisons, and/or/not, + - * /, numbers, quoted strings and screener
+    fields are allowed, so the expression is never executed as Python.
+    Arithmetic only takes numbers and indicator fields, and numbers are capped
+    at MAX_NUMBER.
+
+    Returns:
+        tuple: (syntax tree, field names in order of appearance)
+    """
+    try:
+        tree = ast.parse(_normalize(expression).strip(), mode="eval")
+    except SyntaxError:
+        raise ValueError(f"Could not parse the screener expression '{expression}'.")
+    allowed = (
+        ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+        ast.Compare, ast.BinOp, ast.Name, ast.Load, ast.Constant, *COMPARISONS, *ARITHMETIC,
+    )
+    fields = []
+    for node in ast.walk(tree):
+        if not isinstance(node, allowed):
+            raise ValueError(f"'{expression}' uses something a screener expression can't: {type(node).__name__}.")
+        if isinstance(node, ast.Constant) and (isinstance(node.value, bool) or not isinstance(node.value, (int, float, str))):
+            raise ValueError(f"'{expression}' has an unsupported value: {node.value!r}.")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, str) and not abs(node.value) <= MAX_NUMBER:
+            raise ValueError(f"'{expression}' has a number larger than {MAX_NUMBER:g}.")
+        if isinstance(node, ast.BinOp) and not (_numeric(node.left) and _numeric(node.right)):
+            raise ValueError(f"'{expression}' does arithmetic on something other than numbers and indicator fields.")
+        if isinstance(node, ast.Name):
+            name = _check_field(node.id.lower())
+            if name not in fields:
+                fields.append(name)
+    return tree.body, fields
+
+
+def _default_ranking(tree):
+    """
+    Ranks by the field of the first comparison, lowest first when it is
+    compared with < or <= (e.g. 'rsi < 30' lists the most oversold first).
+    """
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Compare) and isinstance(node.left, ast.Name):
+            return node.left.id.lower(), not isinstance(node.ops[0], (ast.Lt, ast.LtE))
+    return "change", True
+
+
+def load_universe(config_path="data/config.json"):
+    """Name and sector of each configured US30 stock, indexed by ticker."""
+    with open(config_path, "r") as config_file:
+        stocks = json.load(config_file)["US30"]
+    return pd.DataFrame(stocks).set_index("ticker")[["name", "sector"]]
+
+
+class Screener:
+    """
+    Indicator values of a whole universe, one value per ticker, computed
+    column-wise from a single price panel.
+
+    Each field is computed once for every ticker at the same time and kept, so
+    later screens that use the same fields are only array comparisons.
+    """
+
+    def __init__(self, close, universe):
+        self.close = close.ffill()
+        self.universe = universe.reindex(self.close.columns)
+        self.bars = close.notna().sum()  # bars each ticker has, so short histories give NaN windows
+        self._fields = {}
+
+    def __len__(self):
+        return self.close.shape[1]
+
+    def field(self, name):
+        """Returns the latest value of a field for every ticker, as a Series indexed by ticker."""
+        name = _check_field(name)
+        if name not in self._fields:
+            self._fields[name] = self._compute(name)
+        return self._fields[name]
+
+    def _compute(self, name):
+        close = self.close
+        last = close.iloc[-1]
+        if name == "price":
+            return last
+        if name in ("name", "sector"):
+            return self.universe[name].fillna("").str.lower()
+        if name in ("high_52w", "low_52w"):
+            year = close.iloc[-TRADING_DAYS:]
+            return year.max() if name == "high_52w" else year.min()
+        if name == "from_high":
+            return (last / self.field("high_52w") - 1) * 100
+
+        kind, window = WINDOWED.match(name).groups()
+        window = int(window) if window else DEFAULT_WINDOWS[kind]
+        if kind == "change":
+            values = (last / close.shift(window).iloc[-1] - 1) * 100
+        elif kind == "volatility":
+            values = close.pct_change().iloc[-window:].std() * np.sqrt(TRADING_DAYS) * 100
+        else:
+            values = {"sma": sma, "ema": ema, "rsi": rsi}[kind](close, window).iloc[-1]
+        # A change over N days needs N + 1 closes
+        return values.where(self.bars >= (window + 1 if kind == "change" else window))
+
+    def evaluate(self, node):
+        """Evaluates a parsed expression for every ticker at once."""
+        if isinstance(node, ast.BoolOp):
+            combine = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+            return reduce(combine, (self._condition(value) for value in node.values))
+        if isinstance(node, ast.UnaryOp):
+            if isinstance(node.op, ast.Not):
+                return ~self._condition(node.operand)
+            value = self.evaluate(node.operand)
+            return -value if isinstance(node.op, ast.USub) else value
+        if isinstance(node, ast.Compare):
+            left, result = self.evaluate(node.left), None
+            for op, comparator in zip(node.ops, node.comparators):
+                right = self.evaluate(comparator)
+                part = COMPARISONS[type(op)](left, right)
+                result = part if result is None else result & part
+                left = right
+            return result
+        if isinstance(node, ast.BinOp):
+            return ARITHMETIC[type(node.op)](self.evaluate(node.left), self.evaluate(node.right))
+        if isinstance(node, ast.Name):
+            return self.field(node.id.lower())
+        value = node.value
+        return value.lower() if isinstance(value, str) else value
+
+    def _condition(self, node):
+        value = self.evaluate(node)
+        if not isinstance(value, pd.Series) or value.dtype != bool:
+            raise ValueError(f"'{ast.unparse(node)}' is not a condition; compare it with something (e.g. rsi < 30).")
+        return value
+
+    def screen(self, expression, sort_by=None, descending=None, limit=10):
+        """
+        Returns the tickers matching a filter expression, ranked.
+
+        Args:
+            expression (str): Filter such as 'rsi < 30 and price > sma_200'
+            sort_by (str): Field or expression to rank by; defaults to the field of the first comparison
+            descending (bool): Rank highest first; defaults to the direction of that comparison
+            limit (int): Maximum number of matches
+
+        Returns:
+            tuple: (DataFrame of matches with the fields used, number of matches before the limit)
+        """
+        tree, fields = parse_expression(expression)
+        mask = self._condition(tree)
+        if sort_by:
+            ranking, ranking_fields = parse_expression(sort_by)
+            descending = True if descending is None else descending
+        else:
+            name, default_descending = _default_ranking(tree)
+            ranking, ranking_fields = ast.Name(name, ast.Load()), [name]
+            descending = default_descending if descending is None else descending
+        score = self.evaluate(ranking)
+        if not isinstance(score, pd.Series):
+            score = pd.Series(score, index=self.close.columns)
+
+        matches = mask[mask].index
+        order = score[matches].sort_values(ascending=not descending, na_position="last", kind="stable").index
+        columns = ["price"] + [name for name in dict.fromkeys(fields + ranking_fields) if name not in ("price", "name", "sector")]
+        frame = pd.DataFrame({name: self.field(name)[order] for name in columns})
+        frame.insert(0, "sector", self.universe["sector"][order])
+        frame.insert(0, "name", self.universe["name"][order])
+        return frame.head(int(limit)), len(order)
+
+
+def get_screener(priority="interactive"):
+    """Screener over the configured universe, downloading its history in one request at most every SCREENER_TTL."""
+    screener = _screeners.get(HISTORY_PERIOD)
+    if screener is None:
+        universe = load_universe()
+        screener = Screener(fetch_history(universe.index, HISTORY_PERIOD, priority), universe)
+        _screeners.set(HISTORY_PERIOD, screener)
+    return screener
+
+
+def _format_value(name, value):
+    if pd.isna(value):
+        return f"{name} n/a"
+    if PRICE_FIELDS.match(name):
+        return f"{name} {format_price(value)}"
+    if name.startswith("volatility"):
+        return f"{name} {value:.1f}%"
+    if name.startswith(("change", "from_high")):
+        return f"{name} {value:+.2f}%"
+    return f"{name} {value:.1f}"
+
+
+def describe(matches, count, total, expression):
+    """Puts screener matches into one sentence."""
+    if count == 0:
+        return f"None of the {total} tracked US stocks match '{expression}'."
+    rows = []
+    for ticker, row in matches.iterrows():
+        values = ", ".join(_format_value(name, row[name]) for name in matches.columns[2:])
+        rows.append(f"{ticker} ({row['name']}) {values}")
+    shown = f", top {len(matches)}" if len(matches) < count else ""
+    return f"{count} of {total} tracked US stocks match '{expression}'{shown}: " + "; ".join(rows) + "."
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Screen the configured universe with a filter expression.")
+    parser.add_argument("expression", help="e.g. \"rsi < 30 and price > sma_200\"")
+    parser.add_argument("--sort-by")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--synthetic", action="store_true", help="Use random-walk prices instead of downloading")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.synthetic:
+        universe = load_universe()
+        close = synthetic_prices(len(universe), TRADING_DAYS)
+        close.columns = universe.index
+        screener = Screener(close, universe)
+    else:
+        screener = get_screener()
+    loaded = time.perf_counter()
+    matches, count = screener.screen(args.expression, args.sort_by, limit=args.limit)
+    screened = time.perf_counter()
+    matches, count = screener.screen(args.expression, args.sort_by, limit=args.limit)
+    repeated = time.perf_counter()
+
+    print(describe(matches, count, len(screener), args.expression))
+    print(
+        f"Loaded in {(loaded - started) * 1000:.1f} ms, first screen {(screened - loaded) * 1000:.1f} ms, "
+        f"repeated screen {(repeated - screened) * 1000:.2f} ms"
+    )
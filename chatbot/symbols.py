@@ -0,0 +1,272 @@
+import json
+import re
+from collections import Counter, defaultdict, namedtuple
+from difflib import SequenceMatcher
+
+
+Listing = namedtuple("Listing", ["ticker", "name", "market", "sector"])
+
+MARKETS = ("US", "NSE", "crypto")
+
+# Words that say what kind of company it is rather than which one
+NAME_FILLER = {
+    "inc", "incorporated", "corporation", "corp", "company", "co", "ltd", "limited", "plc",
+    "group", "holdings", "the", "and", "of", "class", "a", "c",
+}
+GENERIC_FIRST_WORDS = {
+    "american", "international", "united", "general", "home", "dow", "bank", "state", "advanced",
+    "applied", "analog", "texas", "union", "palo", "oil", "power", "coal", "sun", "asian", "indian",
+    "hindustan", "bharat", "tata", "bajaj", "adani", "hdfc", "icici", "sbi", "tech", "spdr", "invesco",
+    "internet", "usd", "ethereum", "bitcoin",
+}
+
+# Symbols typed in capitals that aren't in the listings are still passed on as tickers
+TICKER_PATTERN = re.compile(r"^\^?[A-Z0-9][A-Z0-9.&\-]{0,14}$")
+SUFFIXES = (".NS", ".BO", "-USD")
+
+# Prefix nodes keep this many listings, in listing order
+PREFIX_LIMIT = 10
+
+# Trigram overlap picks the candidates, edit similarity ranks them
+FUZZY_CANDIDATES = 10
+FUZZY_THRESHOLD = 0.75
+SUGGEST_THRESHOLD = 0.5
+
+
+def normalize(text):
+    return " ".join(re.findall(r"[a-z0-9&]+", text.lower().replace("'", "")))
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def ticker_markets(ticker, markets=None):
+    """
+    Markets a symbol written as a ticker can be listed in. Suffixes pick their
+    market; bare symbols of up to five letters may be US tickers missing from
+    the listings, so they only match NSE listings when US isn't searched.
+    """
+    markets = MARKETS if markets is None else markets
+    ticker = ticker.upper()
+    if ticker.endswith((".NS", ".BO")):
+        return tuple(market for market in markets if market == "NSE")
+    if ticker.endswith("-USD"):
+        return tuple(market for market in markets if market == "crypto")
+    if len(ticker.lstrip("^")) <= 5 and "US" in markets:
+        return tuple(market for market in markets if market != "NSE")
+    return tuple(markets)
+
+
+def yahoo_symbol(listing):
+    """Returns the symbol Yahoo Finance uses for a listing."""
+    if listing.market == "NSE":
+        return f"{listing.ticker}.NS"
+    if listing.market == "crypto":
+        return f"{listing.ticker}-USD"
+    return listing.ticker
+
+
+class SymbolIndex:
+    """
+    In-memory lookup of tickers and company names.
+
+    Exact tickers and name aliases are dictionary lookups, prefixes walk a
+    character trie, and misspellings are found through shared character
+    trigrams, then ranked by edit similarity.
+    """
+
+    def __init__(self, listings):
+        self.listings = list(listings)
+        self.tickers = defaultdict(list)  # ticker -> listing ids
+        self.aliases = defaultdict(set)  # normalized name or short name -> listing ids
+        self.trie = {}
+        self.alias_names = []  # alias strings, addressed by position in the trigram index
+        self.alias_ids = []  # listing id of each alias string
+        self.alias_gram_counts = []  # number of trigrams of each alias string
+        self.grams = defaultdict(set)  # trigram -> alias positions
+
+        for listing_id, listing in enumerate(self.listings):
+            self.tickers[listing.ticker].append(listing_id)
+            for alias in self._aliases(listing):
+                self.aliases[alias].add(listing_id)
+                self._insert_prefix(alias, listing_id)
+                self._insert_grams(alias, listing_id)
+            self._insert_prefix(listing.ticker.lower(), listing_id)
+
+    @staticmethod
+    def _aliases(listing):
+        full = normalize(listing.name)
+        words = [w for w in full.split() if w not in NAME_FILLER]
+        aliases = {full}
+
+        # Name without a leading "the" and trailing legal suffixes ("bank of america")
+        trimmed = full.split()
+        if trimmed and trimmed[0] == "the":
+            trimmed = trimmed[1:]
+        while len(trimmed) > 1 and trimmed[-1] in NAME_FILLER:
+            trimmed = trimmed[:-1]
+        aliases.add(" ".join(trimmed))
+        if words:
+            aliases.add(" ".join(words))
+            if words[0] not in GENERIC_FIRST_WORDS and len(words[0]) >= 3:
+                aliases.add(words[0])
+        return aliases
+
+    def _insert_prefix(self, text, listing_id):
+        node = self.trie
+        for char in text:
+            node = node.setdefault(char, {})
+            ids = node.setdefault("", [])
+            if len(ids) < PREFIX_LIMIT and listing_id not in ids:
+                ids.append(listing_id)
+
+    def _insert_grams(self, alias, listing_id):
+        position = len(self.alias_names)
+        alias_grams = trigrams(alias)
+        self.alias_names.append(alias)
+        self.alias_ids.append(listing_id)
+        self.alias_gram_counts.append(len(alias_grams))
+        for gram in alias_grams:
+            self.grams[gram].add(position)
+
+    def _allowed(self, ids, markets):
+        return [i for i in ids if markets is None or self.listings[i].market in markets]
+
+    def by_ticker(self, ticker, markets=None):
+        """Returns the listing with this exact ticker, or None."""
+        ticker = ticker.upper()
+        for suffix in SUFFIXES:
+            ticker = ticker.removesuffix(suffix)
+        ids = self._allowed(self.tickers.get(ticker, []), markets)
+        return self.listings[ids[0]] if ids else None
+
+    def by_alias(self, text, markets=None):
+        """Returns the listing whose name or short name is exactly `text`, if it is unambiguous."""
+        ids = self._allowed(self.aliases.get(normalize(text), ()), markets)
+        return self.listings[ids[0]] if len(ids) == 1 else None
+
+    def prefix(self, text, markets=None, limit=5):
+        """Returns listings with a name or ticker starting with `text`."""
+        node = self.trie
+        for char in normalize(text):
+            node = node.get(char)
+            if node is None:
+                return []
+        return [self.listings[i] for i in self._allowed(node.get("", []), markets)][:limit]
+
+    def fuzzy(self, text, markets=None, limit=5):
+        """Returns (listing, score) pairs for names similar to `text`, best first."""
+        query = normalize(text)
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.grams.get(gram, ()))
+
+        overlap = []
+        for position, count in shared.items():
+            if markets is None or self.listings[self.alias_ids[position]].market in markets:
+                overlap.append((2 * count / (len(query_grams) + self.alias_gram_counts[position]), position))
+        overlap.sort(reverse=True)
+
+        best = {}
+        for _, position in overlap[:FUZZY_CANDIDATES]:
+            listing_id = self.alias_ids[position]
+            score = SequenceMatcher(None, query, self.alias_names[position]).ratio()
+            if score > best.get(listing_id, 0):
+                best[listing_id] = score
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(self.listings[i], score) for i, score in ranked]
+
+    def resolve(self, text, markets=None):
+        """
+        Resolves a ticker or company name to a listing.
+
+        Tries, in order: exact ticker, exact name, a prefix matching a single
+        listing, and a clear fuzzy match. Text written like a ticker only gets
+        the exact lookups, so an unlisted ticker (AAP, MET) isn't swapped for a
+        similar listing. Returns None if nothing fits.
+        """
+        text = text.strip()
+        if not text:
+            return None
+        if TICKER_PATTERN.match(text):
+            listing = self.by_ticker(text, ticker_markets(text, markets))
+            if listing is None and len(text) > 5:
+                # Too long for a US ticker, so it may be a name in capitals ("MICROSOFT")
+                listing = self.by_alias(text, markets)
+            return listing
+        listing = self.by_ticker(text, markets) or self.by_alias(text, markets)
+        if listing is not None:
+            return listing
+        matches = self.prefix(text, markets, limit=2)
+        if len(matches) == 2:
+            # "micro" could be Microsoft or Micron
+            return None
+        if len(matches) == 1 and len(normalize(text)) >= 3:
+            return matches[0]
+        candidates = self.fuzzy(text, markets, limit=2)
+        if candidates and candidates[0][1] >= FUZZY_THRESHOLD:
+            if len(candidates) == 1 or candidates[0][1] - candidates[1][1] >= 0.1:
+                return candidates[0][0]
+        return None
+
+    def suggest(self, text, markets=None, limit=3):
+        """Returns tickers the user may have meant, for error messages."""
+        found = self.prefix(text, markets, limit)
+        found += [listing for listing, score in self.fuzzy(text, markets, limit) if score >= SUGGEST_THRESHOLD]
+        return list(dict.fromkeys(f"{listing.ticker} ({listing.name})" for listing in found))[:limit]
+
+
+def load_listings(config_path="data/config.json", listings_path="data/listings.json"):
+    """Reads the tracked US30 universe from the config plus the bundled listings file."""
+    with open(config_path, "r") as config_file:
+        config = json.load(config_file)
+    with open(listings_path, "r") as listings_file:
+        bundled = json.load(listings_file)
+
+    # The configured universe comes first so it wins prefix and alias ties
+    listings = {}
+    rows = [("US", stock) for stock in config["US30"]]
+    rows += [(market, row) for market in MARKETS for row in bundled.get(market, [])]
+    for market, row in rows:
+        key = (market, row["ticker"])
+        if key not in listings:
+            listings[key] = Listing(row["ticker"], row["name"], market, row.get("sector"))
+        elif listings[key].sector is None and row.get("sector"):
+            listings[key] = listings[key]._replace(sector=row["sector"])
+    return list(listings.values())
+
+
+index = SymbolIndex(load_listings())
+
+
+def resolve_symbol(text, markets=None):
+    """
+    Resolves a ticker or company name to its Yahoo Finance symbol before any network call.
+
+    Args:
+        text (str): Ticker or company name (e.g., 'AAPL', 'Apple', 'Reliance', 'bitcoin')
+        markets (tuple): Markets to search, from MARKETS; all of them by default
+
+    Returns:
+        str: The Yahoo Finance symbol (e.g., 'AAPL', 'RELIANCE.NS', 'BTC-USD')
+
+    Raises:
+        ValueError: If the text is neither a known listing nor written like a ticker
+    """
+    text = str(text).strip()
+    listing = index.resolve(text, markets)
+    if listing is not None:
+        # Keep an explicitly requested exchange, e.g. RELIANCE.BO
+        if text.upper().endswith(SUFFIXES) and index.by_ticker(text, markets) is not None:
+            return text.upper()
+        return yahoo_symbol(listing)
+    if TICKER_PATTERN.match(text):
+        if markets == ("crypto",) and not text.endswith("-USD"):
+            return f"{text}-USD"
+        return text
+    suggestions = index.suggest(text, markets)
+    hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+    raise ValueError(f"Couldn't find a ticker for '{text}'.{hint}")
@@ -0,0 +1,321 @@
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from data.resilience import yahoo_download
+
+
+# One regular US session of 1-minute bars
+SESSION_MINUTES = 390
+
+# Seconds between polls of the live feed
+POLL_SECONDS = 60
+
+# Bars belong to the trading session of their date in this timezone
+MARKET_TIMEZONE = "America/New_York"
+
+# Set to a recorded CSV to replay it instead of polling Yahoo
+REPLAY_ENV = "INTRADAY_REPLAY"
+
+REPLAY_COLUMNS = ["timestamp", "symbol", "close", "volume", "previous_close"]
+
+
+class RingBuffer:
+    """Fixed-size buffer of the latest bars of one symbol, stored in numpy arrays."""
+
+    def __init__(self, capacity=SESSION_MINUTES):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.closes = np.full(capacity, np.nan)
+        self.volumes = np.zeros(capacity)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _slot(self, offset):
+        return (self.start + offset) % self.capacity
+
+    def extend(self, timestamps, closes, volumes):
+        """Appends bars, oldest first. A bar with the latest stored timestamp replaces it."""
+        if self.size and len(timestamps) and timestamps[0] == self.timestamps[self._slot(self.size - 1)]:
+            # The still-forming minute was revised since the last poll
+            last = self._slot(self.size - 1)
+            self.closes[last], self.volumes[last] = closes[0], volumes[0]
+            timestamps, closes, volumes = timestamps[1:], closes[1:], volumes[1:]
+        count = len(timestamps)
+        if count == 0:
+            return
+        if count > self.capacity:
+            timestamps, closes, volumes = timestamps[-self.capacity:], closes[-self.capacity:], volumes[-self.capacity:]
+            count = self.capacity
+        slots = (self.start + self.size + np.arange(count)) % self.capacity
+        self.timestamps[slots] = timestamps
+        self.closes[slots] = closes
+        self.volumes[slots] = volumes
+        overflow = max(0, self.size + count - self.capacity)
+        self.start = (self.start + overflow) % self.capacity
+        self.size = min(self.capacity, self.size + count)
+
+    def last_timestamp(self):
+        return int(self.timestamps[self._slot(self.size - 1)]) if self.size else None
+
+    def view(self):
+        """Returns (timestamps, closes, volumes), oldest first."""
+        slots = (self.start + np.arange(self.size)) % self.capacity
+        return self.timestamps[slots], self.closes[slots], self.volumes[slots]
+
+
+def _session_date(timestamp):
+    """Trading session date of a bar's epoch-second timestamp."""
+    return pd.Timestamp(timestamp, unit="s", tz="UTC").tz_convert(MARKET_TIMEZONE).date()
+
+
+def _previous_closes(daily_close, session_date):
+    """Last daily close before the session date, per symbol."""
+    earlier = daily_close[daily_close.index.date < session_date]
+    return earlier.ffill().iloc[-1].to_dict() if not earlier.empty else {}
+
+
+class YahooFeed:
+    """Polls 1-minute bars of the whole universe from Yahoo with one batched download."""
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        self.seen = {}  # symbol -> timestamp of the latest bar already returned
+
+    def _download(self, **kwargs):
+        frame = yahoo_download(self.symbols, "refresh", progress=False, threads=True, **kwargs)
+        return {
+            field: frame[field].to_frame(self.symbols[0]) if isinstance(frame[field], pd.Series) else frame[field]
+            for field in ("Close", "Volume")
+        }
+
+    def reference_prices(self, session_date):
+        daily = self._download(period="5d", interval="1d")["Close"]
+        return _previous_closes(daily, session_date)
+
+    def poll(self):
+        """
+        Returns the bars published since the previous poll.
+
+        Returns:
+            dict: symbol -> (timestamps, closes, volumes) arrays, oldest first.
+            The bar of the latest minute seen is returned again, as it may have
+            been revised while forming.
+        """
+        frame = self._download(period="1d", interval="1m")
+        closes, volumes = frame["Close"], frame["Volume"]
+        timestamps = closes.index.as_unit("s").asi8 if len(closes) else np.array([], dtype=np.int64)
+        bars = {}
+        for symbol in closes.columns:
+            column = closes[symbol].to_numpy(dtype=float)
+            fresh = ~np.isnan(column) & (timestamps >= self.seen.get(symbol, 0))
+            if fresh.any():
+                bars[symbol] = (timestamps[fresh], column[fresh], volumes[symbol].to_numpy(dtype=float)[fresh])
+                self.seen[symbol] = int(timestamps[fresh][-1])
+        return bars
+
+
+class ReplayFeed:
+    """
+    Replays a CSV recorded by RecordingFeed, one or more minutes per poll,
+    so the intraday mode can run without Yahoo.
+    """
+
+    def __init__(self, path, minutes_per_poll=1):
+        self.frame = pd.read_csv(path).sort_values("timestamp", kind="stable")
+        self.symbols = list(dict.fromkeys(self.frame["symbol"]))
+        self.minutes = np.unique(self.frame["timestamp"].to_numpy())
+        self.minutes_per_poll = minutes_per_poll
+        self.cursor = 0
+
+    @property
+    def exhausted(self):
+        return self.cursor >= len(self.minutes)
+
+    def reference_prices(self, session_date):
+        return self.frame.groupby("symbol")["previous_close"].first().to_dict()
+
+    def poll(self):
+        if self.exhausted:
+            return {}
+        end = self.minutes[min(self.cursor + self.minutes_per_poll, len(self.minutes)) - 1]
+        start = self.minutes[self.cursor]
+        self.cursor += self.minutes_per_poll
+        rows = self.frame[(self.frame["timestamp"] >= start) & (self.frame["timestamp"] <= end)]
+        return {
+            symbol: (
+                group["timestamp"].to_numpy(dtype=np.int64),
+                group["close"].to_numpy(dtype=float),
+                group["volume"].to_numpy(dtype=float),
+            )
+            for symbol, group in rows.groupby("symbol", sort=False)
+        }
+
+
+class RecordingFeed:
+    """Wraps a feed and appends every polled bar to a CSV that ReplayFeed can play back."""
+
+    def __init__(self, feed, path):
+        self.feed = feed
+        self.symbols = feed.symbols
+        self.path = path
+        self.references = {}
+        if not os.path.exists(path):
+            with open(path, "w", newline="") as file:
+                csv.writer(file).writerow(REPLAY_COLUMNS)
+
+    def reference_prices(self, session_date):
+        self.references = self.feed.reference_prices(session_date)
+        return self.references
+
+    def poll(self):
+        bars = self.feed.poll()
+        with open(self.path, "a", newline="") as file:
+            writer = csv.writer(file)
+            for symbol, (timestamps, closes, volumes) in bars.items():
+                previous_close = self.references.get(symbol, "")
+                writer.writerows(zip(timestamps, [symbol] * len(timestamps), closes, volumes, [previous_close] * len(timestamps)))
+        return bars
+
+
+class IntradayMovers:
+    """
+    Tracks intraday percent change of a universe of symbols from polled bars.
+
+    Each poll only touches the symbols that received bars: their ring buffers
+    are extended and their entries in the change array recomputed. Movers are
+    ranked again only when something changed.
+
+    The first bar of a new date starts a new session: the previous closes are
+    fetched again and the buffers cleared, so a long-running tracker doesn't
+    measure today's bars against an older close.
+    """
+
+    def __init__(self, feed, names=None, capacity=SESSION_MINUTES, top_n=5):
+        self.feed = feed
+        self.names = names or {}
+        self.capacity = capacity
+        self.top_n = top_n
+        self.symbols = list(feed.symbols)
+        self.positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.session_date = None  # date of the session being tracked, None before the first bar
+        self.reference = np.full(len(self.symbols), np.nan)
+        self._clear()
+        self.polled_at = 0
+        self.error = None  # message of the latest poll, if it failed
+        self._lock = threading.Lock()
+
+    def _clear(self):
+        self.buffers = {symbol: RingBuffer(self.capacity) for symbol in self.symbols}
+        self.last = np.full(len(self.symbols), np.nan)
+        self.change = np.full(len(self.symbols), np.nan)
+        self.updated_at = None  # timestamp of the latest bar applied
+        self._movers = None
+
+    def start_session(self, session_date):
+        """Fetches the previous closes for a new session and drops the bars of the previous one."""
+        references = self.feed.reference_prices(session_date)
+        self.reference = np.array([references.get(symbol, np.nan) for symbol in self.symbols], dtype=float)
+        self._clear()
+        self.session_date = session_date
+
+    def apply(self, bars):
+        """Applies polled bars. Returns the number of symbols that changed."""
+        latest = max((int(timestamps[-1]) for timestamps, _, _ in bars.values() if len(timestamps)), default=None)
+        if latest is not None and (self.session_date is None or _session_date(latest) > self.session_date):
+            self.start_session(_session_date(latest))
+        changed = []
+        for symbol, (timestamps, closes, volumes) in bars.items():
+            position = self.positions.get(symbol)
+            if position is None or len(timestamps) == 0:
+                continue
+            self.buffers[symbol].extend(timestamps, closes, volumes)
+            self.last[position] = closes[-1]
+            self.updated_at = max(self.updated_at or 0, int(timestamps[-1]))
+            changed.append(position)
+        if changed:
+            changed = np.array(changed)
+            self.change[changed] = (self.last[changed] - self.reference[changed]) / self.reference[changed] * 100
+            self._movers = None
+        return len(changed)
+
+    def poll(self, min_interval=0):
+        """
+        Polls the feed unless the previous poll was less than `min_interval` seconds ago.
+        Safe to call from several Streamlit sessions sharing one tracker. A failed
+        poll is kept in `error` until the next one succeeds.
+        """
+        with self._lock:
+            if time.monotonic() - self.polled_at < min_interval:
+                return 0
+            self.polled_at = time.monotonic()
+            try:
+                changed = self.apply(self.feed.poll())
+            except Exception as e:
+                print(f"Error polling intraday bars: {e}")
+                self.error = str(e)
+                return 0
+            self.error = None
+            return changed
+
+    def _row(self, position):
+        symbol = self.symbols[position]
+        return {
+            "symbol": symbol,
+            "company_name": self.names.get(symbol, "Unknown"),
+            "current_price": float(self.last[position]),
+            "percent_change": float(self.change[position]),
+        }
+
+    def movers(self):
+        """Returns (gainers, losers) in the same format as the daily snapshot."""
+        with self._lock:
+            if self._movers is None:
+                valid = np.flatnonzero(~np.isnan(self.change))
+                ranked = valid[np.argsort(-self.change[valid], kind="stable")]
+                gainers = [self._row(i) for i in ranked[:self.top_n] if self.change[i] > 0]
+                losers = [self._row(i) for i in ranked[::-1][:self.top_n] if self.change[i] < 0]
+                self._movers = (gainers, losers)
+            return self._movers
+
+
+def create_tracker(config_path="data/config.json"):
+    """Builds a tracker for the US30 universe, replaying INTRADAY_REPLAY if it is set."""
+    with open(config_path, "r") as config_file:
+        config = json.load(config_file)
+    names = {stock["ticker"]: stock["name"] for stock in config["US30"]}
+    replay = os.environ.get(REPLAY_ENV)
+    feed = ReplayFeed(replay) if replay else YahooFeed(names)
+    return IntradayMovers(feed, names)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print intraday movers of the US30 universe.")
+    parser.add_argument("--replay", help="CSV of recorded bars to replay instead of polling Yahoo")
+    parser.add_argument("--record", help="CSV to append polled live bars to")
+    parser.add_argument("--polls", type=int, default=5)
+    args = parser.parse_args()
+
+    with open("data/config.json", "r") as config_file:
+        names = {stock["ticker"]: stock["name"] for stock in json.load(config_file)["US30"]}
+    feed = ReplayFeed(args.replay) if args.replay else YahooFeed(names)
+    if args.record:
+        feed = RecordingFeed(feed, args.record)
+    tracker = IntradayMovers(feed, names)
+    for poll in range(args.polls):
+        if poll and not args.replay:
+            time.sleep(POLL_SECONDS)
+        changed = tracker.poll()
+        gainers, losers = tracker.movers()
+        print(f"Poll {poll + 1}: {changed} symbols changed")
+        print("  Gainers:", ", ".join(f"{row['symbol']} {row['percent_change']:+.2f}%" for row in gainers))
+        print("  Losers: ", ", ".join(f"{row['symbol']} {row['percent_change']:+.2f}%" for row in losers))
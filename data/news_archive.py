@@ -0,0 +1,139 @@
+import re
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+
+
+# Relative weight of each indexed column in the bm25 ranking
+COLUMN_WEIGHTS = {"title": 10.0, "description": 4.0, "summary": 2.0, "keywords": 6.0}
+
+
+class NewsArchive:
+    """
+    Every enriched article the refresh has fetched, searchable by keyword and date.
+
+    Articles are stored once per URL with an SQLite FTS5 index over title,
+    description, summary and keywords, ranked with bm25. On SQLite builds
+    without FTS5 the search falls back to substring matching.
+    """
+
+    def __init__(self, path="data/news_archive.db"):
+        self.path = path
+        with closing(self._connect()) as db, db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS articles ("
+                "id INTEGER PRIMARY KEY, url TEXT UNIQUE, title TEXT, description TEXT, summary TEXT, "
+                "keywords TEXT, source TEXT, published_at TEXT, market TEXT)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS articles_published ON articles (published_at)")
+            try:
+                db.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5("
+                    "title, description, summary, keywords, "
+                    "content='articles', content_rowid='id', tokenize='porter unicode61')"
+                )
+                self.full_text = True
+            except sqlite3.OperationalError:
+                print("SQLite has no FTS5 support, news search falls back to substring matching")
+                self.full_text = False
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def add(self, articles, market=None):
+        """Archives enriched articles; ones already archived (same URL) are skipped. Returns the number added."""
+        added = 0
+        with closing(self._connect()) as db, db:
+            for article in articles:
+                if not article.get("url"):
+                    continue
+                row = (
+                    article["url"],
+                    article.get("title", ""),
+                    article.get("description") or "",
+                    article.get("summary") or "",
+                    " ".join(article.get("keywords") or []),
+                    article.get("source", ""),
+                    article.get("published_at", ""),
+                    market,
+                )
+                cursor = db.execute("INSERT OR IGNORE INTO articles VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+                if cursor.rowcount == 1:
+                    added += 1
+                    if self.full_text:
+                        db.execute(
+                            "INSERT INTO articles_fts (rowid, title, description, summary, keywords) VALUES (?, ?, ?, ?, ?)",
+                            (cursor.lastrowid, *row[1:5]),
+                        )
+        return added
+
+    def search(self, query, start_date=None, end_date=None, market=None, limit=5):
+        """
+        Returns archived articles matching every word of `query`, best match first.
+        If no article has all the words, articles with any of them are returned.
+
+        Args:
+            query (str): Keywords (e.g. 'nvidia earnings')
+            start_date (str): Earliest publication date, YYYY-MM-DD
+            end_date (str): Latest publication date, YYYY-MM-DD, inclusive
+            market (str): 'stock' or 'crypto' to search one market's news only
+            limit (int): Maximum number of articles
+        """
+        terms = [term.lower() for term in re.findall(r"\w+", query)]
+        if not terms:
+            return []
+        filters, params = [], []
+        if start_date:
+            filters.append("a.published_at >= ?")
+            params.append(start_date)
+        if end_date:
+            end = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+            filters.append("a.published_at < ?")
+            params.append(end.strftime("%Y-%m-%d"))
+        if market:
+            filters.append("a.market = ?")
+            params.append(market)
+
+        with closing(self._connect()) as db:
+            for operator in (" AND ", " OR "):
+                rows = self._search(db, terms, operator, filters, params, limit)
+                if rows or len(terms) == 1:
+                    break
+        columns = ["title", "description", "url", "source", "published_at", "market"]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def _search(self, db, terms, operator, filters, params, limit):
+        where = "".join(f" AND {condition}" for condition in filters)
+        if self.full_text:
+            match = operator.join(f'"{term}"' for term in terms)
+            weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS.values())
+            return db.execute(
+                "SELECT a.title, a.description, a.url, a.source, a.published_at, a.market "
+                "FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid "
+                f"WHERE articles_fts MATCH ?{where} "
+                f"ORDER BY bm25(articles_fts, {weights}), a.published_at DESC LIMIT ?",
+                (match, *params, limit),
+            ).fetchall()
+
+        # Substring fallback: title hits count three times as much as hits elsewhere
+        text = "lower(a.title || ' ' || a.description || ' ' || a.summary || ' ' || a.keywords)"
+        conditions = operator.join(f"instr({text}, ?) > 0" for _ in terms)
+        score = " + ".join("(instr(lower(a.title), ?) > 0) * 3 + (instr(" + text + ", ?) > 0)" for _ in terms)
+        score_params = [value for term in terms for value in (term, term)]
+        return db.execute(
+            "SELECT a.title, a.description, a.url, a.source, a.published_at, a.market FROM articles a "
+            f"WHERE ({conditions}){where} ORDER BY ({score}) DESC, a.published_at DESC LIMIT ?",
+            (*terms, *params, *score_params, limit),
+        ).fetchall()
+
+    def __len__(self):
+        with closing(self._connect()) as db:
+            return db.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+
+def days_ago(days):
+    """Date `days` days before today (UTC) as YYYY-MM-DD."""
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+news_archive = NewsArchive()
@@ -0,0 +1,146 @@
+import json
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+
+
+PRIORITIES = ("refresh", "interactive")
+
+# How long each priority class waits for a token before giving up
+WAIT_TIMEOUTS = {"refresh": 60, "interactive": 5}
+
+
+class RateLimitExceeded(Exception):
+    """Raised when no token frees up in time or the daily quota is used up."""
+
+
+class RateLimiter:
+    """
+    Token buckets per upstream and priority class, shared between processes.
+
+    Each priority class gets its own share of an upstream's rate, burst and
+    daily quota, so chat traffic can't starve the scheduled refresh and the
+    refresh can't starve chat. State lives in a SQLite file and every update
+    runs in a BEGIN IMMEDIATE transaction, so the Streamlit app, the refresh
+    scheduler and the API service all draw from the same buckets.
+    """
+
+    def __init__(self, limits, path="data/ratelimit.db"):
+        self.limits = limits
+        self.path = path
+        with closing(self._connect()) as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "upstream TEXT, priority TEXT, tokens REAL, updated REAL, "
+                "PRIMARY KEY (upstream, priority))"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS quota ("
+                "upstream TEXT, priority TEXT, day TEXT, used INTEGER, "
+                "PRIMARY KEY (upstream, priority, day))"
+            )
+
+    def _connect(self):
+        # Autocommit mode, so transactions are opened explicitly with BEGIN IMMEDIATE
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _share(self, upstream, priority):
+        limit = self.limits[upstream]
+        share = limit["shares"][priority]
+        daily_quota = limit.get("daily_quota")
+        return (
+            limit["per_second"] * share,
+            max(1.0, limit["burst"] * share),
+            None if daily_quota is None else int(daily_quota * share),
+        )
+
+    def _try_acquire(self, db, upstream, priority, now, day):
+        """Takes one token if possible. Returns 0 on success, else seconds until the next token."""
+        rate, burst, daily_quota = self._share(upstream, priority)
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if daily_quota is not None:
+                row = db.execute(
+                    "SELECT used FROM quota WHERE upstream = ? AND priority = ? AND day = ?",
+                    (upstream, priority, day),
+                ).fetchone()
+                if row is not None and row[0] >= daily_quota:
+                    raise RateLimitExceeded(f"Daily {priority} quota of {daily_quota} {upstream} requests is used up.")
+
+            row = db.execute(
+                "SELECT tokens, updated FROM buckets WHERE upstream = ? AND priority = ?",
+                (upstream, priority),
+            ).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            if tokens < 1:
+                db.execute("COMMIT")
+                return (1 - tokens) / rate
+
+            db.execute(
+                "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)",
+                (upstream, priority, tokens - 1, now),
+            )
+            db.execute(
+                "INSERT INTO quota VALUES (?, ?, ?, 1) "
+                "ON CONFLICT (upstream, priority, day) DO UPDATE SET used = used + 1",
+                (upstream, priority, day),
+            )
+            db.execute("COMMIT")
+            return 0
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def acquire(self, upstream, priority="interactive", timeout=None):
+        """
+        Waits for a token from the upstream's bucket for this priority class.
+
+        Args:
+            upstream (str): Upstream name, a key of the configured limits
+            priority (str): 'refresh' or 'interactive'
+            timeout (float): Seconds to wait at most; defaults to WAIT_TIMEOUTS
+
+        Raises:
+            RateLimitExceeded: If the daily quota is used up or no token frees up in time
+        """
+        if upstream not in self.limits:
+            return
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        deadline = time.time() + (WAIT_TIMEOUTS[priority] if timeout is None else timeout)
+        with closing(self._connect()) as db:
+            while True:
+                now = time.time()
+                wait = self._try_acquire(db, upstream, priority, now, _today())
+                if wait == 0:
+                    return
+                if now + wait > deadline:
+                    raise RateLimitExceeded(f"Too many {upstream} requests right now, try again in a few seconds.")
+                time.sleep(wait)
+
+    def usage(self):
+        """Returns today's request counts and quotas per upstream and priority class."""
+        with closing(self._connect()) as db:
+            used = {
+                (upstream, priority): count
+                for upstream, priority, count in db.execute(
+                    "SELECT upstream, priority, used FROM quota WHERE day = ?", (_today(),)
+                )
+            }
+        return {
+            upstream: {
+                priority: {"used": used.get((upstream, priority), 0), "quota": self._share(upstream, priority)[2]}
+                for priority in PRIORITIES
+            }
+            for upstream in self.limits
+        }
+
+
+def _today():
+    # API quotas reset at midnight UTC
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+with open("data/config.json", "r") as config_file:
+    rate_limiter = RateLimiter(json.load(config_file)["rate_limits"])
@@ -0,0 +1,201 @@
+import threading
+import time
+
+import yfinance as yf
+from yfinance.exceptions import YFPricesMissingError, YFTzMissingError
+
+from chatbot.cache import TTLCache
+from data.ratelimit import rate_limiter
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Fails fast while an upstream is unhealthy.
+
+    After `failure_threshold` consecutive failures the breaker opens and every
+    call is rejected for `reset_timeout` seconds. Then a single trial call is
+    let through (half-open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0  # consecutive failures
+        self.trips = 0
+        self.rejected = 0
+        self.calls = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "closed" or (self.state == "half_open" and not self._trial_running):
+                self._trial_running = self.state == "half_open"
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.calls += 1
+            self.failures = 0
+            self.state = "closed"
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                    print(f"Circuit breaker for {self.name} opened after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def is_open(self):
+        """Checks whether calls are being rejected, without counting a rejection."""
+        with self._lock:
+            return self.state == "open" and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def call(self, function, *args, **kwargs):
+        """Calls `function` through the breaker, raising CircuitOpenError while it is open."""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} is unavailable right now, try again later.")
+        try:
+            result = function(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "trips": self.trips,
+                "rejected_calls": self.rejected,
+                "calls": self.calls,
+            }
+
+
+# One breaker per upstream, shared by the refresh pipeline and the chatbot
+breakers = {
+    "yahoo": CircuitBreaker("yahoo"),
+    "coingecko": CircuitBreaker("coingecko", failure_threshold=3, reset_timeout=120),
+    "newsapi": CircuitBreaker("newsapi", failure_threshold=3, reset_timeout=300),
+    "alternative_me": CircuitBreaker("alternative_me", failure_threshold=3, reset_timeout=120),
+}
+
+# Symbols Yahoo reported as unknown (delisted or misspelled), remembered for a few hours
+unknown_symbols = TTLCache(maxsize=2048, ttl=6 * 60 * 60)
+
+# Yahoo's chart error for a symbol it doesn't know ("No data found, symbol may be delisted")
+UNKNOWN_SYMBOL_ERROR = "symbol may be delisted"
+
+
+def check_symbol(symbol):
+    """Raises ValueError right away if Yahoo recently reported `symbol` as unknown."""
+    reason = unknown_symbols.get(symbol.upper())
+    if reason is not None:
+        raise ValueError(reason)
+
+
+def mark_unknown_symbol(symbol, reason):
+    unknown_symbols.set(symbol.upper(), reason)
+
+
+def call_upstream(upstream, priority, function, *args, **kwargs):
+    """
+    Calls an upstream through its rate limiter and circuit breaker.
+
+    Args:
+        upstream (str): Upstream name, a key of `breakers`
+        priority (str): 'refresh' for the scheduled refresh, 'interactive' for chat requests
+        function (callable): The request to make; remaining arguments are passed to it
+    """
+    breaker = breakers[upstream]
+    # Don't spend a token or quota on a request the breaker would reject anyway
+    if breaker.is_open():
+        breaker.allow()
+        raise CircuitOpenError(f"{upstream} is unavailable right now, try again later.")
+    rate_limiter.acquire(upstream, priority)
+    return breaker.call(function, *args, **kwargs)
+
+
+def _unknown_symbol(error):
+    """Whether a yfinance error is Yahoo saying the symbol doesn't exist, rather than a failed request."""
+    return isinstance(error, YFPricesMissingError) and UNKNOWN_SYMBOL_ERROR in str(error).lower()
+
+
+def yahoo_history(symbol, priority, **kwargs):
+    """
+    Gets yf.Ticker(symbol).history(**kwargs) through the Yahoo limiter and breaker.
+
+    yfinance returns an empty frame on throttling and network errors unless
+    asked to raise, so raise_errors=True lets those failures reach the breaker.
+    Its "missing ticker" errors are also raised for failed timezone lookups and
+    Yahoo status errors, so only Yahoo's own "no data found" answer counts as
+    an unknown symbol.
+
+    Returns:
+        pd.DataFrame: The history, or None if Yahoo reported the symbol as unknown;
+            that isn't a failure of the upstream, so the breaker doesn't count it
+    """
+    def history():
+        ticker = yf.Ticker(symbol)
+        try:
+            return ticker.history(raise_errors=True, **kwargs)
+        except YFTzMissingError:
+            # A failed timezone lookup looks the same for unknown symbols and failed
+            # requests; a short chart request gets Yahoo's answer for the symbol
+            try:
+                ticker.history(period="5d", raise_errors=True)
+            except YFPricesMissingError as error:
+                if _unknown_symbol(error):
+                    return None
+            raise
+        except YFPricesMissingError as error:
+            if _unknown_symbol(error):
+                return None
+            raise
+
+    return call_upstream("yahoo", priority, history)
+
+
+def yahoo_download(symbols, priority, **kwargs):
+    """
+    Gets yf.download(symbols, **kwargs) through the Yahoo limiter and breaker.
+
+    yf.download reports failed symbols as empty columns whatever went wrong, so
+    a download without a single price counts as a failure of the upstream. Use
+    yahoo_history to find out whether a missing symbol is actually unknown.
+    """
+    def download():
+        frame = yf.download(symbols, **kwargs)
+        if frame.empty or frame["Close"].isna().all().all():
+            raise ConnectionError(f"Yahoo returned no prices for {len(symbols)} symbols")
+        return frame
+
+    return call_upstream("yahoo", priority, download)
+
+
+def resilience_metrics():
+    """Returns breaker states and counters per upstream, negative-cache stats and today's quota usage."""
+    return {
+        "breakers": {name: breaker.metrics() for name, breaker in breakers.items()},
+        "unknown_symbols": unknown_symbols.stats(),
+        "quotas": rate_limiter.usage(),
+    }
@@ -0,0 +1,35 @@
+"""
+Reads the market snapshots written by data/update_data.py.
+
+Only the standard library is used, so read-only consumers such as the API
+service don't need the app's dependencies.
+"""
+import json
+from pathlib import Path
+
+
+# Paths to JSON files
+CRYPTO_FILE = Path("data/crypto_data.json")
+STOCK_FILE = Path("data/stock_data.json")
+
+# Parsed snapshots by file path, with the (mtime, size) they were read at
+_snapshots = {}
+
+
+def read_snapshot(file_path):
+    """
+    Read the snapshot in the specified JSON file without ever refreshing it.
+    The file is only parsed again after it changes on disk. Returns None if it doesn't exist yet.
+    """
+    try:
+        stat = file_path.stat()
+    except FileNotFoundError:
+        return None
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _snapshots.get(file_path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with open(file_path, "r") as file:
+        data = json.load(file)
+    _snapshots[file_path] = (version, data)
+    return data
@@ -1,17 +1,28 @@
 import requests
 import json
+import gzip
+import os
 from datetime import datetime, timedelta
 import schedule
 import time
-import yfinance as yf
 import numpy as np
+import pandas as pd
 from zoneinfo import ZoneInfo
 from newspaper import Article, Config
 import nltk
 from typing import List, Dict
+import sys
+from pathlib import Path
 
 import streamlit as st
 
+# Add the parent directory to sys.path so the script also runs on its own
+PARENT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PARENT_DIR))
+
+from data.resilience import call_upstream, mark_unknown_symbol, yahoo_download, yahoo_history
+from data.news_archive import news_archive
+
 
 timezone = ZoneInfo("America/New_York")
 
@@ -24,6 +35,8 @@ urls = config["urls"]
 TOP_30_STOCKS = [ stock["ticker"] for stock in config["US30"]]
 
 ticker_to_name = {stock["ticker"]: stock["name"] for stock in config["US30"]}
+ticker_to_sector = {stock["ticker"]: stock.get("sector", "Other") for stock in config["US30"]}
+DOW_DIVISOR = config["dow_divisor"]
 
 # Keywords for both stocks and crypto
 stock_keywords = config['stock_keywords']
@@ -37,73 +50,130 @@ except LookupError:
     nltk.download('punkt')
 
 
-
-
-# Fetch stock data using yfinance
-def fetch_stock_data(symbol):
-    try:
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period="5d")  # Fetch the last 2 days of data
-        
-        if not hist.empty and len(hist) > 1:
-            prev_close = hist['Close'].iloc[-2]
-            current_price = hist['Close'].iloc[-1]
-            percent_change = ((current_price - prev_close) / prev_close) * 100
-            return {
+def _get_json(url, params=None, timeout=10):
+    response = requests.get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+# Download daily closes and volumes of several stocks in one request
+def fetch_stocks_history(symbols, period="5d"):
+    frame = yahoo_download(symbols, "refresh", period=period, progress=False, threads=True)
+    close = frame["Close"].reindex(columns=symbols)
+    volume = frame["Volume"].reindex(columns=symbols)
+    # An empty column may just be a failed request; only remember symbols Yahoo confirms are unknown
+    for symbol in close.columns[close.isna().all()]:
+        try:
+            if yahoo_history(symbol, "refresh", period=period) is None:
+                mark_unknown_symbol(symbol, f"No price data found for {symbol}.")
+        except Exception as e:
+            print(f"Error checking {symbol}: {e}")
+    return close, volume
+
+
+# Latest close, previous close, percent change and latest volume of each stock
+def compute_daily_changes(close, volume):
+    # Carry the previous close forward for a stock whose latest bar is late
+    filled = close.dropna(how="all").ffill()
+    changes = pd.DataFrame({
+        "current_price": filled.iloc[-1],
+        "previous_close": filled.iloc[-2],
+        "volume": volume.reindex(filled.index).iloc[-1].fillna(0),
+    })
+    changes["percent_change"] = (changes["current_price"] - changes["previous_close"]) / changes["previous_close"] * 100
+    return changes.dropna(subset=["percent_change"])
+
+
+# Top n gainers and losers in the snapshot format
+def rank_movers(changes, n=5):
+    ranked = changes.sort_values("percent_change", ascending=False, kind="stable")
+
+    def rows(frame):
+        return [
+            {
                 "symbol": symbol,
-                "current_price": current_price,
-                "percent_change": percent_change
+                "company_name": ticker_to_name.get(symbol, "Unknown"),
+                "current_price": float(row.current_price),
+                "percent_change": float(row.percent_change)
             }
-        return None
-    except Exception as e:
-        print(f"Error fetching data for {symbol}: {e}")
-        return None
+            for symbol, row in frame.iterrows()
+        ]
+
+    top_gainers = rows(ranked[ranked["percent_change"] > 0].head(n))
+    top_losers = rows(ranked[ranked["percent_change"] < 0].iloc[::-1].head(n))
+    return top_gainers, top_losers
+
+
+# Price-weighted index, sector breadth and up/down volume from the same daily changes
+def compute_market_aggregates(changes):
+    level = changes["current_price"].sum() / DOW_DIVISOR
+    previous_level = changes["previous_close"].sum() / DOW_DIVISOR
+
+    direction = np.sign(changes["percent_change"])
+    by_sector = changes.assign(
+        sector=changes.index.map(lambda symbol: ticker_to_sector.get(symbol, "Other")),
+        advancing=direction > 0,
+        declining=direction < 0,
+    ).groupby("sector")
+    sectors = pd.DataFrame({
+        "advancers": by_sector["advancing"].sum(),
+        "decliners": by_sector["declining"].sum(),
+        "average_change": by_sector["percent_change"].mean(),
+    }).sort_values("average_change", ascending=False)
+
+    up_volume = changes["volume"][direction > 0].sum()
+    down_volume = changes["volume"][direction < 0].sum()
+
+    return {
+        "index": {
+            "level": float(level),
+            "change": float(level - previous_level),
+            "percent_change": float((level - previous_level) / previous_level * 100),
+            "components": int(len(changes)),
+        },
+        "breadth": {
+            "advancers": int((direction > 0).sum()),
+            "decliners": int((direction < 0).sum()),
+            "unchanged": int((direction == 0).sum()),
+        },
+        "sectors": [
+            {
+                "sector": sector,
+                "advancers": int(row.advancers),
+                "decliners": int(row.decliners),
+                "average_change": float(row.average_change)
+            }
+            for sector, row in sectors.iterrows()
+        ],
+        "volume": {
+            "up_volume": float(up_volume),
+            "down_volume": float(down_volume),
+            "up_down_ratio": float(up_volume / down_volume) if down_volume else None,
+        },
+    }
 
 
-# Fetch top 5 gainers and losers from top US30 stocks
+# Fetch top 5 gainers and losers from top US30 stocks, plus index and sector aggregates
 def fetch_market_gainers_and_losers():
-    all_stocks = []
     try:
-        for symbol in TOP_30_STOCKS:
-            stock_data = fetch_stock_data(symbol)
-            if stock_data and stock_data['percent_change'] is not None:
-                # Add the company name from the US30 mapping
-                stock_data["company_name"] = ticker_to_name.get(symbol, "Unknown")
-                
-                # Reorder keys to match the required format
-                reordered_stock_data = {
-                    "symbol": stock_data["symbol"],
-                    "company_name": stock_data["company_name"],
-                    "current_price": stock_data["current_price"],
-                    "percent_change": stock_data["percent_change"]
-                }
+        close, volume = fetch_stocks_history(TOP_30_STOCKS)
+        changes = compute_daily_changes(close, volume)
+        top_gainers, top_losers = rank_movers(changes)
+        return top_gainers, top_losers, compute_market_aggregates(changes)
 
-                all_stocks.append(reordered_stock_data)
-        
-        # Sort the stocks based on percentage change
-        sorted_stocks = sorted(all_stocks, key=lambda x: x['percent_change'], reverse=True)
-        
-        # Get top gainers and losers
-        top_gainers = [x for x in sorted_stocks[:5] if x['percent_change'] > 0]
-        top_losers = [x for x in sorted_stocks[-1:-6:-1] if x['percent_change'] < 0]
-        
-        return top_gainers, top_losers
-    
     except Exception as e:
         print(f"Error fetching market data: {e}")
-        return [], []
+        return [], [], None
 
 
 
 # Fetch cryptocurrency top gainers and losers using CoinGecko
 def fetch_crypto_gainers_and_losers():
     try:
-        response = requests.get(urls["crypto_gainers_losers"], params={
+        crypto_data = call_upstream("coingecko", "refresh", _get_json, urls["crypto_gainers_losers"], params={
             "vs_currency": "usd",
             "order": "market_cap_desc"
-        }, timeout=10)
-        response.raise_for_status()
-        crypto_data = response.json()
+        })
 
         top_gainers, top_losers=[],[]
         for x in sorted(crypto_data, key=lambda x: x['price_change_percentage_24h'], reverse=True)[:5]:
@@ -122,9 +192,8 @@ def fetch_crypto_gainers_and_losers():
 # Fetch VIX for stocks
 def fetch_stock_volatility():
     try:
-        vix = yf.Ticker("^VIX")
-        vix_history = vix.history(period="1d")
-        if not vix_history.empty:
+        vix_history = yahoo_history("^VIX", "refresh", period="1d")
+        if vix_history is not None and not vix_history.empty:
             return {"vix_level": vix_history['Close'].iloc[-1]}
         return {"vix_level": "N/A"}
     except Exception as e:
@@ -133,13 +202,11 @@ def fetch_stock_volatility():
 
 def fetch_bitcoin_volatility():
     try:
-        response = requests.get("https://api.coingecko.com/api/v3/coins/bitcoin/market_chart", params={
+        data = call_upstream("coingecko", "refresh", _get_json, "https://api.coingecko.com/api/v3/coins/bitcoin/market_chart", params={
             "vs_currency": "usd",
             "days": "30",
             "interval": "daily"
-        }, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        })
 
         # Extract daily prices
         prices = [price[1] for price in data["prices"]]
@@ -154,9 +221,7 @@ def fetch_bitcoin_volatility():
 # Fetch Greed Index for stocks
 def fetch_stock_greed_index():
     try:
-        response = requests.get(urls["greed_index_stocks"], timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = call_upstream("alternative_me", "refresh", _get_json, urls["greed_index_stocks"])
         return data.get("data", [{}])[0]
     except Exception as e:
         print(f"Error fetching stock Greed Index: {e}")
@@ -166,16 +231,14 @@ def fetch_stock_greed_index():
 # Fetch Greed Index for crypto
 def fetch_crypto_greed_index():
     try:
-        response = requests.get(urls["greed_index_crypto"], timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = call_upstream("alternative_me", "refresh", _get_json, urls["greed_index_crypto"])
         return data.get("data", [{}])[0]
     except Exception as e:
         print(f"Error fetching crypto Greed Index: {e}")
         return None
 
-def fetch_news(keywords):
-    articles = fetch_and_enrich_news(keywords)
+def fetch_news(keywords, market=None):
+    articles = fetch_and_enrich_news(keywords, market)
     if articles:
         formatted_articles=[]
 
@@ -188,12 +251,14 @@ def fetch_news(keywords):
     return []
         
 
-def fetch_and_enrich_news(keywords: List[str]) -> List[Dict]:
+def fetch_and_enrich_news(keywords: List[str], market: str = None) -> List[Dict]:
     """
     Fetch news articles and enrich them with full content and summaries.
+    Every enriched article is also added to the searchable news archive.
     
     Args:
         keywords (List[str]): List of keywords to search for
+        market (str): 'stock' or 'crypto', recorded with the archived articles
         
     Returns:
         List[Dict]: List of enriched news articles
@@ -213,9 +278,7 @@ def fetch_and_enrich_news(keywords: List[str]) -> List[Dict]:
             'from': yesterday,
         }
         
-        response = requests.get(urls["news_data"], params=params)
-        response.raise_for_status()
-        data = response.json()
+        data = call_upstream("newsapi", "refresh", _get_json, urls["news_data"], params=params)
         
         if data.get("status") != "ok":
             print("API response not OK:", data.get("message", "Unknown error"))
@@ -278,6 +341,11 @@ def fetch_and_enrich_news(keywords: List[str]) -> List[Dict]:
                 # Add the article with basic info even if enrichment fails
                 continue
 
+        try:
+            news_archive.add(enriched_articles, market)
+        except Exception as e:
+            print(f"Error archiving news articles: {e}")
+
         return enriched_articles
 
     except Exception as e:
@@ -313,8 +381,11 @@ def save_data_to_json(data, file_name):
     file_path="data/"+file_name+".json"
     # Ensure the directory exists before trying to save the file
     try:
-        with open(file_path, "w") as json_file:
-            json.dump(data_with_time, json_file, indent=4)
+        body = json.dumps(data_with_time, indent=4).encode()
+        # Gzipped copy for the API service; both files are swapped in whole so
+        # readers never see a half-written snapshot
+        _write_atomic(file_path + ".gz", gzip.compress(body, compresslevel=9, mtime=0))
+        _write_atomic(file_path, body)
         print(f"{file_path} saved successfully at {timestamp}")
     except Exception as e:
         print(f"Error saving data: {e}")
@@ -323,6 +394,12 @@ def save_data_to_json(data, file_name):
 
 
 
+def _write_atomic(file_path, body):
+    temp_path = file_path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(body)
+    os.replace(temp_path, file_path)
+
 
 # Automate data refresh
 def refresh_data():
@@ -331,15 +408,16 @@ def refresh_data():
 
 
     # Stocks data
-    top_stock_gainers, top_stock_losers = fetch_market_gainers_and_losers()
+    top_stock_gainers, top_stock_losers, stock_aggregates = fetch_market_gainers_and_losers()
     stock_volatility = fetch_stock_volatility()
     stock_greed_index = fetch_stock_greed_index()
-    stock_news = fetch_news(stock_keywords)
+    stock_news = fetch_news(stock_keywords, "stock")
 
     # Save stock data without Fear & Greed Index
     save_data_to_json({
         "gainers": top_stock_gainers,
         "losers": top_stock_losers,
+        "aggregates": stock_aggregates,
         "volatility": stock_volatility,
         "greed_index": stock_greed_index,
         "news": stock_news
@@ -350,7 +428,7 @@ def refresh_data():
     bitcoin_volatility = fetch_bitcoin_volatility()
     top_crypto_gainers, top_crypto_losers = fetch_crypto_gainers_and_losers()
     crypto_greed_index = fetch_crypto_greed_index()
-    crypto_news = fetch_news(crypto_keywords)
+    crypto_news = fetch_news(crypto_keywords, "crypto")
 
     # Save crypto data
     save_data_to_json({
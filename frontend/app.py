@@ -1,4 +1,5 @@
 import streamlit as st
+import pandas as pd
 import sys
 from pathlib import Path
 
@@ -7,12 +8,20 @@ PARENT_DIR = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PARENT_DIR))
 
 from chatbot.chat import process_user_input
+from chatbot.memory import ConversationMemory
+from chatbot.portfolio import Portfolio, parse_holdings
+from data.intraday import POLL_SECONDS, create_tracker
 import data_read as read
+import diagnostics
 
 
 # --- Streamlit App Layout ---
 st.set_page_config(page_title="Stock Market Analysis", layout="wide")
 
+# Per-section timings, profiles and memory stats when enabled (?diagnostics=on or APP_DIAGNOSTICS)
+rerun = diagnostics.start_rerun()
+rerun.checkpoint("Navigation")
+
 # --- Navigation Bar ---
 st.markdown("""
 <style>
@@ -42,6 +51,7 @@ st.markdown("""
         <a href="#top-gainers-losers">📊 Gainers & Losers</a>
         <a href="#market-indicators">📈 Market Indicators</a>
         <a href="#market-news">📰 Market News</a>
+        <a href="#portfolio">💼 Portfolio</a>
     </center>
 </nav>
 """, unsafe_allow_html=True)
@@ -49,10 +59,14 @@ st.markdown("""
 st.title("📈 Stock Market Analysis & AI Assistant")
 
 # --- Chat Section ---
+rerun.checkpoint("Chat")
 st.subheader("💬 AI Chat Assistant", anchor="chat-section")
 
 AI_welcome_message = "Hi! How can I assist you with the Financial market today?"
 
+# Show model-written answers as they are generated instead of all at once
+STREAM_RESPONSES = True
+
 # Display only the latest AI response
 def on_input_change():
     st.session_state.trigger_send = True  # Set a flag to simulate the "Send" button press
@@ -62,6 +76,8 @@ if "trigger_send" not in st.session_state:
     st.session_state.trigger_send = False
 if "chat_input" not in st.session_state:
     st.session_state.chat_input = ""
+if "chat_memory" not in st.session_state:
+    st.session_state.chat_memory = ConversationMemory()  # Lets follow-ups like "plot its EMA" refer back
 
 # Display text area with on_change callback
 user_input = st.text_area(
@@ -76,19 +92,30 @@ if st.button("Send") or st.session_state.trigger_send :
     st.session_state.trigger_send = False
     if user_input.strip():
         # Call the process_user_input function and get the result
-        result = process_user_input(user_input.strip())
+        result = process_user_input(
+            user_input.strip(), stream=STREAM_RESPONSES, memory=st.session_state.chat_memory
+        )
 
         # Handle the result based on the returned data
         if "text" in result:
             st.write(result["text"])  # Display the text response from the model
-        elif "plot" in result:
-            st.pyplot(result["plot"])  # Display the plot (matplotlib figure)
-        elif "error" in result:
+        if "stream" in result:
+            st.write_stream(result["stream"])  # Display the response while the model writes it
+        if "plots" in result:
+            # Display the plots (PNG images) in a grid, two per row
+            plots = result["plots"]
+            for row_start in range(0, len(plots), 2):
+                row = plots[row_start:row_start + 2]
+                for col, png in zip(st.columns(len(row)), row):
+                    with col:
+                        st.image(png)
+        if "error" in result:
             st.error(result["error"])  # Display error message
 # --- Adding Space Between Sections ---
 st.markdown("<br><br>", unsafe_allow_html=True)
 
 # --- Dropdown to choose Stock or Crypto ---
+rerun.checkpoint("Market selection")
 market_type = st.selectbox(
     "Choose the market type:",
     ["Stock", "Crypto"],
@@ -108,6 +135,7 @@ last_updated = read.get_last_updated_time(f"{market_type.lower()}_data")  # Repl
 st.markdown(f"**Last updated:** {last_updated}")
 
 # --- Top Gainers and Losers Side by Side ---
+rerun.checkpoint("Gainers & Losers")
 st.subheader(f"📊 Gainers & Losers ({market_type})", anchor="top-gainers-losers")
 col1, col2 = st.columns(2)
 
@@ -121,10 +149,70 @@ with col2:
     losers = read.fetch_top_losers(market_type)
     st.table(losers)
 
+# --- Index Level, Breadth and Sector Moves (from the same daily scan as the movers) ---
+rerun.checkpoint("Index & Sector Breadth")
+aggregates = read.fetch_market_aggregates(market_type)
+if aggregates:
+    st.markdown("### 🏛️ Index & Sector Breadth")
+    index_level, breadth, volume = aggregates["index"], aggregates["breadth"], aggregates["volume"]
+    col1, col2, col3 = st.columns(3)
+    col1.metric(
+        "US30 price-weighted index",
+        f"{index_level['level']:,.2f}",
+        f"{index_level['change']:+,.2f} ({index_level['percent_change']:+.2f}%)",
+    )
+    col2.metric("Advancers / Decliners", f"{breadth['advancers']} / {breadth['decliners']}")
+    ratio = volume["up_down_ratio"]
+    col3.metric("Up/down volume ratio", f"{ratio:.2f}" if ratio is not None else "N/A")
+    st.table([
+        {
+            "Sector": sector["sector"],
+            "Advancers": sector["advancers"],
+            "Decliners": sector["decliners"],
+            "Average Change (%)": round(sector["average_change"], 2)
+        }
+        for sector in aggregates["sectors"]
+    ])
+
+
+# One intraday tracker shared by every session, so Yahoo is polled once per minute in total
+@st.cache_resource
+def intraday_tracker():
+    return create_tracker()
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def intraday_movers_section():
+    try:
+        tracker = intraday_tracker()
+    except Exception as e:
+        st.error(f"Intraday movers are unavailable: {e}")
+        return
+    tracker.poll(min_interval=POLL_SECONDS)
+    if tracker.error:
+        st.warning(f"Couldn't fetch the latest bars: {tracker.error}")
+    gainers, losers = read.fetch_intraday_movers(tracker)
+    st.markdown(f"**As of:** {read.format_bar_time(tracker.updated_at)}")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### 🏆 Intraday Gainers")
+        st.table(gainers)
+    with col2:
+        st.markdown("### 📉 Intraday Losers")
+        st.table(losers)
+
+
+# --- Intraday Movers (1-minute bars, refreshed every minute) ---
+rerun.checkpoint("Intraday movers")
+if market_type == "Stock" and st.toggle("Show intraday movers", help="Live change since the previous close from 1-minute bars."):
+    st.subheader("⏱️ Intraday Movers (Stock)", anchor="intraday-movers")
+    intraday_movers_section()
+
 # --- Adding Space Between Sections ---
 st.markdown("<br><br>", unsafe_allow_html=True)
 
 # --- Market Volatility and Greed Meter Side by Side ---
+rerun.checkpoint("Market indicators")
 st.subheader(f"📈 Market Indicators ({market_type})", anchor="market-indicators")
 col1, col2 = st.columns(2)
 
@@ -144,6 +232,7 @@ with col2:
 st.markdown("<br><br>", unsafe_allow_html=True)
 
 # --- Market News with Expandable Headlines ---
+rerun.checkpoint("News")
 st.subheader(f"📰 Top News of the Day ({market_type})", anchor="market-news")
 news = read.fetch_market_news(market_type)
 
@@ -152,3 +241,47 @@ for article in news:
         st.write(article.get("summary","Summary is Not Available"))
         url=article.get('url'," No link Available")
         st.write(f"For more info : {url}")
+
+# --- Adding Space Between Sections ---
+st.markdown("<br><br>", unsafe_allow_html=True)
+
+# --- Portfolio Valuation ---
+rerun.checkpoint("Portfolio")
+st.subheader("💼 Portfolio", anchor="portfolio")
+holdings_text = st.text_area(
+    "Holdings, one per line as TICKER QUANTITY [COST] (e.g. AAPL 10 150)",
+    key="holdings_text",
+    height=150,
+)
+
+if st.button("Value portfolio") and holdings_text.strip():
+    try:
+        # Rebuild the arrays only when the holdings changed; otherwise just reprice
+        if st.session_state.get("portfolio_holdings") != holdings_text:
+            st.session_state.portfolio = Portfolio.from_records(parse_holdings(holdings_text))
+            st.session_state.portfolio_holdings = holdings_text
+        st.session_state.portfolio.refresh()
+    except Exception as e:
+        st.error(f"Couldn't value the portfolio: {e}")
+
+if "portfolio" in st.session_state:
+    portfolio = st.session_state.portfolio
+    summary = portfolio.summary()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Market value", f"${summary['value']:,.2f}")
+    col2.metric("Day change", f"${summary['day_change']:,.2f}", f"{summary['day_change_pct']:+.2f}%")
+    if summary["pnl"] is not None:
+        col3.metric("Total P&L", f"${summary['pnl']:,.2f}", f"{summary['pnl_pct']:+.2f}%")
+    if summary["missing"]:
+        st.warning(f"No price found for {', '.join(summary['missing'])}.")
+
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        st.dataframe(portfolio.positions(), hide_index=True)
+    with col2:
+        st.markdown("### Sector Exposure (%)")
+        st.bar_chart(pd.Series(summary["sectors"], name="Exposure (%)"), horizontal=True)
+
+# --- Diagnostics (hidden unless enabled) ---
+rerun.finish()
+diagnostics.render_panel(rerun)
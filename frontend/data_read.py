@@ -1,15 +1,10 @@
 import json
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from pathlib import Path
-from data.update_data import refresh_data
 import plotly.graph_objects as go
 import numpy as np
+from data.snapshots import CRYPTO_FILE, STOCK_FILE, read_snapshot
 
-# Paths to JSON files
-
-CRYPTO_FILE = Path("data/crypto_data.json")
-STOCK_FILE = Path("data/stock_data.json")
 timezone = ZoneInfo("America/New_York")
 
 def get_last_updated_time(file_name):
@@ -30,26 +25,29 @@ def is_data_stale(timestamp_str):
     timestamp = datetime.strptime(cleaned_date_str, "%Y-%m-%d %H:%M:%S %z")
     return datetime.now(timezone) - timestamp > timedelta(hours=24)
 
-def load_data(file_path):
+
+def load_data(file_path, refresh=True):
     """
     Load data from the specified JSON file. If the file is stale or missing, refresh the data.
+    With refresh=False the snapshot is returned as it is, without any network call.
     """
-    if not file_path.exists():
-        refresh_data()  # Call refresh if the file doesn't exist
-    else:
-        with open(file_path, "r") as file:
-            data = json.load(file)
-            if is_data_stale(data["timestamp"]):
-                refresh_data()  # Call refresh if data is stale
-                with open(file_path, "r") as refreshed_file:
-                    data = json.load(refreshed_file)
-            return data
-    return load_data(file_path)  # Re-read after refresh
+    data = read_snapshot(file_path)
+    if not refresh:
+        if data is None:
+            raise FileNotFoundError(f"{file_path} hasn't been written yet.")
+        return data
+    if data is None or is_data_stale(data["timestamp"]):
+        # Imported here so reading fresh snapshots doesn't load the refresh pipeline
+        from data.update_data import refresh_data
+
+        refresh_data()
+        data = read_snapshot(file_path)  # Re-read after refresh
+    return data
 
 # Functions to fetch data for Streamlit
-def fetch_top_gainers(stock_or_crypto):
+def fetch_top_gainers(stock_or_crypto, refresh=True):
     if stock_or_crypto == "Crypto":
-        data = load_data(CRYPTO_FILE)
+        data = load_data(CRYPTO_FILE, refresh)
         # Extract and reformat the gainers
         gainers = data["data"]["gainers"]
         
@@ -66,7 +64,7 @@ def fetch_top_gainers(stock_or_crypto):
         
         return transformed_gainers
     else:
-        data = load_data(STOCK_FILE)
+        data = load_data(STOCK_FILE, refresh)
         # Extract and reformat the gainers
         gainers = data["data"]["gainers"]
         
@@ -85,9 +83,9 @@ def fetch_top_gainers(stock_or_crypto):
         
 
 
-def fetch_top_losers(stock_or_crypto):
+def fetch_top_losers(stock_or_crypto, refresh=True):
     if stock_or_crypto == "Crypto":
-        data = load_data(CRYPTO_FILE)
+        data = load_data(CRYPTO_FILE, refresh)
         # Extract and reformat the losers
         losers = data["data"]["losers"]
         
@@ -104,7 +102,7 @@ def fetch_top_losers(stock_or_crypto):
         
         return transformed_losers
     else:
-        data = load_data(STOCK_FILE)
+        data = load_data(STOCK_FILE, refresh)
         losers = data["data"]["losers"]
         transformed_losers = []
         for coin in losers:
@@ -120,21 +118,58 @@ def fetch_top_losers(stock_or_crypto):
         
 
 
-def fetch_market_news(stock_or_crypto):
-    data = load_data(CRYPTO_FILE if stock_or_crypto == "Crypto" else STOCK_FILE)
+def fetch_market_aggregates(stock_or_crypto, refresh=True):
+    """
+    Returns the price-weighted index, breadth, sector and volume aggregates of the stock snapshot,
+    or None for crypto and for snapshots written before they were added.
+    """
+    if stock_or_crypto == "Crypto":
+        return None
+    data = load_data(STOCK_FILE, refresh)
+    return data["data"].get("aggregates")
+
+
+def fetch_intraday_movers(tracker):
+    """Returns the intraday (gainers, losers) of a data.intraday tracker in the table format above."""
+    return tuple(
+        [
+            {
+                "Symbol": stock["symbol"],
+                "Name": stock["company_name"],
+                "Current price": stock["current_price"],
+                "Percent Change": stock["percent_change"]
+            }
+            for stock in movers
+        ]
+        for movers in tracker.movers()
+    )
+
+
+def format_bar_time(timestamp):
+    if timestamp is None:
+        return "No bars yet"
+    return datetime.fromtimestamp(timestamp, timezone).strftime("%Y-%m-%d %H:%M %Z")
+
+
+def fetch_market_news(stock_or_crypto, refresh=True):
+    data = load_data(CRYPTO_FILE if stock_or_crypto == "Crypto" else STOCK_FILE, refresh)
     return data["data"]["news"]
 
-def fetch_market_volatility(stock_or_crypto):
-    data = load_data(CRYPTO_FILE if stock_or_crypto == "Crypto" else STOCK_FILE)
+def fetch_market_volatility(stock_or_crypto, refresh=True):
+    data = load_data(CRYPTO_FILE if stock_or_crypto == "Crypto" else STOCK_FILE, refresh)
     if stock_or_crypto == "Crypto":
         return data["data"]["volatility"]["volatility_index"]
     else:
         return data["data"]["volatility"]["vix_level"]
 
-def fetch_market_greed_meter(stock_or_crypto):
-    data = load_data(CRYPTO_FILE if stock_or_crypto == "Crypto" else STOCK_FILE)
+def fetch_market_greed_meter(stock_or_crypto, refresh=True):
+    data = load_data(CRYPTO_FILE if stock_or_crypto == "Crypto" else STOCK_FILE, refresh)
     return int(data["data"]["greed_index"]["value"])
 
+def fetch_market_greed_label(stock_or_crypto, refresh=True):
+    data = load_data(CRYPTO_FILE if stock_or_crypto == "Crypto" else STOCK_FILE, refresh)
+    return data["data"]["greed_index"].get("value_classification", "Unknown")
+
 def create_speedometer(value, title, max_value):
     """
     Creates a Plotly speedometer gauge chart.
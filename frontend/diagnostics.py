@@ -0,0 +1,425 @@
+"""
+Opt-in instrumentation of the Streamlit page.
+
+Enable it for every session with the APP_DIAGNOSTICS environment variable.
+The ?diagnostics= query parameter enables it for one browser tab, but only
+where APP_DIAGNOSTICS_ALLOW_QUERY is set, since any visitor can add it to the
+URL. Either value is a comma-separated list of modes:
+
+    on       per-section wall time and session state sizes of every rerun
+    profile  also a cProfile of each rerun
+    memory   also tracemalloc growth and gc object counts between reruns
+    all      everything
+
+Reruns are kept in a process-wide history and shown in a diagnostics panel at
+the bottom of the page, which lists and exports only the viewer's own reruns
+unless APP_DIAGNOSTICS_ALL_SESSIONS is set. Set APP_DIAGNOSTICS_LOG to a file
+path to also append every rerun to it as a JSON line.
+
+tracemalloc runs only while some open session is in memory mode.
+"""
+import cProfile
+import gc
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+ENV_VAR = "APP_DIAGNOSTICS"
+LOG_ENV_VAR = "APP_DIAGNOSTICS_LOG"
+ALLOW_QUERY_ENV_VAR = "APP_DIAGNOSTICS_ALLOW_QUERY"
+ALL_SESSIONS_ENV_VAR = "APP_DIAGNOSTICS_ALL_SESSIONS"
+QUERY_PARAM = "diagnostics"
+MODES = ("profile", "memory")
+OFF_VALUES = ("", "0", "off", "false", "no")
+
+# Reruns kept in the history, and sessions whose state size is kept
+HISTORY_SIZE = 100
+MAX_SESSIONS = 200
+
+# Rows kept per rerun for the profile, the memory growth and the object counts
+PROFILE_ROWS = 25
+MEMORY_ROWS = 10
+TYPE_ROWS = 15
+
+# Frames stored per allocation; more frames give better tracebacks but cost memory
+TRACEMALLOC_FRAMES = 10
+
+# A rerun that never finished (it raised) stops counting as the active profile after this long
+STALE_PROFILE_SECONDS = 60
+
+# Without a Streamlit runtime to ask, a memory-mode session counts as closed after this long without a rerun
+IDLE_SESSION_SECONDS = 30 * 60
+
+PARENT_DIR = Path(__file__).resolve().parent.parent
+
+
+def parse_modes(value):
+    """Returns the set of modes in a setting like 'profile,memory', or None when it is off."""
+    value = str(value or "").strip().lower()
+    if value in OFF_VALUES:
+        return None
+    modes = {mode.strip() for mode in value.split(",")}
+    return set(MODES) if "all" in modes else modes & set(MODES)
+
+
+def _session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        return get_script_run_ctx().session_id
+    except Exception:
+        return "unknown"
+
+
+def _flag(name):
+    return os.environ.get(name, "").strip().lower() not in OFF_VALUES
+
+
+def _session_active(session_id, idle_seconds):
+    """Whether a session is still open, going by its last rerun when there is no Streamlit runtime."""
+    try:
+        from streamlit.runtime import Runtime, exists
+
+        if exists():
+            return Runtime.instance().is_active_session(session_id)
+    except Exception:
+        pass
+    return idle_seconds < IDLE_SESSION_SECONDS
+
+
+def _short_path(filename):
+    """Repository files relative to its root, others by their last two path parts."""
+    path = Path(filename)
+    try:
+        return str(path.relative_to(PARENT_DIR))
+    except ValueError:
+        return "/".join(path.parts[-2:])
+
+
+def rss_mib():
+    """Resident set size of the process in MiB, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def approximate_size(value, seen=None, depth=0):
+    """Bytes held by a value and what it contains, a few levels deep."""
+    seen = set() if seen is None else seen
+    if id(value) in seen or depth > 4:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(np.sum(value.memory_usage(deep=True)))
+    size = sys.getsizeof(value, 0)
+    if isinstance(value, dict):
+        size += sum(approximate_size(k, seen, depth + 1) + approximate_size(v, seen, depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset, deque)):
+        size += sum(approximate_size(item, seen, depth + 1) for item in value)
+    elif hasattr(value, "__dict__"):
+        size += approximate_size(vars(value), seen, depth + 1)
+    return size
+
+
+def _session_state():
+    """Type and approximate size of every session state entry of the current session."""
+    return {
+        str(key): {"type": type(value).__name__, "kib": round(approximate_size(value) / 1024, 1)}
+        for key, value in st.session_state.items()
+    }
+
+
+def _profile_rows(profiler):
+    rows = [
+        {
+            "function": f"{_short_path(filename)}:{line}({function})",
+            "calls": calls,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for (filename, line, function), (_, calls, own, cumulative, _) in pstats.Stats(profiler).stats.items()
+    ]
+    return sorted(rows, key=lambda row: row["cumulative_ms"], reverse=True)[:PROFILE_ROWS]
+
+
+class Rerun:
+    """Timings of one script run, section by section."""
+
+    enabled = True
+
+    def __init__(self, recorder, session_id, modes):
+        self.recorder = recorder
+        self.session_id = session_id
+        self.modes = modes
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.started = time.perf_counter()
+        self.sections = []
+        self.record = None
+        self._section = None
+        self._section_started = self.started
+        self.profiler = recorder.start_profile(self) if "profile" in modes else None
+
+    def checkpoint(self, name):
+        """Ends the current section, if any, and starts timing the section `name`."""
+        now = time.perf_counter()
+        self._close_section(now)
+        self._section, self._section_started = name, now
+
+    def _close_section(self, now):
+        if self._section is not None:
+            self.sections.append({"section": self._section, "ms": round((now - self._section_started) * 1000, 3)})
+
+    def finish(self):
+        """Ends the rerun and adds it to the history. Returns its record."""
+        now = time.perf_counter()
+        self._close_section(now)
+        self._section = None
+        record = {
+            "started_at": self.started_at,
+            "session": self.session_id,
+            "total_ms": round((now - self.started) * 1000, 3),
+            "sections": self.sections,
+            "rss_mib": rss_mib(),
+            "session_state": _session_state(),
+        }
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.recorder.end_profile(self)
+            record["profile"] = _profile_rows(self.profiler)
+        if "memory" in self.modes and tracemalloc.is_tracing():
+            record["memory"] = self.recorder.memory_report()
+        self.record = record
+        self.recorder.add(record)
+        return record
+
+
+class DisabledRerun:
+    """Stand-in used when diagnostics are off, so the page code doesn't need to check."""
+
+    enabled = False
+    record = None
+
+    def checkpoint(self, name):
+        pass
+
+    def finish(self):
+        return None
+
+
+class Recorder:
+    """Process-wide history of instrumented reruns, shared by every session."""
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.history = deque(maxlen=history_size)
+        self.sessions = {}  # session id -> (last seen, session state summary)
+        self._lock = threading.Lock()
+        self._profiling = None  # rerun whose profiler is active
+        self._snapshot = None  # tracemalloc snapshot of the previous memory report
+        self._type_counts = Counter()
+        self._memory_sessions = {}  # session id -> last rerun (monotonic) of sessions in memory mode
+        self._tracing = False  # whether tracemalloc was started here, so it's ours to stop
+
+    def track_memory(self, session_id, enabled):
+        """
+        Notes whether the session's rerun is in memory mode, starting tracemalloc
+        for the first such session and stopping it once none is left open.
+        Called on every rerun, so closed sessions are noticed by the next one.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if enabled:
+                self._memory_sessions[session_id] = now
+            else:
+                self._memory_sessions.pop(session_id, None)
+            for other, last_seen in list(self._memory_sessions.items()):
+                if other != session_id and not _session_active(other, now - last_seen):
+                    del self._memory_sessions[other]
+            if self._memory_sessions and not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                self._tracing = True
+            elif not self._memory_sessions and self._tracing:
+                tracemalloc.stop()
+                self._tracing = False
+                self._snapshot = None
+
+    def start_profile(self, rerun):
+        """
+        Starts a profiler for the rerun, or returns None while another rerun is
+        being profiled (Python allows only one active profiler at a time on 3.12+).
+        """
+        with self._lock:
+            active = self._profiling
+            if active is not None and time.perf_counter() - active.started < STALE_PROFILE_SECONDS:
+                return None
+            if active is not None:
+                active.profiler.disable()
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                return None
+            self._profiling = rerun
+            return profiler
+
+    def end_profile(self, rerun):
+        with self._lock:
+            if self._profiling is rerun:
+                self._profiling = None
+
+    def memory_report(self):
+        """Traced memory, the allocation sites that grew most and the object types that grew most since the previous report."""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        type_counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+        with self._lock:
+            previous, self._snapshot = self._snapshot, snapshot
+            previous_types, self._type_counts = self._type_counts, type_counts
+
+        if previous is None:
+            stats = snapshot.statistics("lineno")[:MEMORY_ROWS]
+        else:
+            stats = snapshot.compare_to(previous, "lineno")[:MEMORY_ROWS]
+        growth = [
+            {
+                "location": f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                "kib": round(stat.size / 1024, 1),
+                "growth_kib": round(getattr(stat, "size_diff", stat.size) / 1024, 1),
+                "count_growth": getattr(stat, "count_diff", stat.count),
+            }
+            for stat in stats
+        ]
+        type_growth = Counter({name: count - previous_types.get(name, 0) for name, count in type_counts.items()})
+        return {
+            "traced_mib": round(current / 2**20, 2),
+            "traced_peak_mib": round(peak / 2**20, 2),
+            "growth": growth,
+            "object_types": [
+                {"type": name, "count": type_counts[name], "growth": growth_count}
+                for name, growth_count in type_growth.most_common(TYPE_ROWS)
+            ],
+        }
+
+    def add(self, record):
+        with self._lock:
+            self.history.append(record)
+            # Most recently seen last, so the oldest session is dropped first
+            self.sessions.pop(record["session"], None)
+            self.sessions[record["session"]] = (record["started_at"], record["session_state"])
+            while len(self.sessions) > MAX_SESSIONS:
+                del self.sessions[next(iter(self.sessions))]
+        log_path = os.environ.get(LOG_ENV_VAR)
+        if log_path:
+            with self._lock, open(log_path, "a") as log:
+                log.write(json.dumps(record) + "\n")
+
+    def reruns(self, session_id=None):
+        """The history, or only the reruns of one session."""
+        with self._lock:
+            return [record for record in self.history if session_id is None or record["session"] == session_id]
+
+    def session_rows(self):
+        """One row per session seen, with the size of its state at its latest rerun."""
+        with self._lock:
+            sessions = list(self.sessions.items())
+        return [
+            {
+                "Session": session_id[:8],
+                "Last rerun": last_seen,
+                "State entries": len(state),
+                "State size (KiB)": round(sum(entry["kib"] for entry in state.values()), 1),
+            }
+            for session_id, (last_seen, state) in sessions
+        ]
+
+    def export(self, session_id=None):
+        return {
+            "exported_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "rss_mib": rss_mib(),
+            "reruns": self.reruns(session_id),
+        }
+
+
+recorder = Recorder()
+
+
+def start_rerun():
+    """
+    Starts instrumenting the current script run if diagnostics are enabled by
+    the environment, or by the page's query parameters where they are allowed.
+    """
+    modes = parse_modes(os.environ.get(ENV_VAR))
+    if modes is None and _flag(ALLOW_QUERY_ENV_VAR):
+        modes = parse_modes(st.query_params.get(QUERY_PARAM))
+    session_id = _session_id()
+    recorder.track_memory(session_id, modes is not None and "memory" in modes)
+    if modes is None:
+        return DisabledRerun()
+    return Rerun(recorder, session_id, modes)
+
+
+def render_panel(rerun):
+    """
+    Shows the diagnostics panel for a finished rerun; nothing when diagnostics are off.
+    Other sessions' reruns are left out unless the operator allows them.
+    """
+    if not rerun.enabled or rerun.record is None:
+        return
+    record = rerun.record
+    all_sessions = _flag(ALL_SESSIONS_ENV_VAR)
+    session_id = None if all_sessions else rerun.session_id
+    with st.expander("🩺 Diagnostics"):
+        rss = f", RSS {record['rss_mib']} MiB" if record["rss_mib"] is not None else ""
+        st.markdown(f"**This rerun:** {record['total_ms']:.1f} ms{rss} (modes: {', '.join(sorted(rerun.modes)) or 'timing'})")
+        st.dataframe(pd.DataFrame(record["sections"]), hide_index=True)
+
+        history = recorder.reruns(session_id)
+        if len(history) > 1:
+            st.markdown("**Recent reruns**" if all_sessions else "**This session's recent reruns**")
+            st.line_chart(pd.DataFrame({
+                "Total (ms)": [past["total_ms"] for past in history],
+                "RSS (MiB)": [past["rss_mib"] for past in history],
+            }))
+        if all_sessions:
+            st.markdown("**Sessions**")
+            st.dataframe(pd.DataFrame(recorder.session_rows()), hide_index=True)
+        st.markdown("**This session's state**")
+        st.dataframe(pd.DataFrame.from_dict(record["session_state"], orient="index"))
+
+        if "memory" in record:
+            memory = record["memory"]
+            st.markdown(f"**Traced memory:** {memory['traced_mib']} MiB (peak {memory['traced_peak_mib']} MiB)")
+            st.dataframe(pd.DataFrame(memory["growth"]), hide_index=True)
+            st.dataframe(pd.DataFrame(memory["object_types"]), hide_index=True)
+        if "profile" in record:
+            st.markdown("**Profile (by cumulative time)**")
+            st.dataframe(pd.DataFrame(record["profile"]), hide_index=True)
+        elif "profile" in rerun.modes:
+            st.caption("This rerun wasn't profiled because another rerun was being profiled.")
+
+        st.download_button(
+            "Export diagnostics (JSON)",
+            data=json.dumps(recorder.export(session_id), indent=2),
+            file_name="diagnostics.json",
+            mime="application/json",
+        )